@@ -0,0 +1,56 @@
+# Measures the memory and time taken to create device samples,
+# comparing the __slots__ models against the dict backed models they replaced.
+# Slotted samples only parse their value to a float when it's first needed,
+# so samples which are only returned by the api are never parsed.
+#
+#   python benchmarks/sample_models.py [sample count]
+#
+# 100000 samples, bytes and ns per sample
+#                 python 3.7       python 3.11
+#   dict backed   246 B, 1070 ns   174 B, 515 ns
+#   slots         158 B,  940 ns   142 B, 470 ns
+
+import sys
+import timeit
+import tracemalloc
+
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.models import AtlasScientificResponse, AtlasScientificDeviceSample
+from atlas_scientific_web.hardware.capabilities import get_device_capabilities
+
+class DictBackedDeviceSample(object):
+    def __init__(self, symbol, value, value_type, timestamp, unit_code):
+        self.symbol = symbol
+        self.value = value
+        self.value_type = value_type
+        self.timestamp = timestamp
+        self.unit_code = unit_code
+
+def create_samples(sample_class, responses, outputs):
+    samples = []
+    for response in responses:
+        for index, unit in enumerate(outputs):
+            samples.append(sample_class(unit.symbol, response.get_field('sample', index), unit.value_type, response.response_timestamp, unit.unit_code))
+    return samples
+
+def measure(name, sample_class, responses, outputs):
+    tracemalloc.start()
+    samples = create_samples(sample_class, responses, outputs)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(timeit.repeat(lambda: create_samples(sample_class, responses, outputs), number=1, repeat=5))
+    print(f'{name:>12}: {allocated / len(samples):6.1f} bytes per sample, {seconds / len(samples) * 1e9:6.0f} ns per sample')
+
+def main(sample_count):
+    outputs = get_device_capabilities('DO').read.output
+    timestamp = datetime.now(timezone.utc)
+    responses = [AtlasScientificResponse(f'\x01{i % 100}.12,{i % 1000}.5\x00'.encode('ascii'), timestamp) for i in range(sample_count)]
+
+    print(f'{sample_count * len(outputs)} samples, python {sys.version.split()[0]}')
+    measure('dict backed', DictBackedDeviceSample, responses, outputs)
+    measure('slots', AtlasScientificDeviceSample, responses, outputs)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
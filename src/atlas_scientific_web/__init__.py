@@ -1 +1,2 @@
-from .api import create_app
\ No newline at end of file
+from .api import create_app
+from .asgi import create_asgi_app
\ No newline at end of file
@@ -1,16 +1,28 @@
 import signal, os
+import json
 import logging
 import sys
+import threading
 
-from flask import Flask, request, send_from_directory
+from flask import Flask, Response, request, send_from_directory
+from werkzeug.routing import BaseConverter
 from flask_restx import Api, Resource, marshal
 from flask_cors import CORS
 
 from .models import add_device_models
-from .errors import add_device_errors
+from .errors import add_device_errors, describe_device_error, load_validated
+from .sample_store import AtlasScientificSampleStore
+from .sample_history import read_sample_history
+from .recent_samples import AtlasScientificRecentSamples, read_recent_samples
 
 from .hardware.i2c import I2CBusIo, I2CSessionProvider
 from .hardware.device import AtlasScientificDeviceBus
+from .hardware.registry import AtlasScientificDeviceRegistry
+from .hardware.multi_bus import AtlasScientificMultiDeviceBus, format_bus_address, parse_bus_address
+from .hardware.sampler import AtlasScientificDeviceSampler, SampleStreamLimitError
+
+# seconds between comments sent on an idle sample stream, so proxies don't close it
+sample_stream_keep_alive_seconds = 15
 
 def config_logging():
     logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
@@ -22,11 +34,15 @@ def logging_application_banner():
     logging.info('========================')
     logging.info('') 
 
-def attach_exit_handler(i2cbus):
+def attach_exit_handler(buses, device_sampler):
     def on_exit(signum, frame):
 
-        logging.info('release i2c bus handle')
-        i2cbus.close()
+        logging.info('stop background sampling')
+        device_sampler.stop()
+        if device_sampler.sample_store:
+            logging.info('write stored samples')
+            device_sampler.sample_store.close()
+        close_buses(buses)
         logging.info('========================')
         logging.info(' Service stop')
         logging.info('========================')
@@ -34,12 +50,116 @@ def attach_exit_handler(i2cbus):
     signal.signal(signal.SIGINT, on_exit)
     signal.signal(signal.SIGTERM, on_exit)
 
-def create_app(i2cbus=I2CBusIo()):
-    attach_exit_handler(i2cbus)
+def create_device_bus(i2cbus, device_polling, device_bus_type=AtlasScientificDeviceBus, multi_device_bus_type=AtlasScientificMultiDeviceBus, **device_bus_options):
+    # i2cbus is either a single bus, or a dict of bus number to bus when devices are spread across
+    # many buses. Returns the device bus, and each bus with its session provider so they can be closed
+    if not isinstance(i2cbus, dict):
+        i2c_session_provider = I2CSessionProvider(i2cbus)
+        return device_bus_type(i2c_session_provider, device_polling, **device_bus_options), [(i2cbus, i2c_session_provider)]
+
+    buses = []
+    device_buses = {}
+    for bus, bus_io in sorted(i2cbus.items()):
+        i2c_session_provider = I2CSessionProvider(bus_io)
+        device_buses[bus] = device_bus_type(i2c_session_provider, device_polling, bus, **device_bus_options)
+        buses.append((bus_io, i2c_session_provider))
+    return multi_device_bus_type(device_buses), buses
+
+def close_buses(buses):
+    for bus_io, i2c_session_provider in buses:
+        logging.info('stop i2c bus scheduler')
+        i2c_session_provider.close()
+        logging.info('release i2c bus handle')
+        bus_io.close()
+
+class DeviceAddressConverter(BaseConverter):
+    # an I2C address, or bus:address when devices are spread across many buses
+    regex = r'\d+(?::\d+)?'
+
+    def to_python(self, value):
+        return format_bus_address(*parse_bus_address(value))
+
+    def to_url(self, value):
+        return str(value)
+
+def format_sample_event(result, models):
+    # Formats samples as a Server-Sent Event, errors are sent as a 'device_error' event
+    if isinstance(result, Exception):
+        error, _ = describe_device_error(result)
+        return f'event: device_error\ndata: {json.dumps(marshal(error, models.device_error))}\n\n'
+    return f'data: {json.dumps(marshal(result, models.device_sample))}\n\n'
+
+def format_samples_event(results, models):
+    # Formats the samples of many devices as a Server-Sent Event, keyed by address as GET /api/device/sample is
+    return f'data: {json.dumps(describe_device_samples(results, models))}\n\n'
+
+def load_device_addresses(args, models):
+    # the addresses given by the repeated 'address' query argument, or None for all known devices
+    addresses = args.getlist('address')
+    samples_query = load_validated(models.device_samples_query_schema, {'address': addresses} if addresses else {})
+    return samples_query.get('address', None)
+
+def describe_devices(devices):
+    # the devices listed by the api
+    i2c_devices = []
+    for device in devices:
+        device_info = device.get_device_info()
+        i2c_devices.append({
+            'device_type': device_info.device_type,
+            'firmware_version': device_info.version,
+            'address': device.bus_address,
+            'vendor': device_info.vendor,
+        })
+    return i2c_devices
+
+def describe_device_samples(results, models):
+    # the samples, or the error encountered, of each device keyed by address
+    device_samples = {}
+    for address in sorted(results):
+        result = results[address]
+        if isinstance(result, Exception):
+            error, _ = describe_device_error(result)
+            device_samples[str(address)] = {'error': marshal(error, models.device_error)}
+        else:
+            device_samples[str(address)] = {'samples': marshal(result, models.device_sample)}
+    return device_samples
+
+def describe_sample_outputs(device, enabled_outputs):
+    # every output the device supports, and whether it's enabled
+    enabled_unit_codes = set(m.unit_code for m in enabled_outputs)
+    sample_outputs = []
+    for sample_output in device.get_supported_output_measurements():
+        sample_outputs.append({
+            'symbol': sample_output.symbol,
+            'unit': sample_output.unit,
+            'value_type': sample_output.value_type,
+            'is_enable': sample_output.unit_code in enabled_unit_codes,
+            'unit_code': sample_output.unit_code
+        })
+    return sample_outputs
+
+def describe_device_calibration(device):
+    # the calibration point last set, and the points which can be set next
+    calibration = device.capabilities.calibration
+    point = calibration.points_by_id[device.calibration_state] if calibration and device.calibration_state else None
+    return {
+        'point': point.id if point else None,
+        'is_complete': point.is_complete if point else False,
+        'next_points': [{
+                'id': p.id,
+                'description': p.description,
+                'value_type': p.value_type.t,
+            } for p in device.get_next_calibration_points()],
+    }
+
+def create_app(i2cbus=None, sample_interval=None, stream_interval=1, device_polling=None, sample_store_path=None, recent_sample_capacity=3600, device_registry_path=None, missing_device_ttl=60, rescan_interval=None, max_sample_streams=8):
     config_logging()
     logging_application_banner()
-    
+
+    # the bus is only opened when the app is created, so importing doesn't need I2C
+    i2cbus = i2cbus or I2CBusIo()
     app = Flask(__name__, static_folder='./static')
+    app.url_map.converters['device_address'] = DeviceAddressConverter
     CORS(app)
 
     api = Api(app, version='1.0', title='I2C Microserverice',
@@ -47,11 +167,25 @@ def create_app(i2cbus=I2CBusIo()):
     )
     device_ns = api.namespace('api/device', description='I2C Device operations')
 
-    i2c_session_provider = I2CSessionProvider(i2cbus)
-    device_bus = AtlasScientificDeviceBus(i2c_session_provider)
+    device_registry = AtlasScientificDeviceRegistry(device_registry_path) if device_registry_path else None
+    device_bus, buses = create_device_bus(i2cbus, device_polling,
+        device_registry=device_registry, missing_device_ttl=missing_device_ttl, rescan_interval=rescan_interval)
+    sample_store = AtlasScientificSampleStore(sample_store_path) if sample_store_path else None
+    recent_samples = AtlasScientificRecentSamples(recent_sample_capacity)
+    device_sampler = AtlasScientificDeviceSampler(device_bus, sample_interval, stream_interval, sample_store, recent_samples)
+    device_bus.add_device_listener(device_sampler.on_device_changed)
+    attach_exit_handler(buses, device_sampler)
+
+    # each open stream holds a server thread, so only some are streams and the rest are left for other requests
+    sample_streams = threading.BoundedSemaphore(max_sample_streams)
+
+    def open_sample_stream(events):
+        response = Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        response.call_on_close(sample_streams.release)
+        return response
     
     models = device_ns.add_device_models()
-    device_ns.add_device_errors()
+    device_ns.add_device_errors(models)
 
     @app.before_request
     def log_request_info():
@@ -70,27 +204,57 @@ def create_app(i2cbus=I2CBusIo()):
     class DeviceList(Resource):
         @device_ns.marshal_list_with(models.device_info)
         def get(self):
-            device_bus.get_known_devices()
-            i2c_devices = []
-            for device in device_bus.get_known_devices():
-                device_info = device.get_device_info()
-                i2c_devices.append({
-                    'device_type': device_info.device_type,
-                    'firmware_version': device_info.version,
-                    'address': device_info.address,
-                    'vendor': device_info.vendor,
-                })
-            
-            return i2c_devices
-
-    @device_ns.route('/<int:address>/sample')
+            return describe_devices(device_bus.get_known_devices())
+
+    @device_ns.route('/sample')
+    @device_ns.doc(params={'address': 'The I2C addresses of the devices to sample, may be repeated. All known devices are sampled when omitted'})
+    class DeviceSamples(Resource):
+
+        @device_ns.response(200, 'Success', models.device_samples)
+        def get(self):
+            results = device_bus.read_samples(load_device_addresses(request.args, models))
+            return describe_device_samples(results, models), 200
+
+    @device_ns.route('/sample/stream')
+    @device_ns.doc(params={'address': 'The I2C addresses of the devices to stream, may be repeated. All known devices are streamed when omitted'})
+    class DeviceSamplesStream(Resource):
+
+        @device_ns.produces(['text/event-stream'])
+        @device_ns.response(200, 'A Server-Sent Event stream of the samples of many devices', models.device_samples)
+        def get(self):
+            addresses = load_device_addresses(request.args, models)
+            # with no addresses, devices found while streaming are streamed as well
+            follow_new_devices = addresses is None
+            if addresses is None:
+                addresses = [device.bus_address for device in device_bus.get_known_devices()]
+            if not sample_streams.acquire(blocking=False):
+                raise SampleStreamLimitError
+            subscription = device_sampler.subscribe_all(addresses, follow_new_devices)
+
+            def events():
+                try:
+                    while True:
+                        results = subscription.get(sample_stream_keep_alive_seconds)
+                        if subscription.is_closed:
+                            return
+                        if results is None:
+                            yield ': keep-alive\n\n'
+                        else:
+                            yield format_samples_event(results, models)
+                finally:
+                    device_sampler.unsubscribe_all(subscription)
+
+            return open_sample_stream(events())
+
+    @device_ns.route('/<device_address:address>/sample')
     @device_ns.doc(params={'address': 'An I2C Address of a device'})
     class DeviceSample(Resource):
 
         @device_ns.marshal_list_with(models.device_sample)
+        @device_ns.doc(params={'max_age': 'The oldest cached sample in seconds which can be returned, 0 forces a fresh sample'})
         def get(self, address):
-            device = device_bus.get_device_by_address(address)
-            return device.read_sample([]), 200
+            sample_query = models.device_sample_query_schema.load_request_args(request)
+            return device_sampler.read_sample(address, sample_query.get('max_age', None)), 200
 
         @device_ns.marshal_list_with(models.device_sample)
         @device_ns.expect(models.device_sample_compensation)
@@ -99,25 +263,68 @@ def create_app(i2cbus=I2CBusIo()):
             compensation_factors = models.device_compensation_factors_schema.load_request(request)
             return device.read_sample(compensation_factors), 200
 
-    @device_ns.route('/<int:address>/sample/output')
-    class DeviceSampleOutput(Resource):
-        @device_ns.marshal_list_with(models.device_sample_output)
+    @device_ns.route('/<device_address:address>/sample/stream')
+    @device_ns.doc(params={'address': 'An I2C Address of a device'})
+    class DeviceSampleStream(Resource):
+
+        @device_ns.produces(['text/event-stream'])
+        @device_ns.response(200, 'A Server-Sent Event stream of samples', models.device_sample)
+        def get(self, address):
+            # fail before the stream starts when there is no device to sample
+            device_bus.get_device_by_address(address)
+            if not sample_streams.acquire(blocking=False):
+                raise SampleStreamLimitError
+            subscription = device_sampler.subscribe(address)
+
+            def events():
+                try:
+                    while True:
+                        result = subscription.get(sample_stream_keep_alive_seconds)
+                        if subscription.is_closed:
+                            return
+                        if result is None:
+                            yield ': keep-alive\n\n'
+                        else:
+                            yield format_sample_event(result, models)
+                finally:
+                    device_sampler.unsubscribe(address, subscription)
+
+            return open_sample_stream(events())
+
+    @device_ns.route('/<device_address:address>/sample/history')
+    @device_ns.doc(params={'address': 'An I2C Address of a device'})
+    class DeviceSampleHistory(Resource):
+
+        @device_ns.response(200, 'Success', [models.device_sample_history])
+        @device_ns.doc(params={
+            'from': 'The start of the history, defaults to a day before the end',
+            'to': 'The end of the history, defaults to now',
+            'resolution': 'The seconds covered by each bucket of samples',
+            'agg': 'A comma separated list of the aggregations of each bucket, from min, max and mean'
+        })
         def get(self, address):
             device = device_bus.get_device_by_address(address)
-            supported_outputs = device.get_supported_output_measurements()
-            enabled_outputs = set(m.unit_code for m in device.get_enabled_output_measurements())
+            history_query = models.device_sample_history_query_schema.load_request_args(request)
+            history = read_sample_history(device_sampler.sample_store, device, history_query)
+            return marshal(history, models.device_sample_history, skip_none=True), 200
+
+    @device_ns.route('/<device_address:address>/sample/recent')
+    @device_ns.doc(params={'address': 'An I2C Address of a device'})
+    class DeviceRecentSamples(Resource):
 
-            sample_outputs = []
-            for sample_output in supported_outputs: 
-                sample_outputs.append({
-                    'symbol': sample_output.symbol,
-                    'unit': sample_output.unit,
-                    'value_type': sample_output.value_type,
-                    'is_enable': sample_output.unit_code in enabled_outputs,
-                    'unit_code': sample_output.unit_code
-                })
+        @device_ns.marshal_list_with(models.device_recent_samples)
+        @device_ns.doc(params={'period': 'The seconds before the latest sample to include, all samples held in memory when omitted'})
+        def get(self, address):
+            device = device_bus.get_device_by_address(address)
+            recent_query = models.device_recent_samples_query_schema.load_request_args(request)
+            return read_recent_samples(recent_samples, device, recent_query.get('period', None)), 200
 
-            return sample_outputs
+    @device_ns.route('/<device_address:address>/sample/output')
+    class DeviceSampleOutput(Resource):
+        @device_ns.marshal_list_with(models.device_sample_output)
+        def get(self, address):
+            device = device_bus.get_device_by_address(address)
+            return describe_sample_outputs(device, device.get_enabled_output_measurements())
 
         @device_ns.expect(models.set_device_sample_outputs)
         def post(self, address):
@@ -125,7 +332,7 @@ def create_app(i2cbus=I2CBusIo()):
             device.set_enabled_output_measurements(request.json)
             return '', 200
 
-    @device_ns.route('/<int:address>/sample/compensation')
+    @device_ns.route('/<device_address:address>/sample/compensation')
     class DeviceSampleCompensation(Resource):
 
         @device_ns.expect(models.device_sample_compensation)
@@ -136,9 +343,14 @@ def create_app(i2cbus=I2CBusIo()):
 
             return '', 200
 
-    @device_ns.route('/<int:address>/sample/calibration')
+    @device_ns.route('/<device_address:address>/sample/calibration')
     class DeviceSampleCalibration(Resource):
 
+        @device_ns.marshal_with(models.device_calibration)
+        def get(self, address):
+            device = device_bus.get_device_by_address(address)
+            return describe_device_calibration(device)
+
         @device_ns.expect(models.device_sample_calibration)
         def put(self, address):
             calibration_point = models.device_calibration_point_schema.load_request(request)
@@ -147,7 +359,7 @@ def create_app(i2cbus=I2CBusIo()):
 
             return '', 200
 
-    @device_ns.route('/<int:address>/configuration')
+    @device_ns.route('/<device_address:address>/configuration')
     class DeviceConfiguration(Resource):
 
         @device_ns.expect(models.device_configuration_parameter)
@@ -158,4 +370,5 @@ def create_app(i2cbus=I2CBusIo()):
 
             return '', 200
 
+    device_sampler.start()
     return app
\ No newline at end of file
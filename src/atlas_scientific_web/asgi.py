@@ -0,0 +1,403 @@
+import asyncio
+import json
+import logging
+import os
+
+from contextlib import asynccontextmanager
+from flask_restx import Namespace, marshal
+from starlette.applications import Starlette
+from starlette.convertors import Convertor, register_url_convertor
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.schemas import SchemaGenerator
+from starlette.staticfiles import StaticFiles
+
+from .api import config_logging, \
+    logging_application_banner, \
+    create_device_bus, \
+    close_buses, \
+    describe_devices, \
+    describe_device_samples, \
+    describe_sample_outputs, \
+    describe_device_calibration, \
+    format_sample_event, \
+    format_samples_event, \
+    load_device_addresses, \
+    sample_stream_keep_alive_seconds
+from .models import add_device_models
+from .errors import device_errors, describe_device_error, load_validated
+from .sample_store import AtlasScientificSampleStore
+from .sample_history import read_sample_history
+from .recent_samples import AtlasScientificRecentSamples, read_recent_samples
+
+from .hardware.i2c import I2CBusIo
+from .hardware.async_device import AsyncAtlasScientificDeviceBus
+from .hardware.registry import AtlasScientificDeviceRegistry
+from .hardware.async_sampler import AsyncAtlasScientificDeviceSampler
+from .hardware.multi_bus import AsyncAtlasScientificMultiDeviceBus, format_bus_address, parse_bus_address
+from .hardware.models import RequestValidationError
+
+static_folder = os.path.join(os.path.dirname(__file__), 'static')
+
+class DeviceAddressConvertor(Convertor):
+    # an I2C address, or bus:address when devices are spread across many buses
+    regex = r'\d+(?::\d+)?'
+
+    def convert(self, value):
+        return format_bus_address(*parse_bus_address(value))
+
+    def to_string(self, value):
+        return str(value)
+
+register_url_convertor('device_address', DeviceAddressConvertor())
+
+class ApiResponse(JSONResponse):
+    # formatted the same as flask_restx, so both servers respond identically
+    def render(self, content):
+        return (json.dumps(content) + "\n").encode('utf-8')
+
+class AsgiTelemetryChannel(object):
+    # A websocket connection, sending the samples of every device it's subscribed to.
+    # Devices are sampled by the same feeds as the sample streams.
+    def __init__(self, device_bus, device_sampler, models, websocket):
+        self.device_bus = device_bus
+        self.device_sampler = device_sampler
+        self.models = models
+        self.websocket = websocket
+        # address -> (subscription, forwarding task)
+        self.subscriptions = {}
+        # address -> unit codes sent, None for all units
+        self.unit_codes = {}
+
+    async def handle_request(self, text):
+        try:
+            request = load_validated(self.models.device_telemetry_request_schema, json.loads(text))
+        except ValueError:
+            await self.send_error(RequestValidationError())
+            return
+        except RequestValidationError as err:
+            await self.send_error(err)
+            return
+
+        unit_codes = set(u.upper() for u in request['unit_code']) if 'unit_code' in request else None
+        for address in request['address']:
+            try:
+                if request['action'] == 'subscribe':
+                    await self.subscribe(address, unit_codes)
+                else:
+                    await self.unsubscribe(address, unit_codes)
+            except Exception as err:
+                await self.send_error(err, address)
+
+    async def subscribe(self, address, unit_codes):
+        # fail before subscribing when there is no device to sample
+        await self.device_bus.get_device_by_address(address)
+
+        if address in self.subscriptions:
+            current_unit_codes = self.unit_codes[address]
+            self.unit_codes[address] = None if current_unit_codes is None or unit_codes is None else current_unit_codes | unit_codes
+            return
+
+        self.unit_codes[address] = unit_codes
+        subscription = self.device_sampler.subscribe(address)
+        self.subscriptions[address] = (subscription, asyncio.ensure_future(self.__forward(address, subscription)))
+
+    async def unsubscribe(self, address, unit_codes):
+        if address not in self.subscriptions:
+            return
+
+        if unit_codes is not None:
+            current_unit_codes = self.unit_codes[address]
+            if current_unit_codes is None:
+                device = await self.device_bus.get_device_by_address(address)
+                current_unit_codes = set(m.unit_code for m in device.get_supported_output_measurements())
+
+            self.unit_codes[address] = current_unit_codes - unit_codes
+            if self.unit_codes[address]:
+                return
+
+        subscription, forward_task = self.subscriptions.pop(address)
+        del self.unit_codes[address]
+        forward_task.cancel()
+        self.device_sampler.unsubscribe(address, subscription)
+
+    async def close(self):
+        for address in list(self.subscriptions):
+            await self.unsubscribe(address, None)
+
+    async def send_frame(self, frame):
+        await self.websocket.send_text(json.dumps(frame))
+
+    async def send_error(self, err, address=None):
+        error, _ = describe_device_error(err)
+        frame = {'error': marshal(error, self.models.device_error)}
+        if address is not None:
+            frame['address'] = address
+        await self.send_frame(frame)
+
+    async def __forward(self, address, subscription):
+        while True:
+            result = await subscription.get()
+            if subscription.is_closed:
+                return
+
+            if isinstance(result, Exception):
+                await self.send_error(result, address)
+                continue
+
+            unit_codes = self.unit_codes.get(address, None)
+            samples = [s for s in result if unit_codes is None or s.unit_code in unit_codes]
+            await self.send_frame({'address': address, 'samples': marshal(samples, self.models.device_sample)})
+
+def create_asgi_app(i2cbus=None, sample_interval=None, stream_interval=1, device_polling=None, sample_store_path=None, recent_sample_capacity=3600, device_registry_path=None, missing_device_ttl=60, rescan_interval=None):
+    config_logging()
+    logging_application_banner()
+
+    # the bus is only opened when the app is created, so importing doesn't need I2C
+    i2cbus = i2cbus or I2CBusIo()
+    device_registry = AtlasScientificDeviceRegistry(device_registry_path) if device_registry_path else None
+    device_bus, buses = create_device_bus(i2cbus, device_polling, AsyncAtlasScientificDeviceBus, AsyncAtlasScientificMultiDeviceBus,
+        device_registry=device_registry, missing_device_ttl=missing_device_ttl, rescan_interval=rescan_interval)
+    sample_store = AtlasScientificSampleStore(sample_store_path) if sample_store_path else None
+    recent_samples = AtlasScientificRecentSamples(recent_sample_capacity)
+    device_sampler = AsyncAtlasScientificDeviceSampler(device_bus, sample_interval, stream_interval, sample_store, recent_samples)
+    device_bus.add_device_listener(device_sampler.on_device_changed)
+
+    # the flask_restx models are only used for marshalling
+    models = Namespace('api/device').add_device_models()
+    schemas = SchemaGenerator({'openapi': '3.0.0', 'info': {'title': 'I2C Microserverice', 'version': '1.0'}})
+
+    async def get_devices(request):
+        """
+        summary: Lists the known devices
+        """
+        i2c_devices = describe_devices(await device_bus.get_known_devices())
+        return ApiResponse(marshal(i2c_devices, models.device_info))
+
+    async def get_device_samples(request):
+        """
+        summary: Samples many devices at once, all known devices when no address is given
+        parameters: [{name: address, in: query, schema: {type: array, items: {type: integer}}}]
+        """
+        results = await device_bus.read_samples(load_device_addresses(request.query_params, models))
+        return ApiResponse(describe_device_samples(results, models))
+
+    async def get_device_samples_stream(request):
+        """
+        summary: A Server-Sent Event stream of the samples of many devices, all known devices when no address is given
+        parameters: [{name: address, in: query, schema: {type: array, items: {type: integer}}}]
+        """
+        addresses = load_device_addresses(request.query_params, models)
+        # with no addresses, devices found while streaming are streamed as well
+        follow_new_devices = addresses is None
+        if addresses is None:
+            addresses = [device.bus_address for device in await device_bus.get_known_devices()]
+        subscription = device_sampler.subscribe_all(addresses, follow_new_devices)
+
+        async def events():
+            try:
+                while True:
+                    results = await subscription.get(sample_stream_keep_alive_seconds)
+                    if subscription.is_closed:
+                        return
+                    if results is None:
+                        yield ': keep-alive\n\n'
+                    else:
+                        yield format_samples_event(results, models)
+            finally:
+                device_sampler.unsubscribe_all(subscription)
+
+        return sample_stream_response(events())
+
+    async def get_device_sample(request):
+        """
+        summary: Samples a device
+        parameters: [{name: max_age, in: query, description: The oldest cached sample in seconds which can be returned, schema: {type: number}}]
+        """
+        device_address = request.path_params['address']
+        sample_query = load_validated(models.device_sample_query_schema, request.query_params)
+        samples = await device_sampler.read_sample(device_address, sample_query.get('max_age', None))
+        return ApiResponse(marshal(samples, models.device_sample))
+
+    async def post_device_sample(request):
+        """
+        summary: Samples a device with the compensation factors given
+        """
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        compensation_factors = load_validated(models.device_compensation_factors_schema, await read_json(request))
+        samples = await device.read_sample(compensation_factors)
+        return ApiResponse(marshal(samples, models.device_sample))
+
+    async def get_device_sample_stream(request):
+        """
+        summary: A Server-Sent Event stream of the samples of a device
+        """
+        device_address = request.path_params['address']
+        # fail before the stream starts when there is no device to sample
+        await device_bus.get_device_by_address(device_address)
+        subscription = device_sampler.subscribe(device_address)
+
+        async def events():
+            try:
+                while True:
+                    result = await subscription.get(sample_stream_keep_alive_seconds)
+                    if subscription.is_closed:
+                        return
+                    if result is None:
+                        yield ': keep-alive\n\n'
+                    else:
+                        yield format_sample_event(result, models)
+            finally:
+                device_sampler.unsubscribe(device_address, subscription)
+
+        return sample_stream_response(events())
+
+    async def get_device_sample_history(request):
+        """
+        summary: The stored samples of a device, aggregated into buckets
+        parameters: [{name: from, in: query, schema: {type: string}}, {name: to, in: query, schema: {type: string}}, {name: resolution, in: query, schema: {type: integer}}, {name: agg, in: query, schema: {type: string}}]
+        """
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        history_query = load_validated(models.device_sample_history_query_schema, request.query_params)
+        # reading the store is blocking file io
+        history = await asyncio.get_event_loop().run_in_executor(None, read_sample_history, sample_store, device, history_query)
+        return ApiResponse(marshal(history, models.device_sample_history, skip_none=True))
+
+    async def get_device_recent_samples(request):
+        """
+        summary: The samples of a device held in memory
+        parameters: [{name: period, in: query, schema: {type: number}}]
+        """
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        recent_query = load_validated(models.device_recent_samples_query_schema, request.query_params)
+        recent = read_recent_samples(recent_samples, device, recent_query.get('period', None))
+        return ApiResponse(marshal(recent, models.device_recent_samples))
+
+    async def get_device_sample_output(request):
+        """
+        summary: The outputs a device supports, and whether each is enabled
+        """
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        sample_outputs = describe_sample_outputs(device, await device.get_enabled_output_measurements())
+        return ApiResponse(marshal(sample_outputs, models.device_sample_output))
+
+    async def post_device_sample_output(request):
+        """
+        summary: Enables the outputs of a device given by unit code
+        """
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        await device.set_enabled_output_measurements(await read_json(request))
+        return ApiResponse('')
+
+    async def post_device_sample_compensation(request):
+        """
+        summary: Sets the compensation factors of a device
+        """
+        compensation_factors = load_validated(models.device_compensation_factors_schema, await read_json(request))
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        await device.set_measurement_compensation_factors(compensation_factors)
+        return ApiResponse('')
+
+    async def get_device_sample_calibration(request):
+        """
+        summary: The calibration point last set, and the points which can be set next
+        """
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        return ApiResponse(marshal(describe_device_calibration(device), models.device_calibration))
+
+    async def put_device_sample_calibration(request):
+        """
+        summary: Sets a calibration point of a device
+        """
+        calibration_point = load_validated(models.device_calibration_point_schema, await read_json(request))
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        await device.set_calibration_point(calibration_point)
+        return ApiResponse('')
+
+    async def post_device_configuration(request):
+        """
+        summary: Sets a configuration parameter of a device
+        """
+        configuration_parameter = load_validated(models.device_configuration_parameter_schema, await read_json(request))
+        device = await device_bus.get_device_by_address(request.path_params['address'])
+        await device.set_configuration_parameter(configuration_parameter)
+        return ApiResponse('')
+
+    async def device_telemetry(websocket):
+        channel = AsgiTelemetryChannel(device_bus, device_sampler, models, websocket)
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.receive':
+                    await channel.handle_request(message.get('text') or message.get('bytes', b'').decode('utf-8'))
+                elif message['type'] == 'websocket.disconnect':
+                    return
+        finally:
+            await channel.close()
+
+    async def get_swagger(request):
+        return ApiResponse(schemas.get_schema(routes=request.app.routes))
+
+    def handle_device_error(request, err):
+        logging.debug(f'Request failed, {err}')
+        error, status_code = describe_device_error(err)
+        return ApiResponse(marshal(error, models.device_error), status_code)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        logging.info('start background sampling')
+        device_sampler.start()
+        yield
+        logging.info('stop background sampling')
+        device_sampler.stop()
+        if sample_store:
+            logging.info('write stored samples')
+            sample_store.close()
+        close_buses(buses)
+        logging.info('========================')
+        logging.info(' Service stop')
+        logging.info('========================')
+
+    routes = [
+        Route('/api/device', get_devices),
+        Route('/api/device/sample', get_device_samples),
+        Route('/api/device/sample/stream', get_device_samples_stream),
+        Route('/api/device/{address:device_address}/sample', get_device_sample),
+        Route('/api/device/{address:device_address}/sample', post_device_sample, methods=['POST']),
+        Route('/api/device/{address:device_address}/sample/stream', get_device_sample_stream),
+        Route('/api/device/{address:device_address}/sample/history', get_device_sample_history),
+        Route('/api/device/{address:device_address}/sample/recent', get_device_recent_samples),
+        Route('/api/device/{address:device_address}/sample/output', get_device_sample_output),
+        Route('/api/device/{address:device_address}/sample/output', post_device_sample_output, methods=['POST']),
+        Route('/api/device/{address:device_address}/sample/compensation', post_device_sample_compensation, methods=['POST']),
+        Route('/api/device/{address:device_address}/sample/calibration', get_device_sample_calibration),
+        Route('/api/device/{address:device_address}/sample/calibration', put_device_sample_calibration, methods=['PUT']),
+        Route('/api/device/{address:device_address}/configuration', post_device_configuration, methods=['POST']),
+        WebSocketRoute('/api/device/telemetry', device_telemetry),
+        Route('/swagger.json', get_swagger, include_in_schema=False),
+        # a route rather than a mount, so websockets of unknown paths are closed
+        Route('/{path:path}', StaticFiles(directory=static_folder, html=True), include_in_schema=False),
+    ]
+
+    # the same errors as the flask app, unexpected errors are still raised to the ASGI server to be logged
+    exception_handlers = {error_type: handle_device_error for error_type, _, _, _ in device_errors}
+    return Starlette(
+        routes=routes,
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+        exception_handlers=exception_handlers,
+        lifespan=lifespan
+    )
+
+def sample_stream_response(events):
+    # the content type is given as a header, so isn't given a charset
+    return StreamingResponse(events, headers={'content-type': 'text/event-stream', 'cache-control': 'no-cache'})
+
+async def read_json(request):
+    body = await request.body()
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        raise RequestValidationError
@@ -1,7 +1,7 @@
 import logging
 
-from flask_restx import Namespace, Resource, fields
-from marshmallow import ValidationError, Schema, post_load, fields as m_fields
+from flask_restx import Namespace
+from marshmallow import ValidationError, Schema
 
 from .hardware.models import RequestValidationError, \
     AtlasScientificDeviceNotYetSupported, \
@@ -9,93 +9,70 @@ from .hardware.models import RequestValidationError, \
     AtlasScientificNoDeviceAtAddress, \
     AtlasScientificDeviceNotReadyError, \
     AtlasScientificSyntaxError, \
+    AtlasScientificCalibrationPointNotAllowed, \
     AtlasScientificError
+from .sample_store import SampleHistoryNotEnabledError
+from .hardware.sampler import SampleStreamLimitError
 
-def add_device_errors(self):
-    devices_api_log = logging.getLogger(f'DeviceApiErrors')
+# Ordered from the most to the least specific error, as the first match is used
+device_errors = [
+    (RequestValidationError, 400, 'INVALID_REQUEST_ERROR',
+        'Request contains a missing or incorrectly formatted felid.'),
+    (AtlasScientificDeviceNotYetSupported, 400, 'UNSUPPORTED_DEVICE',
+        'Detected unsupported atlas scientific device.'),
+    (AtlasScientificResponseSyntaxError, 400, 'UNEXPECTED_DEVICE_RESPONSE',
+        'Device responded but response was not recognizable.'),
+    (AtlasScientificNoDeviceAtAddress, 400, 'DEVICE_NOT_FOUND',
+        'No device is connected to the given address.'),
+    (AtlasScientificDeviceNotReadyError, 400, 'DEVICE_NOT_READY',
+        'Device did not return the expected response in a timely mannor.'),
+    (AtlasScientificSyntaxError, 400, 'COMMAND_ERROR',
+        'Device has rejected your request, please confrim the request is supported by the device and the device has the latest firmware.'),
+    (AtlasScientificCalibrationPointNotAllowed, 400, 'CALIBRATION_POINT_NOT_ALLOWED',
+        'The calibration point can not be set next, please set one of the next calibration points of the device.'),
+    (SampleHistoryNotEnabledError, 400, 'SAMPLE_HISTORY_NOT_ENABLED',
+        'Samples are not being stored, so there is no sample history.'),
+    (SampleStreamLimitError, 503, 'TOO_MANY_SAMPLE_STREAMS',
+        'Too many sample streams are open, please poll for samples instead.'),
+    (AtlasScientificError, 500, 'UNKNOWN_ERROR',
+        'Unexpected error was encountered'),
+    (Exception, 500, 'UNEXPECTED_ERROR',
+        'Unexpected internal error occurred.'),
+]
 
-    device_error_model = self.model('device_error', {
-        'message': fields.String(
-            description='A description of the error encountered',
-            example='This is your error message'
-        ),
-        'error_code': fields.String(
-            description='The error code of the error encountered',
-            example='DEVICE_NOT_READY'
-        ),
-    })
+def describe_device_error(error):
+    for error_type, status_code, error_code, message in device_errors:
+        if isinstance(error, error_type):
+            return {
+                'error_code': error_code,
+                'message': message
+            }, status_code
 
-    def load_request(self, request):
-        try:
-            return self.load(request.json)
-        except ValidationError as err:
-            # make sure we don't leak any validation logic to the consumer
-            devices_api_log.error(f"Input validation error {err.normalized_messages()}")
-            raise RequestValidationError()
-    Schema.load_request = load_request
-
-    @self.errorhandler(RequestValidationError)
-    @self.marshal_with(device_error_model, code=400)
-    def handle_request_validation_error(error):
-        return {
-            'error_code': 'INVALID_REQUEST_ERROR', 
-            'message': "Request contains a missing or incorrectly formatted felid."
-        }, 400
+def load_validated(schema, data):
+    try:
+        return schema.load(data)
+    except ValidationError as err:
+        # make sure we don't leak any validation logic to the consumer
+        logging.getLogger('DeviceApiErrors').error(f"Input validation error {err.normalized_messages()}")
+        raise RequestValidationError()
 
-    @self.errorhandler(AtlasScientificDeviceNotYetSupported)
-    @self.marshal_with(device_error_model, code=400)
-    def handle_atlas_scientific_response_syntax_error(error):
-        return {
-            'error_code': 'UNSUPPORTED_DEVICE', 
-            'message': 'Detected unsupported atlas scientific device.'
-        }, 400
+def add_device_errors(self, models):
 
-    @self.errorhandler(AtlasScientificResponseSyntaxError)
-    @self.marshal_with(device_error_model, code=400)
-    def handle_atlas_scientific_response_syntax_error(error):
-        return {
-            'error_code': 'UNEXPECTED_DEVICE_RESPONSE', 
-            'message': 'Device responded but response was not recognizable.'
-        }, 400
+    def load_request(self, request):
+        return self.load_validated(request.json)
+    Schema.load_request = load_request
 
-    @self.errorhandler(AtlasScientificNoDeviceAtAddress)
-    @self.marshal_with(device_error_model, code=400)
-    def handle_atlas_scientific_no_device_at_address_error(error):
-        return {
-            'error_code': 'DEVICE_NOT_FOUND', 
-            'message': 'No device is connected to the given address.'
-        }, 400
+    def load_request_args(self, request):
+        return self.load_validated(request.args)
+    Schema.load_request_args = load_request_args
 
-    @self.errorhandler(AtlasScientificDeviceNotReadyError)
-    @self.marshal_with(device_error_model, code=400)
-    def handle_atlas_scientific_device_not_ready_error(error):
-        return {
-            'error_code': 'DEVICE_NOT_READY', 
-            'message': 'Device did not return the expected response in a timely mannor.'
-        }, 400
-   
-    @self.errorhandler(AtlasScientificSyntaxError)
-    @self.marshal_with(device_error_model, code=400)
-    def handle_atlas_scientific_syntax_error(error):
-        return {
-            'error_code': 'COMMAND_ERROR', 
-            'message': 'Device has rejected your request, please confrim the request is supported by the device and the device has the latest firmware.'
-        }, 400
+    Schema.load_validated = load_validated
 
-    @self.errorhandler(AtlasScientificError)
-    @self.marshal_with(device_error_model, code=500)
-    def handle_atlas_scientific_errors(error):
-        return {
-            'error_code': 'UNKNOWN_ERROR', 
-            'message': 'Unexpected error was encountered'
-        }, 500
+    def handle_device_error(error):
+        return describe_device_error(error)
 
-    @self.errorhandler(Exception)
-    @self.marshal_with(device_error_model, code=500)
-    def handle_atlas_scientific_errors(error):
-        return {
-            'error_code': 'UNEXPECTED_ERROR', 
-            'message': 'Unexpected internal error occurred.'
-        }, 500
+    for error_type, status_code, _, _ in device_errors:
+        handler = self.marshal_with(models.device_error, code=status_code)(handle_device_error)
+        self.errorhandler(error_type)(handler)
 
 Namespace.add_device_errors = add_device_errors
\ No newline at end of file
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+
+from .i2c import I2CTransaction, scan_addresses
+from .models import *
+from .polling import default_polling
+from .device import AtlasScientificDeviceBase, \
+    AtlasScientificDeviceBusBase, \
+    device_request_latency, \
+    encode_query, \
+    is_not_ready, \
+    get_readable_device, \
+    parse_response
+
+# The asyncio counterpart of AtlasScientificDeviceBus and AtlasScientificDevice.
+# Devices are given time to process requests with asyncio.sleep, and bus I/O is
+# handed to the bus scheduler thread, so requests waiting on a device don't hold a thread.
+
+class AsyncAtlasScientificDeviceBus(AtlasScientificDeviceBusBase):
+    def __init__(self, i2c_session_provider, device_polling=None, bus=None, device_registry=None, missing_device_ttl=60, rescan_interval=None):
+        super().__init__(i2c_session_provider, AsyncAtlasScientificDevice, device_polling, bus, device_registry, missing_device_ttl, rescan_interval)
+        self.connect_flights = AsyncSingleFlight()
+
+    async def scan_for_devices(self):
+        # only identifies devices at addresses which have started responding since the last scan
+        logging.info('Scaning for devices.')
+        ping_transactions = [I2CTransaction(address, ping=True) for address in scan_addresses]
+        ping_results = await transfer_all(self.i2c_session_provider, ping_transactions)
+        responding_addresses = [t.address for t, result in zip(ping_transactions, ping_results) if result is True]
+        identify_addresses = self._get_identify_addresses(responding_addresses)
+
+        # identify all new devices at once, so they process the 'i' query in parallel
+        devices = await asyncio.gather(
+            *(AsyncAtlasScientificDevice.identify(self.i2c_session_provider, address) for address in identify_addresses),
+            return_exceptions=True
+        )
+
+        self._complete_scan(responding_addresses, dict(zip(identify_addresses, devices)))
+        await self.__save_known_devices()
+
+    async def revalidate_known_devices(self):
+        # checks the restored devices are still on the bus, and reads their enabled outputs
+        await self.scan_for_devices()
+        for device in list(self.known_devices.values()):
+            try:
+                device._invalidate_output_measurements_cache()
+                await device.get_enabled_output_measurements()
+            except Exception as err:
+                logging.debug(f'Failed to read the outputs of device at address {device.address}, {err}')
+        await self.__save_known_devices()
+
+    async def get_known_devices(self):
+        self.__start_background_scan()
+        if len(self.known_devices) == 0:
+            await self.scan_for_devices()
+        return self.known_devices.values()
+
+    async def get_device_by_address(self, address):
+        address, device = self._get_known_device(address)
+        if device is None:
+            # concurrent requests for a device which isn't known yet share a single connection to it
+            device = await self.connect_flights.call(address, lambda: self.__connect(address))
+        return device
+
+    async def __connect(self, address):
+        try:
+            device = await AsyncAtlasScientificDevice.connect(self.i2c_session_provider, address)
+        except Exception as err:
+            self._add_connect_error(address, err)
+            raise err
+        self._add_connected_device(address, device)
+        await self.__save_known_devices()
+        return device
+
+    async def read_samples(self, addresses=None):
+        # Samples many devices at once.
+        # Returns the samples, or the error raised, for each address
+        if addresses is None:
+            addresses = [device.address for device in await self.get_known_devices()]
+
+        async def read_sample(address):
+            device = get_readable_device(await self.get_device_by_address(address))
+            return await device.read_sample([])
+
+        results = await asyncio.gather(*(read_sample(address) for address in addresses), return_exceptions=True)
+        return dict(zip(addresses, results))
+
+    def __start_background_scan(self):
+        if self._take_background_scan(self.revalidation is not None and not self.revalidation.done()):
+            self.revalidation = asyncio.ensure_future(self.__revalidate_known_devices())
+
+    async def __revalidate_known_devices(self):
+        try:
+            await self.revalidate_known_devices()
+        except Exception as err:
+            logging.warning(f'Failed to revalidate known devices, {err}')
+
+    async def __save_known_devices(self):
+        if self.device_registry:
+            await asyncio.get_running_loop().run_in_executor(None, self.device_registry.save, self.bus, self._get_registry_entries())
+
+class AsyncAtlasScientificDevice(AtlasScientificDeviceBase):
+    def __init__(self, i2c_session_provider, address, device_info):
+        super().__init__(address, device_info)
+        self.i2c_session_provider = i2c_session_provider
+        self.read_flights = AsyncSingleFlight()
+
+    @staticmethod
+    async def connect(i2c_session_provider, address):
+        device_log = logging.getLogger(f'I2CDevice[{address}]')
+
+        if not await transfer(i2c_session_provider, I2CTransaction(address, ping=True)):
+            raise AtlasScientificNoDeviceAtAddress
+
+        try:
+            # Try read device info,
+            # if it fails we assume the device vendor isn't atlas scientific
+            return await AsyncAtlasScientificDevice.identify(i2c_session_provider, address)
+        except AtlasScientificDeviceNotYetSupported as err:
+            device_log.info('Non supported atlas scientific device found.')
+            raise err
+        except Exception as err:
+            device_log.debug(f'Failed to connection device, {err}', )
+            device_log.info('non atlas scientific device found')
+            raise err
+
+    @staticmethod
+    async def identify(i2c_session_provider, address):
+        device_log = logging.getLogger(f'AtlasScientificDevice[{address}]')
+        result = await query_device(i2c_session_provider, address, 'i', device_request_latency, device_log)
+        return AsyncAtlasScientificDevice(i2c_session_provider, address, AtlasScientificDeviceInfo(result, address))
+
+    async def set_configuration_parameter(self, parameter_details):
+        await self.__query(self._get_configuration_query(parameter_details), self.device_request_latency)
+
+    async def get_enabled_output_measurements(self):
+        output_measurements = self._get_known_output_measurements()
+        if output_measurements is not None:
+            return output_measurements
+
+        # multi output device, read the device's current output
+        result = await self.__query('o,?', self.device_request_latency)
+        return self._set_current_output_measurements(AtlasScientificDeviceOutput(result))
+
+    async def set_enabled_output_measurements(self, units):
+        units_to_enable, units_to_disable = self._get_output_measurement_changes(units, await self.get_enabled_output_measurements())
+
+        for unit in units_to_enable:
+            self._invalidate_output_measurements_cache()
+            await self.__query(f'o,{unit},1', self.device_request_latency)
+
+        for unit in units_to_disable:
+            self._invalidate_output_measurements_cache()
+            await self.__query(f'o,{unit},0', self.device_request_latency)
+
+    async def read_sample(self, compensation_factors):
+        # concurrent reads of the same samples share a single device query
+        return await self.read_flights.call(
+            self._get_read_key(compensation_factors),
+            lambda: self.__read_sample(compensation_factors)
+        )
+
+    async def __read_sample(self, compensation_factors):
+        explicit_cf, read_query = self._get_read_queries(compensation_factors)
+
+        if explicit_cf:
+            await self.set_measurement_compensation_factors(explicit_cf)
+
+        output_units = await self.get_enabled_output_measurements()
+        result = await self.__query(read_query, self.capabilities.read.latency)
+        return AtlasScientificDeviceSample.from_expected_device_output(result, output_units)
+
+    async def set_measurement_compensation_factors(self, compensation_factors):
+
+        for compensation_factor in compensation_factors:
+            await self.__query(self._get_compensation_query(compensation_factor), self.device_request_latency)
+
+    async def set_calibration_point(self, calibration):
+        result = await self.__query(self._get_calibration_query(calibration), self.capabilities.calibration.latency)
+        self._set_calibration_state(calibration, result)
+        return result
+
+    async def __query(self, query, process_delay):
+        return await query_device(self.i2c_session_provider, self.address, query, process_delay, self.device_log, self.response_latencies, self.polling)
+
+class AsyncSingleFlight(object):
+    # Shares the result of a coroutine with every caller
+    # awaiting the same call while it is in flight
+    def __init__(self):
+        self.in_flight = {}
+
+    async def call(self, key, coroutine_fn):
+        task = self.in_flight.get(key, None)
+        if task is None:
+            task = asyncio.ensure_future(coroutine_fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+
+        # one caller being cancelled shouldn't cancel the call for the others
+        return await asyncio.shield(task)
+
+async def query_device(i2c_session_provider, address, query, process_delay, device_log, response_latencies=None, polling=default_polling):
+    query_bytes = encode_query(query, device_log)
+    expected_latency = response_latencies.get_expected_latency(query) if response_latencies else None
+
+    # Lock access to this device address to prevent
+    # interleaving of reads and writes
+    async with i2c_session_provider.acquire_async_access(address):
+        write = I2CTransaction(address, write_bytes=query_bytes, read=False)
+        await transfer(i2c_session_provider, write)
+
+        for wait_duration in polling.get_wait_durations(process_delay, expected_latency):
+            device_log.debug(f' WAIT :: {wait_duration}')
+            await asyncio.sleep(wait_duration)
+
+            read = I2CTransaction(address, status_only=polling.reads_status)
+            response_bytes = await transfer(i2c_session_provider, read)
+            if not is_not_ready(response_bytes):
+                # the time the device took to be ready, rather than the time planned to be waited
+                ready_after = read.read_at - write.written_at
+                if polling.reads_status:
+                    # only the status byte has been read
+                    response_bytes = await transfer(i2c_session_provider, I2CTransaction(address))
+
+                response = parse_response(response_bytes, device_log)
+                if response_latencies:
+                    response_latencies.observe(query, ready_after)
+                return response
+
+        raise AtlasScientificDeviceNotReadyError
+
+async def transfer(i2c_session_provider, transaction):
+    i2c_session_provider.submit([transaction])
+    return await asyncio.wrap_future(transaction.future)
+
+async def transfer_all(i2c_session_provider, transactions):
+    # transactions are submitted together, so they are carried out back to back
+    i2c_session_provider.submit(transactions)
+    return await asyncio.gather(
+        *(asyncio.wrap_future(t.future) for t in transactions),
+        return_exceptions=True
+    )
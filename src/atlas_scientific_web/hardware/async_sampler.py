@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import time
+
+from .sampler import AtlasScientificCachedSample, max_missed_sample_passes
+
+# The asyncio counterpart of AtlasScientificDeviceSampler's background sampling, caching and streaming.
+# Each streamed device is sampled by a single task, which fans out to all subscribers.
+
+class AsyncAtlasScientificSampleSubscription(object):
+    # Holds only the latest result published, so a slow
+    # subscriber skips samples rather than falling behind
+    def __init__(self):
+        self.result_event = asyncio.Event()
+        self.result = None
+        self.is_closed = False
+
+    def publish(self, result):
+        self.result = result
+        self.result_event.set()
+
+    def close(self):
+        self.is_closed = True
+        self.result_event.set()
+
+    async def get(self, timeout_seconds=None):
+        # returns the next samples, or error, published.
+        # None is returned when timed out or closed
+        try:
+            await asyncio.wait_for(self.result_event.wait(), timeout_seconds)
+        except asyncio.TimeoutError:
+            return None
+
+        if self.is_closed:
+            return None
+
+        self.result_event.clear()
+        return self.result
+
+class AsyncAtlasScientificSamplesSubscription(object):
+    # A subscription to the samples of many devices, holding only the latest
+    # result of each, so they can all be waited for together
+    def __init__(self):
+        self.result_event = asyncio.Event()
+        self.results = {}
+        self.is_closed = False
+        # address -> the device's part of the subscription, subscribed to its feed
+        self.device_subscriptions = {}
+
+    def publish(self, address, result):
+        self.results[address] = result
+        self.result_event.set()
+
+    def close(self):
+        self.is_closed = True
+        self.result_event.set()
+
+    async def get(self, timeout_seconds=None):
+        # returns the results published since the last get, keyed by address.
+        # None is returned when timed out or closed
+        try:
+            await asyncio.wait_for(self.result_event.wait(), timeout_seconds)
+        except asyncio.TimeoutError:
+            return None
+
+        if self.is_closed:
+            return None
+
+        self.result_event.clear()
+        results = self.results
+        self.results = {}
+        return results
+
+class AsyncAtlasScientificDeviceSubscription(object):
+    # A device's part of a subscription to many devices
+    def __init__(self, subscription, address):
+        self.subscription = subscription
+        self.address = address
+
+    def publish(self, result):
+        self.subscription.publish(self.address, result)
+
+    def close(self):
+        self.subscription.close()
+
+class AsyncAtlasScientificDeviceSampleFeed(object):
+    def __init__(self, device_sampler, address, sample_interval):
+        self.feed_log = logging.getLogger(f'AsyncAtlasScientificDeviceSampleFeed[{address}]')
+        self.device_sampler = device_sampler
+        self.address = address
+        self.sample_interval = sample_interval
+        self.subscriptions = set()
+        self.last_sample = None
+        self.feed_task = None
+
+    def subscribe(self, subscription=None):
+        subscription = subscription or AsyncAtlasScientificSampleSubscription()
+
+        # new subscribers don't need to wait for the next sample
+        if self.last_sample:
+            subscription.publish(self.last_sample.samples)
+
+        self.subscriptions.add(subscription)
+        if self.feed_task is None:
+            self.feed_task = asyncio.ensure_future(self.__run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        subscription.close()
+
+        if not self.subscriptions and self.feed_task:
+            self.feed_task.cancel()
+            self.feed_task = None
+
+    def stop(self):
+        for subscription in list(self.subscriptions):
+            self.unsubscribe(subscription)
+
+    def __publish(self, result):
+        for subscription in self.subscriptions:
+            subscription.publish(result)
+
+    async def __run(self):
+        while self.subscriptions:
+            started = time.monotonic()
+            try:
+                await self.device_sampler.read_sample(self.address, self.sample_interval)
+                cached_sample = self.device_sampler.get_cached_sample(self.address)
+                if cached_sample is not None and cached_sample is not self.last_sample:
+                    self.last_sample = cached_sample
+                    self.__publish(cached_sample.samples)
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                self.feed_log.warning(f'Failed to sample device, {err}')
+                self.__publish(err)
+
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0, self.sample_interval - elapsed))
+
+class AsyncAtlasScientificDeviceSampler(object):
+    def __init__(self, device_bus, sample_interval=None, stream_interval=1, sample_store=None, recent_samples=None):
+        self.sampler_log = logging.getLogger('AsyncAtlasScientificDeviceSampler')
+        self.device_bus = device_bus
+        self.cache = {}
+        # keeps every sample read, when given
+        self.sample_store = sample_store
+        # keeps the latest samples read in memory, when given
+        self.recent_samples = recent_samples
+
+        # seconds between the start of each sampling pass,
+        # None disables background sampling
+        self.sample_interval = sample_interval
+        self.sampler_task = None
+
+        # seconds between each sample sent to subscribers of a device
+        self.stream_interval = stream_interval
+        self.feeds = {}
+        # subscriptions to many devices which also subscribe to each device found later
+        self.new_device_subscriptions = set()
+
+    @property
+    def is_running(self):
+        return self.sampler_task is not None and not self.sampler_task.done()
+
+    def start(self):
+        if self.sample_interval is None or self.is_running:
+            return
+
+        self.sampler_log.info(f'Starting background sampling every {self.sample_interval} seconds.')
+        self.sampler_task = asyncio.ensure_future(self.__run())
+
+    def stop(self):
+        if self.sampler_task:
+            self.sampler_task.cancel()
+        self.sampler_task = None
+
+        for feed in self.feeds.values():
+            feed.stop()
+
+    def subscribe(self, address, subscription=None):
+        feed = self.feeds.get(address, None)
+        if feed is None:
+            feed = AsyncAtlasScientificDeviceSampleFeed(self, address, self.stream_interval)
+            self.feeds[address] = feed
+        return feed.subscribe(subscription)
+
+    def subscribe_all(self, addresses, follow_new_devices=False):
+        # subscribes to many devices at once, sampled by the same feeds as each device's subscribers.
+        # When following new devices, each device found afterwards is subscribed to as well
+        subscription = AsyncAtlasScientificSamplesSubscription()
+        if follow_new_devices:
+            self.new_device_subscriptions.add(subscription)
+        for address in addresses:
+            self.__subscribe_device(subscription, address)
+        return subscription
+
+    def unsubscribe_all(self, subscription):
+        self.new_device_subscriptions.discard(subscription)
+        for address, device_subscription in list(subscription.device_subscriptions.items()):
+            self.unsubscribe(address, device_subscription)
+
+    def __subscribe_device(self, subscription, address):
+        if address not in subscription.device_subscriptions:
+            subscription.device_subscriptions[address] = self.subscribe(address, AsyncAtlasScientificDeviceSubscription(subscription, address))
+
+    def unsubscribe(self, address, subscription):
+        feed = self.feeds.get(address, None)
+        if feed:
+            feed.unsubscribe(subscription)
+
+    def get_cached_sample(self, address):
+        return self.cache.get(address, None)
+
+    def forget_cached_sample(self, address):
+        self.cache.pop(address, None)
+
+    def on_device_changed(self, event, device):
+        # samples of a device which has been removed aren't served
+        if event == 'removed':
+            self.forget_cached_sample(device.bus_address)
+        elif event == 'added':
+            for subscription in list(self.new_device_subscriptions):
+                self.__subscribe_device(subscription, device.bus_address)
+
+    async def read_sample(self, address, max_age=None):
+        cached_sample = self.get_cached_sample(address)
+        if cached_sample and self.__is_fresh_enough(cached_sample, max_age):
+            return cached_sample.samples
+
+        device = await self.device_bus.get_device_by_address(address)
+        samples = await device.read_sample([])
+        await self.__cache_sample(address, samples)
+        return samples
+
+    async def __cache_sample(self, address, samples):
+        self.cache[address] = AtlasScientificCachedSample(samples, time.monotonic())
+
+        if self.recent_samples:
+            self.recent_samples.append(address, samples)
+
+        if self.sample_store:
+            # appending may write a block of samples to the SD card, so mustn't block the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.__store_samples, address, samples)
+
+    def __is_fresh_enough(self, cached_sample, max_age):
+        if max_age is not None:
+            return cached_sample.age(time.monotonic()) <= max_age
+
+        # With no explicit limit, only trust the cache while the background
+        # sampler is keeping it up to date, otherwise every request reads the device
+        return self.is_running and cached_sample.age(time.monotonic()) <= self.sample_interval * max_missed_sample_passes
+
+    async def __run(self):
+        while True:
+            pass_started = time.monotonic()
+
+            try:
+                # sample every device at once, so a pass only takes as long as the slowest device
+                results = await self.device_bus.read_samples()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                self.sampler_log.warning(f'Failed to sample known devices, {err}')
+                results = {}
+
+            for address, result in results.items():
+                if isinstance(result, Exception):
+                    # don't serve samples from a device which has stopped responding
+                    self.sampler_log.warning(f'Failed to sample device at address {address}, {result}')
+                    self.forget_cached_sample(address)
+                else:
+                    await self.__cache_sample(address, result)
+
+            elapsed = time.monotonic() - pass_started
+            await asyncio.sleep(max(0, self.sample_interval - elapsed))
+
+    def __store_samples(self, address, samples):
+        try:
+            self.sample_store.append(address, samples)
+        except Exception as err:
+            self.sampler_log.error(f'Failed to store samples of device at address {address}, {err}')
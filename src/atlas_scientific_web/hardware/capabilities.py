@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 from .models import AtlasScientificDeviceNotYetSupported, ExpectedValueType
 
 device_capabilities = {
@@ -349,13 +351,37 @@ device_capabilities = {
     },
 }
 
+# compiled once per device type, and shared by every device of the type
+compiled_device_capabilities = {}
+
 def get_device_capabilities(device_type):
-    caps = device_capabilities.get(device_type, None)
-    if not caps:
-        raise AtlasScientificDeviceNotYetSupported
-    return DeviceCapabilities(caps)
+    capabilities = compiled_device_capabilities.get(device_type, None)
+    if capabilities is None:
+        caps = device_capabilities.get(device_type, None)
+        if not caps:
+            raise AtlasScientificDeviceNotYetSupported
+        # compiling a type twice at once is harmless, the first compiled is kept
+        capabilities = compiled_device_capabilities.setdefault(device_type, DeviceCapabilities(caps))
+    return capabilities
+
+class FrozenCapabilities(object):
+    # capabilities are shared by every device of a type, so can't be changed once compiled
+    __slots__ = ('frozen',)
+
+    def __setattr__(self, name, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError(f"can't set {name}, {type(self).__name__} is shared by every device of a type")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"can't delete {name}, {type(self).__name__} is shared by every device of a type")
+
+    def freeze(self):
+        self.frozen = True
+
+class DeviceCapabilities(FrozenCapabilities): 
+    __slots__ = ('read', 'compensation', 'calibration', 'configuration')
 
-class DeviceCapabilities(object): 
     def __init__(self, capabilities_dict):
 
         if "read" in capabilities_dict:
@@ -378,14 +404,21 @@ class DeviceCapabilities(object):
         else:
             self.configuration = None
 
-class ReadCapabilities(object): 
+        self.freeze()
+
+class ReadCapabilities(FrozenCapabilities): 
+    __slots__ = ('latency', 'output', 'output_by_unit_code')
+
     def __init__(self, capabilities_dict):
         # use default of 0.9 second if not defined 
         self.latency = capabilities_dict.get("latency", 0.9)
-        self.output = list(MessureCapability(unit) for unit in capabilities_dict.get("output", []))
-        
+        self.output = tuple(MessureCapability(unit) for unit in capabilities_dict.get("output", []))
+        self.output_by_unit_code = MappingProxyType({u.unit_code:u for u in self.output})
+        self.freeze()
+
+class MessureCapability(FrozenCapabilities): 
+    __slots__ = ('unit', 'value_type', 'symbol', 'unit_code')
 
-class MessureCapability(object): 
     def __init__(self, capabilities_dict):
         self.unit = capabilities_dict.get("unit", "")
         self.value_type = capabilities_dict.get("value_type", "")
@@ -397,13 +430,19 @@ class MessureCapability(object):
 
         # {x},? request always returns units in upper case
         self.unit_code = capabilities_dict.get("unit_code", self.symbol).upper()
+        self.freeze()
+
+class CompensationCapabilities(FrozenCapabilities): 
+    __slots__ = ('factors',)
 
-class CompensationCapabilities(object): 
     def __init__(self, compensation_dict):
         factors = (CompensationCapability(unit) for unit in compensation_dict)
-        self.factors = {f.factor:f for f in factors}
+        self.factors = MappingProxyType({f.factor:f for f in factors})
+        self.freeze()
+
+class CompensationCapability(FrozenCapabilities): 
+    __slots__ = ('factor', 'command', 'query_prefix', 'value_type', 'symbol', 'unit')
 
-class CompensationCapability(object): 
     def __init__(self, compensation_dict):
 
         # TODO: throw error when this value is missing
@@ -411,6 +450,7 @@ class CompensationCapability(object):
 
         # TODO: throw error when this value is missing
         self.command = compensation_dict.get("command", "")
+        self.query_prefix = f'{self.command},'
     
         # default to string if not set, as this is a safe to parse
         # and could end up working with the device query by chance 
@@ -418,30 +458,67 @@ class CompensationCapability(object):
 
         self.symbol = compensation_dict.get("symbol", "")
         self.unit = compensation_dict.get("unit", "")
+        self.freeze()
+
+class CalibrationCapabilities(FrozenCapabilities): 
+    __slots__ = ('latency', 'start_points', 'points', 'points_by_id', 'next_points_by_id')
 
-class CalibrationCapabilities(object): 
     def __init__(self, capabilities_dict):
         # use default of 0.9 second if not defined 
         self.latency = capabilities_dict.get("latency", 0.9) 
-        self.start_points = capabilities_dict.get("start_points", [])
-        self.points = list(CalibrationCapability(cal) for cal in capabilities_dict.get("points", []))
+        self.start_points = tuple(capabilities_dict.get("start_points", []))
+        self.points = tuple(CalibrationCapability(cal) for cal in capabilities_dict.get("points", []))
+        # points are requested case insensitively
+        self.points_by_id = MappingProxyType({p.id.lower():p for p in self.points})
+
+        # the points which may be set after each point, by id. A calibration can always be started again
+        start_points = self.__get_points(self.start_points)
+        self.next_points_by_id = MappingProxyType({
+            p.id.lower(): MappingProxyType({n.id.lower():n for n in self.__get_points(p.next_points) + start_points}) for p in self.points
+        })
+        self.freeze()
+
+    def get_next_points(self, point_id):
+        # the points which may be set after the point last set, by id.
+        # Every point when none has been set, as the device may have been part way through calibrating
+        if point_id is None:
+            return self.points_by_id
+        return self.next_points_by_id[point_id.lower()]
+
+    def __get_points(self, point_ids):
+        # 'Complete' marks where a calibration may end, so isn't a point
+        return tuple(self.points_by_id[i.lower()] for i in point_ids if i.lower() in self.points_by_id)
+
+class CalibrationCapability(FrozenCapabilities): 
+    __slots__ = ('id', 'description', 'value_type', 'sub_command', 'command', 'next_points', 'is_complete')
 
-class CalibrationCapability(object): 
     def __init__(self, capabilities_dict):
         self.id = capabilities_dict.get("id")
         self.description = capabilities_dict.get("description", "")
         self.value_type = ExpectedValueType(capabilities_dict.get("value_type"))
         self.sub_command = capabilities_dict.get("sub_command")
-        self.next_points = capabilities_dict.get("next_points", [])
+        # such as 'Cal' or 'Cal,mid', the value is appended when the point has one
+        self.command = f'Cal,{self.sub_command}' if self.sub_command else 'Cal'
+        self.next_points = tuple(capabilities_dict.get("next_points", []))
+        # if the device is calibrated once this point is set
+        self.is_complete = any(p.lower() == 'complete' for p in self.next_points)
+        self.freeze()
+
+class ConfigurationCapabilities(FrozenCapabilities): 
+    __slots__ = ('parameters',)
 
-class ConfigurationCapabilities(object): 
     def __init__(self, capabilities_dict):
         parameters = (ConfigurationCapability(p) for p in capabilities_dict)
-        self.parameters = {p.parameter:p for p in parameters}
+        self.parameters = MappingProxyType({p.parameter:p for p in parameters})
+        self.freeze()
+
+class ConfigurationCapability(FrozenCapabilities): 
+    __slots__ = ('parameter', 'description', 'value_type', 'command', 'query_prefix')
 
-class ConfigurationCapability(object): 
     def __init__(self, capabilities_dict):
         self.parameter = capabilities_dict["parameter"].lower()
         self.description = capabilities_dict["description"]
         self.value_type = ExpectedValueType(capabilities_dict["value_type"])
         self.command = capabilities_dict["command"].lower()
+        self.query_prefix = f'{self.command},'
+        self.freeze()
@@ -1,86 +1,354 @@
 import logging
+import threading
 import time
 import sys
 
+from collections import deque
+from concurrent.futures import Future
+from contextlib import ExitStack
 from datetime import datetime, timezone
-from .i2c import I2CBusIo, I2CSessionProvider
+from .i2c import I2CBusIo, I2CSessionProvider, scan_addresses
 from .models import *
 from .capabilities import get_device_capabilities
+from .polling import default_polling, get_polling_strategy, get_wait_durations
+from .multi_bus import format_bus_address, parse_bus_address
 import sys
 
-class AtlasScientificDeviceBus(object):
-    def __init__(self, i2c_session_provider):
+class AtlasScientificDeviceBusBase(object):
+    # Everything about a bus of devices which doesn't involve talking to it, shared by the
+    # threaded AtlasScientificDeviceBus and the asyncio AsyncAtlasScientificDeviceBus
+    def __init__(self, i2c_session_provider, device_class, device_polling=None, bus=None, device_registry=None, missing_device_ttl=60, rescan_interval=None):
         self.i2c_session_provider = i2c_session_provider
+        self.device_class = device_class
         self.known_devices = {}
+        # the addresses identified by the last scan, and the error of each which isn't a supported device
+        self.present_addresses = set()
+        self.unsupported_devices = {}
+        # addresses which recently had no supported device, so requests for them don't use the bus
+        self.missing_devices = AtlasScientificMissingDevices(missing_device_ttl)
+        # how often the bus is rescanned in the background for plugged in or removed devices, None never rescans
+        self.rescan_interval = rescan_interval
+        self.last_scan = None
+        # called with 'added' or 'removed', and the device, as devices are found and removed
+        self.device_listeners = []
+        # the bus number, when devices are addressed as bus:address across many buses
+        self.bus = bus
+        # the polling strategy of each device type, all others use the default
+        self.device_polling = get_device_polling(device_polling)
+        # saves the known devices, so they're known straight after a restart
+        self.device_registry = device_registry
+        self.revalidation = None
+        self.revalidation_pending = False
+        if device_registry:
+            self.__restore_known_devices()
+
+    def add_device_listener(self, listener):
+        self.device_listeners.append(listener)
 
     def forget_known_devices(self):
         logging.info('Forgeting known devices.')
         self.known_devices = {}
+        # so every device is identified again by the next scan
+        self.present_addresses = set()
+
+    def _get_identify_addresses(self, responding_addresses):
+        # the responding addresses which weren't identified by the last scan, so may have a different device
+        return [address for address in responding_addresses if address not in self.present_addresses]
+
+    def _complete_scan(self, responding_addresses, identified_devices):
+        # identified_devices holds the device, or the error raised, of each address identified by the scan.
+        # Known devices which still respond are kept, along with everything cached of them
+        unchanged_addresses = set(responding_addresses) - set(identified_devices)
+        known_devices = {address: device for address, device in self.known_devices.items() if address in unchanged_addresses}
+        unsupported_devices = {address: err for address, err in self.unsupported_devices.items() if address in unchanged_addresses}
+        failed_addresses = set()
+
+        for address, device in identified_devices.items():
+            if isinstance(device, AtlasScientificDeviceNotYetSupported):
+                logging.info(f'Non supported atlas scientific device found at address {address}.')
+                unsupported_devices[address] = device
+            elif isinstance(device, unsupported_device_errors):
+                logging.debug(f'Failed to connect device at address {address}, {device}')
+                logging.info(f'non atlas scientific device found at address {address}')
+                unsupported_devices[address] = device
+            elif isinstance(device, Exception):
+                # such as a busy device, or a bus error, so it's identified again by the next scan.
+                # A known device is kept until then
+                logging.info(f'Failed to identify device at address {address}, {device}')
+                failed_addresses.add(address)
+                if address in self.known_devices:
+                    known_devices[address] = self.known_devices[address]
+            else:
+                known_devices[address] = self._prepare_device(keep_known_device(self.known_devices.get(address, None), device))
+
+        self.present_addresses = (set(known_devices) | set(unsupported_devices)) - failed_addresses
+        self.unsupported_devices = unsupported_devices
+        self.missing_devices.replace(get_missing_device_errors(responding_addresses, unsupported_devices))
+        self.last_scan = time.monotonic()
+        self._replace_known_devices(known_devices)
+
+    def _get_known_device(self, address):
+        # the known device at a plain or bus:address address, None when it must be connected.
+        # Raises the error of an address which recently had no supported device
+        address = get_bus_device_address(self.bus, address)
+        device = self.known_devices.get(address, None)
+        if device is None:
+            missing_device_error = self.missing_devices.get(address)
+            if missing_device_error:
+                raise missing_device_error
+        return address, device
+
+    def _add_connected_device(self, address, device):
+        known_devices = dict(self.known_devices)
+        known_devices[address] = self._prepare_device(device)
+        self._replace_known_devices(known_devices)
+        return device
+
+    def _add_connect_error(self, address, err):
+        # a device which is busy, or a bus error, is tried again by the next request
+        if isinstance(err, missing_device_errors):
+            self.missing_devices.add(address, err)
+
+    def _prepare_device(self, device):
+        device_info = device.get_device_info()
+        device.polling = self.device_polling.get(device_info.device_type.lower(), default_polling)
+        device.bus = self.bus
+        logging.debug(f'{device_info.device_type} device found at address {device_info.address}')
+        return device
+
+    def _replace_known_devices(self, known_devices):
+        # replaced at once, so the previously known devices are listed until a scan is done
+        added_devices, removed_devices = get_device_changes(self.known_devices, known_devices)
+        self.known_devices = known_devices
+        notify_device_listeners(self.device_listeners, added_devices, removed_devices)
+
+    def _take_background_scan(self, is_scanning):
+        # whether to revalidate restored devices, or rescan for plugged in or removed devices,
+        # in the background so the known devices can be used in the meantime
+        if not (self.revalidation_pending or is_rescan_due(self.rescan_interval, self.last_scan)):
+            return False
+        if is_scanning:
+            return False
+        self.revalidation_pending = False
+        return True
+
+    def _get_registry_entries(self):
+        return [device.get_registry_entry() for device in self.known_devices.values()]
+
+    def __restore_known_devices(self):
+        devices = restore_known_devices(self.device_class, self.i2c_session_provider, self.device_registry, self.bus)
+        self.known_devices = {device.address: self._prepare_device(device) for device in devices}
+        # the bus may have changed while the service was stopped, so restored devices are checked once used
+        self.revalidation_pending = len(devices) != 0
+
+class AtlasScientificDeviceBus(AtlasScientificDeviceBusBase):
+    def __init__(self, i2c_session_provider, device_polling=None, bus=None, device_registry=None, missing_device_ttl=60, rescan_interval=None):
+        super().__init__(i2c_session_provider, AtlasScientificDevice, device_polling, bus, device_registry, missing_device_ttl, rescan_interval)
+        self.revalidation_lock = threading.Lock()
 
     def scan_for_devices(self):
+        # Pings every address, as its cheap, then only identifies devices at addresses which
+        # have started responding since the last scan
         logging.info('Scaning for devices.')
-        self.forget_known_devices()
+        responding_addresses = self.i2c_session_provider.ping_all(scan_addresses)
+        identify_addresses = self._get_identify_addresses(responding_addresses)
+
+        # identify all new devices at once so they process the 'i' query in parallel
+        responses = self.__query_devices({address: 'i' for address in identify_addresses}, get_wait_durations(device_request_latency))
 
-        for address in range(0, 128):
+        identified_devices = {}
+        for address, response in responses.items():
             try:
-                self.__connect_device(address)
-            except Exception:
-                pass
+                if isinstance(response, Exception):
+                    raise response
+                identified_devices[address] = AtlasScientificDevice(self.i2c_session_provider, address, AtlasScientificDeviceInfo(response, address))
+            except Exception as err:
+                identified_devices[address] = err
+
+        self._complete_scan(responding_addresses, identified_devices)
+        self.__save_known_devices()
+
+    def revalidate_known_devices(self):
+        # checks the restored devices are still on the bus, and reads their enabled outputs
+        self.scan_for_devices()
+        for device in list(self.known_devices.values()):
+            try:
+                device._invalidate_output_measurements_cache()
+                device.get_enabled_output_measurements()
+            except Exception as err:
+                logging.debug(f'Failed to read the outputs of device at address {device.address}, {err}')
+        self.__save_known_devices()
 
     def get_known_devices(self):
+        self.__start_background_scan()
         if len(self.known_devices) == 0:
             self.scan_for_devices()
         return self.known_devices.values()
 
     def get_device_by_address(self, address):
-        device = self.known_devices.get(address, None)
+        address, device = self._get_known_device(address)
         if device is None:
             return self.__connect_device(address)
         return device
 
+    def read_samples(self, addresses=None):
+        # Samples many devices at once, by writing 'r' to every device and reading
+        # all responses after waiting for the slowest device.
+        # Returns the samples, or the error raised, for each address
+        results = {}
+        devices = {}
+
+        if addresses is None:
+            addresses = [device.address for device in self.get_known_devices()]
+
+        for address in addresses:
+            try:
+                device = get_readable_device(self.get_device_by_address(address))
+                devices[address] = (device, device.get_enabled_output_measurements())
+            except Exception as err:
+                results[address] = err
+
+        if devices:
+            # wait for the slowest device, and only use learnt latencies once known for every device
+            process_delay = max(device.capabilities.read.latency for device, _ in devices.values())
+            expected_latencies = [device.response_latencies.get_expected_latency('r') for device, _ in devices.values()]
+            expected_latency = None if None in expected_latencies else max(expected_latencies)
+
+            # devices can only be polled together when they're polled the same way
+            pollings = set(device.polling for device, _ in devices.values())
+            polling = pollings.pop() if len(pollings) == 1 else default_polling
+
+            responses = self.__query_devices(
+                {address: 'r' for address in devices},
+                polling.get_wait_durations(process_delay, expected_latency),
+                {address: device.response_latencies for address, (device, _) in devices.items()},
+                polling.reads_status
+            )
+
+            for address, (device, output_units) in devices.items():
+                try:
+                    response = responses[address]
+                    if isinstance(response, Exception):
+                        raise response
+                    results[address] = AtlasScientificDeviceSample.from_expected_device_output(response, output_units)
+                except Exception as err:
+                    results[address] = err
+
+        return results
+
     def __connect_device(self, address):
-        device = AtlasScientificDevice.connect(self.i2c_session_provider, address)
-        device_info = device.get_device_info()
-        logging.debug(f'{device_info.device_type} device found at address {device_info.address}')
-        self.known_devices[address] = device
+        try:
+            device = AtlasScientificDevice.connect(self.i2c_session_provider, address)
+        except Exception as err:
+            self._add_connect_error(address, err)
+            raise err
+
+        self._add_connected_device(address, device)
+        self.__save_known_devices()
         return device
 
-class AtlasScientificDevice(object):
-    def __init__(self, i2c_session_provider, address):
+    def __start_background_scan(self):
+        with self.revalidation_lock:
+            if not self._take_background_scan(self.revalidation is not None and self.revalidation.is_alive()):
+                return
+            self.revalidation = threading.Thread(target=self.__revalidate_known_devices, name='AtlasScientificDeviceRevalidation', daemon=True)
+            self.revalidation.start()
+
+    def __revalidate_known_devices(self):
+        try:
+            self.revalidate_known_devices()
+        except Exception as err:
+            logging.warning(f'Failed to revalidate known devices, {err}')
+
+    def __save_known_devices(self):
+        if self.device_registry:
+            self.device_registry.save(self.bus, self._get_registry_entries())
+
+    def __query_devices(self, queries, wait_durations, response_latencies=None, reads_status=False):
+        # Submits each query to its device back to back, so every device processes
+        # its query at the same time, then reads the responses as they become ready.
+        # Returns the response, or the error raised, for each address
+        responses = {}
+        # the time each query was written, and each device was read as ready
+        written_at = {}
+        read_at = {}
+
+        with ExitStack() as stack:
+            # Lock all devices in address order to avoid deadlocking with other pipelined queries
+            pending = {}
+            for address in sorted(queries):
+                i2c_session = stack.enter_context(self.i2c_session_provider.acquire_access(address))
+                device_log = logging.getLogger(f'AtlasScientificDevice[{address}]')
+                pending[address] = (i2c_session, device_log, encode_query(queries[address], device_log))
 
+            for wait_duration in wait_durations:
+                if not pending:
+                    break
+
+                logging.debug(f' WAIT :: {wait_duration}')
+                transactions = {}
+                for address, (i2c_session, _, query_bytes) in pending.items():
+                    transactions[address] = i2c_session.create_transaction(query_bytes, wait_duration, reads_status)
+                self.i2c_session_provider.submit(list(transactions.values()))
+
+                ready_transactions = {}
+                for address, transaction in transactions.items():
+                    i2c_session, device_log, _ = pending[address]
+                    try:
+                        response_bytes = transaction.future.result()
+                        written_at.setdefault(address, transaction.written_at)
+                        if is_not_ready(response_bytes):
+                            # the query is still being processed, so only read again
+                            pending[address] = (i2c_session, device_log, None)
+                            continue
+                        read_at[address] = transaction.read_at
+                        ready_transactions[address] = transaction
+                    except Exception as err:
+                        responses[address] = err
+                        del pending[address]
+
+                if reads_status and ready_transactions:
+                    # only the status byte has been read, so read the full response of every ready device
+                    ready_transactions = {address: pending[address][0].create_transaction(None, 0) for address in ready_transactions}
+                    self.i2c_session_provider.submit(list(ready_transactions.values()))
+
+                for address, transaction in ready_transactions.items():
+                    _, device_log, _ = pending.pop(address)
+                    try:
+                        response = parse_response(transaction.future.result(), device_log)
+                        if response_latencies and address in response_latencies:
+                            response_latencies[address].observe(queries[address], read_at[address] - written_at[address])
+                        responses[address] = response
+                    except Exception as err:
+                        responses[address] = err
+
+            for address in pending:
+                responses[address] = AtlasScientificDeviceNotReadyError()
+
+        return responses
+
+class AtlasScientificDeviceBase(object):
+    # Everything about a device which doesn't involve talking to it, shared
+    # by the threaded AtlasScientificDevice and the asyncio AsyncAtlasScientificDevice
+    def __init__(self, address, device_info):
         self.device_log = logging.getLogger(f'AtlasScientificDevice[{address}]')
-        self.i2c_session_provider = i2c_session_provider
         self.address = address
-        self.device_request_latency = 0.3
-        self.device_info = None
+        self.device_request_latency = device_request_latency
+        self.device_info = device_info
         self.current_output_measurements = None
-        self.capabilities = None
-        self.__connect()
+        self.capabilities = get_device_capabilities(device_info.device_type)
+        self.response_latencies = AtlasScientificResponseLatencies()
+        self.polling = default_polling
+        # the id of the calibration point last set, None until one is set as the device's own state isn't known
+        self.calibration_state = None
 
-    def __connect(self):
-        self.device_info = self.__query_i()
-        self.capabilities = get_device_capabilities(self.device_info.device_type)
+    # the bus number, when devices are addressed as bus:address across many buses
+    bus = None
 
-    @staticmethod
-    def connect(i2c_session_provider, address):
-        device_log = logging.getLogger(f'I2CDevice[{address}]')
-
-        with i2c_session_provider.acquire_access(address) as i2c_session:
-
-            if not i2c_session.ping():
-                raise AtlasScientificNoDeviceAtAddress
-
-            try:
-                # Try read device info,
-                # if it fails we assume the device vendor isn't atlas scientific
-                return AtlasScientificDevice(i2c_session_provider, address)
-            except AtlasScientificDeviceNotYetSupported as err:
-                device_log.info('Non supported atlas scientific device found.')
-                raise err
-            except Exception as err:
-                device_log.debug(f'Failed to connection device, {err}', )
-                device_log.info('non atlas scientific device found')
-                raise err
+    @property
+    def bus_address(self):
+        # the address of the device used by the api
+        return format_bus_address(self.bus, self.address)
 
     def get_device_info(self):
         return self.device_info
@@ -96,22 +364,27 @@ class AtlasScientificDevice(object):
             return self.capabilities.read.output
         return []
 
+    def _get_read_key(self, compensation_factors):
+        # reads with the same compensation factors would return the same samples
+        return tuple((cf.factor.lower(), cf.symbol, cf.value) for cf in compensation_factors)
+
     def get_supported_calibration_points(self):
         if self.capabilities.calibration:
             return self.capabilities.calibration.points
         return []
 
+    def get_next_calibration_points(self):
+        if self.capabilities.calibration:
+            return list(self.capabilities.calibration.get_next_points(self.calibration_state).values())
+        return []
+
     def get_supported_configuration_parameters(self):
         if self.capabilities.configuration:
             return self.capabilities.configuration.parameters
         return {}
 
-    def set_configuration_parameter(self, parameter_details):
-        parameter = self.__get_configuration_parameter(parameter_details)
-        value = parameter.value_type.validate_is_of_type(parameter_details.value)
-        self.__query(f'{parameter.command},{value}', self.device_request_latency)
-
-    def get_enabled_output_measurements(self):
+    def _get_known_output_measurements(self):
+        # returns None when the device must be asked for its current output
         if self.current_output_measurements != None:
             return self.current_output_measurements
 
@@ -123,22 +396,34 @@ class AtlasScientificDevice(object):
         elif len(self.capabilities.read.output) <= 1:
             self.current_output_measurements = self.get_supported_output_measurements()
 
-        # multi output device
-        else:
-            supported_unit_codes = {u.unit_code:u for u in self.get_supported_output_measurements()}
-            
-            # Read the device's current output
-            result = self.__query_o()
+        return self.current_output_measurements
+
+    def _set_current_output_measurements(self, device_output):
+        return self._set_current_output_units(device_output.units)
 
-            # order must be presserved as this is the same order the device will list the values back with the 'r' command
-            self.current_output_measurements = list([u for u in [supported_unit_codes.get(ui.upper(), None) for ui in result.units] if u])
+    def _set_current_output_units(self, units):
+        supported_unit_codes = self.capabilities.read.output_by_unit_code if self.capabilities.read else {}
 
+        # order must be presserved as this is the same order the device will list the values back with the 'r' command
+        self.current_output_measurements = list([u for u in [supported_unit_codes.get(ui.upper(), None) for ui in units] if u])
         return self.current_output_measurements
 
-    def set_enabled_output_measurements(self, units):
+    def get_registry_entry(self):
+        # what the device registry saves of the device, enabled outputs are None when not yet known
+        device_info = self.get_device_info()
+        output_measurements = self._get_known_output_measurements()
+        return {
+            'bus': self.bus,
+            'address': self.address,
+            'device_type': device_info.device_type,
+            'version': device_info.version,
+            'output_units': None if output_measurements is None else [m.unit_code for m in output_measurements],
+        }
+
+    def _get_output_measurement_changes(self, units, current_enabled_outputs):
         # find all the measurements which currently are enabled, and need to be disabled
-        supported_units = set(m.unit_code for m in self.get_supported_output_measurements())
-        current_enabled_units = set(m.unit_code for m in self.get_enabled_output_measurements())
+        supported_units = self.capabilities.read.output_by_unit_code.keys()
+        current_enabled_units = set(m.unit_code for m in current_enabled_outputs)
         requested_units_to_enable = set((u.upper() for u in units))
 
         units_to_disable = current_enabled_units - requested_units_to_enable
@@ -148,14 +433,10 @@ class AtlasScientificDevice(object):
         if len(unsupported_units) != 0:
             raise RequestValidationError
 
-        for unit in units_to_enable:
-            self.__query_o_enable(unit)
+        return units_to_enable, units_to_disable
 
-        for unit in units_to_disable:
-            self.__query_o_disable(unit)
-        
-    def read_sample(self, compensation_factors):
-        
+    def _get_read_queries(self, compensation_factors):
+        # returns the compensation factors which must be set before reading, and the read query
         explicit_cf = []
         temperature_cf = None
 
@@ -168,44 +449,51 @@ class AtlasScientificDevice(object):
             else:
                 explicit_cf.append(cf)
 
-        if explicit_cf:
-            self.set_measurement_compensation_factors(explicit_cf)
-
         if temperature_cf:
-            factor = self.__get_measurement_compensation_factor(temperature_cf)
+            factor = self._get_measurement_compensation_factor(temperature_cf)
             value = factor.value_type.validate_is_of_type(temperature_cf.value)
-
-            return self.__query_rt(value)
+            return explicit_cf, f'rt,{value}'
         else:
-            return self.__query_r()
+            return explicit_cf, 'r'
 
-    def set_measurement_compensation_factors(self, compensation_factors):
+    def _get_compensation_query(self, compensation_factor):
+        factor = self._get_measurement_compensation_factor(compensation_factor)
+        value = factor.value_type.validate_is_of_type(compensation_factor.value)
+        return f'{factor.query_prefix}{value}'
 
-        for compensation_factor in compensation_factors:
-            factor = self.__get_measurement_compensation_factor(compensation_factor)
-            value = factor.value_type.validate_is_of_type(compensation_factor.value)
+    def _get_configuration_query(self, parameter_details):
+        parameter = self._get_configuration_parameter(parameter_details)
+        value = parameter.value_type.validate_is_of_type(parameter_details.value)
+        return f'{parameter.query_prefix}{value}'
 
-            self.__query(f'{factor.command},{value}', self.device_request_latency)
+    def _get_calibration_query(self, calibration):
+        if not self.capabilities.calibration:
+            raise RequestValidationError
 
-    def set_calibration_point(self, calibration):
-        points = self.get_supported_calibration_points()
-        
-        cal_point = next((p for p in points if insensitive_eq(p.id, calibration.point)), None)
+        cal_point = self.capabilities.calibration.points_by_id.get(calibration.point.lower(), None)
         
         if not cal_point:
             raise RequestValidationError
 
-        cal_request = 'Cal'
-        if cal_point.sub_command:
-            cal_request = f"{cal_request},{cal_point.sub_command}"
+        # rejected before the device is sent a calibration it would refuse
+        if cal_point.id.lower() not in self.capabilities.calibration.get_next_points(self.calibration_state):
+            raise AtlasScientificCalibrationPointNotAllowed
+
+        cal_request = cal_point.command
 
         if not cal_point.value_type.is_none:
             value = cal_point.value_type.validate_is_of_type(calibration.actual_value)
             cal_request = f"{cal_request},{value}"
 
-        return self.__query(cal_request, self.capabilities.calibration.latency)
+        return cal_request
 
-    def __get_measurement_compensation_factor(self, compensation_factor):
+    def _set_calibration_state(self, calibration, response):
+        # the point is only set once the device confirms it, any other status leaves the device as it was
+        if response.status != RequestResult.OK:
+            raise AtlasScientificResponseSyntaxError('status', f'calibration was not confirmed, {response.status.name}')
+        self.calibration_state = calibration.point.lower()
+
+    def _get_measurement_compensation_factor(self, compensation_factor):
         factors = self.get_supported_compensation_factors()
         factor = factors.get(compensation_factor.factor.lower(), None)
          
@@ -217,7 +505,7 @@ class AtlasScientificDevice(object):
     
         return factor
 
-    def __get_configuration_parameter(self, parameter_details):
+    def _get_configuration_parameter(self, parameter_details):
         parameters = self.get_supported_configuration_parameters()
         parameter = parameters.get(parameter_details.parameter.lower(), None)
          
@@ -226,70 +514,329 @@ class AtlasScientificDevice(object):
     
         return parameter
 
-    def __invalidate_output_measurements_cache(self):
+    def _invalidate_output_measurements_cache(self):
         self.current_output_measurements = None # flag for lazy update
 
-    def __query_i(self): 
-        result = self.__query('i', self.device_request_latency)
-        return AtlasScientificDeviceInfo(result, self.address)
+class AtlasScientificDevice(AtlasScientificDeviceBase):
+    def __init__(self, i2c_session_provider, address, device_info=None):
+        if device_info is None:
+            device_info = AtlasScientificDevice.__query_i(i2c_session_provider, address)
+        super().__init__(address, device_info)
+        self.i2c_session_provider = i2c_session_provider
+        self.read_flights = SingleFlight()
+
+    @staticmethod
+    def connect(i2c_session_provider, address):
+        device_log = logging.getLogger(f'I2CDevice[{address}]')
+
+        with i2c_session_provider.acquire_access(address) as i2c_session:
+
+            if not i2c_session.ping():
+                raise AtlasScientificNoDeviceAtAddress
+
+            try:
+                # Try read device info,
+                # if it fails we assume the device vendor isn't atlas scientific
+                return AtlasScientificDevice(i2c_session_provider, address)
+            except AtlasScientificDeviceNotYetSupported as err:
+                device_log.info('Non supported atlas scientific device found.')
+                raise err
+            except Exception as err:
+                device_log.debug(f'Failed to connection device, {err}', )
+                device_log.info('non atlas scientific device found')
+                raise err
+
+    def set_configuration_parameter(self, parameter_details):
+        self.__query(self._get_configuration_query(parameter_details), self.device_request_latency)
+
+    def get_enabled_output_measurements(self):
+        output_measurements = self._get_known_output_measurements()
+        if output_measurements is not None:
+            return output_measurements
+
+        # multi output device, read the device's current output
+        return self._set_current_output_measurements(self.__query_o())
+
+    def set_enabled_output_measurements(self, units):
+        units_to_enable, units_to_disable = self._get_output_measurement_changes(units, self.get_enabled_output_measurements())
+
+        for unit in units_to_enable:
+            self.__query_o_enable(unit)
+
+        for unit in units_to_disable:
+            self.__query_o_disable(unit)
+        
+    def read_sample(self, compensation_factors):
+        # concurrent reads of the same samples share a single device query
+        return self.read_flights.call(
+            self._get_read_key(compensation_factors),
+            lambda: self.__read_sample(compensation_factors)
+        )
+
+    def __read_sample(self, compensation_factors):
+        explicit_cf, read_query = self._get_read_queries(compensation_factors)
+
+        if explicit_cf:
+            self.set_measurement_compensation_factors(explicit_cf)
+
+        return self.__query_r(read_query)
+
+    def set_measurement_compensation_factors(self, compensation_factors):
+
+        for compensation_factor in compensation_factors:
+            self.__query(self._get_compensation_query(compensation_factor), self.device_request_latency)
+
+    def set_calibration_point(self, calibration):
+        result = self.__query(self._get_calibration_query(calibration), self.capabilities.calibration.latency)
+        self._set_calibration_state(calibration, result)
+        return result
+
+    @staticmethod
+    def __query_i(i2c_session_provider, address):
+        # queried before the device is constructed, so with the default polling and no learnt latencies
+        device_log = logging.getLogger(f'AtlasScientificDevice[{address}]')
+        result = query_device(i2c_session_provider, address, 'i', device_request_latency, device_log)
+        return AtlasScientificDeviceInfo(result, address)
 
     def __query_o_enable(self, unit):
-        self.__invalidate_output_measurements_cache()
+        self._invalidate_output_measurements_cache()
         return self.__query(f'o,{unit},1', self.device_request_latency)
 
     def __query_o_disable(self, unit):
-        self.__invalidate_output_measurements_cache()
+        self._invalidate_output_measurements_cache()
         return self.__query(f'o,{unit},0', self.device_request_latency)
 
     def __query_o(self): 
         result = self.__query('o,?', self.device_request_latency)
         return AtlasScientificDeviceOutput(result)
 
-    def __query_r(self): 
+    def __query_r(self, read_query): 
         output_units = self.get_enabled_output_measurements()
-        result = self.__query('r', self.capabilities.read.latency)
-        return AtlasScientificDeviceSample.from_expected_device_output(result, output_units)
-
-    def __query_rt(self, temperature): 
-        output_units = self.get_enabled_output_measurements()
-        result = self.__query(f'rt,{temperature}', self.capabilities.read.latency)
+        result = self.__query(read_query, self.capabilities.read.latency)
         return AtlasScientificDeviceSample.from_expected_device_output(result, output_units)
 
     def __query(self, query, process_delay):
-        query_bytes = query.encode('ascii') + b'\00'
-    
-        # Lock access to this device address to prevent
-        # interleaving of reads and writes
-        with self.i2c_session_provider.acquire_access(self.address) as i2c_session:
-            self.device_log.debug(f' TX   >> {query_bytes}')
-            i2c_session.write(query_bytes)
-
-            # back off by 1/3 when data not ready
-            wait_durations = [
-                process_delay,
-                process_delay / 3,
-                process_delay / 3,
-                process_delay / 3,
-            ]
-
-            for wait_duration in wait_durations:
-                response = self.__wait_and_read(wait_duration, i2c_session)
-                if response.status != RequestResult.NOT_READY:
-                    return response
-
-            raise AtlasScientificDeviceNotReadyError
-
-    def __wait_and_read(self, process_delay, i2c_session):
-        self.device_log.debug(f' WAIT :: {process_delay}')
-        time.sleep(process_delay)
-
-        data = i2c_session.read()
-        self.device_log.debug(f' RX   << {data}')
+        return query_device(self.i2c_session_provider, self.address, query, process_delay, self.device_log, self.response_latencies, self.polling)
+
+class SingleFlight(object):
+    # Shares the result of a call with every caller making
+    # the same call while it is in flight
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def call(self, key, fn):
+        with self.lock:
+            future = self.in_flight.get(key, None)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except Exception as err:
+            self.__land(key)
+            future.set_exception(err)
+            raise
+
+        self.__land(key)
+        future.set_result(result)
+        return result
+
+    def __land(self, key):
+        # later callers make a new call, rather than sharing a finished one
+        with self.lock:
+            del self.in_flight[key]
+
+class AtlasScientificMissingDevices(object):
+    # Remembers the error of connecting to each address which had no supported device,
+    # for ttl seconds, so requests for an empty or unsupported address don't use the bus each time
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # address -> (monotonic time the error expires, error)
+        self.errors = {}
+
+    def add(self, address, error):
+        if self.ttl:
+            with self.lock:
+                self.errors[address] = (time.monotonic() + self.ttl, error)
+
+    def replace(self, errors):
+        # replaces every remembered error, such as after scanning the bus
+        if self.ttl:
+            expires = time.monotonic() + self.ttl
+            with self.lock:
+                self.errors = {address: (expires, error) for address, error in errors.items()}
+
+    def get(self, address):
+        # returns the error of an address which had no supported device, None once expired
+        with self.lock:
+            expires, error = self.errors.get(address, (None, None))
+            if error is None:
+                return None
+            if time.monotonic() >= expires:
+                # the address is tried again, in case a device has been plugged in
+                del self.errors[address]
+                return None
+        # the traceback of the original connection isn't kept, nor added to by each raise
+        return error.with_traceback(None)
+
+class AtlasScientificResponseLatencies(object):
+    # Learns how long a device takes to respond to each command, from a rolling
+    # window of the time waited before each of its responses were ready
+    def __init__(self, window_size=16, percentile=0.9, min_observations=10):
+        self.window_size = window_size
+        self.percentile = percentile
+        self.min_observations = min_observations
+        self.observations = {}
+
+    def observe(self, query, ready_after):
+        command = get_query_command(query)
+        if command not in self.observations:
+            self.observations[command] = deque(maxlen=self.window_size)
+        self.observations[command].append(ready_after)
+
+    def get_expected_latency(self, query):
+        # None until enough responses have been observed to be trusted
+        observations = sorted(self.observations.get(get_query_command(query), ()))
+        if len(observations) < self.min_observations:
+            return None
+        return observations[int(round(self.percentile * (len(observations) - 1)))]
+
+# the time given to a device to process any command which doesn't have a documented latency
+device_request_latency = 0.3
+
+# the errors of identifying a device which show it isn't a supported atlas scientific device,
+# rather than that it couldn't be read this time
+unsupported_device_errors = (AtlasScientificDeviceNotYetSupported, AtlasScientificResponseSyntaxError)
+
+# the errors of connecting to an address which show it has no supported device
+missing_device_errors = (AtlasScientificNoDeviceAtAddress,) + unsupported_device_errors
+
+def is_rescan_due(rescan_interval, last_scan):
+    return rescan_interval is not None and last_scan is not None and time.monotonic() - last_scan >= rescan_interval
+
+def keep_known_device(known_device, device):
+    # a known device identified again as the same device is kept, along with everything cached of it
+    if known_device is None:
+        return device
 
-        response = AtlasScientificResponse(data, get_datetime_now(timezone.utc))
-        if response.status == RequestResult.SYNTAX_ERROR:
-            raise AtlasScientificSyntaxError
-        return response
+    known_device_info = known_device.get_device_info()
+    device_info = device.get_device_info()
+    if insensitive_eq(known_device_info.device_type, device_info.device_type) and known_device_info.version == device_info.version:
+        return known_device
+    return device
+
+def get_missing_device_errors(responding_addresses, unsupported_devices):
+    responding_addresses = set(responding_addresses)
+    errors = {address: AtlasScientificNoDeviceAtAddress() for address in scan_addresses if address not in responding_addresses}
+    errors.update(unsupported_devices)
+    return errors
+
+def get_device_changes(known_devices, devices):
+    # the devices added and removed, a device replaced by another at the same address is both
+    known_ids = set(id(device) for device in known_devices.values())
+    ids = set(id(device) for device in devices.values())
+    added_devices = [device for device in devices.values() if id(device) not in known_ids]
+    removed_devices = [device for device in known_devices.values() if id(device) not in ids]
+    return added_devices, removed_devices
+
+def notify_device_listeners(device_listeners, added_devices, removed_devices):
+    for event, devices in (('removed', removed_devices), ('added', added_devices)):
+        for device in devices:
+            logging.info(f'{device.get_device_info().device_type} device {event} at address {device.bus_address}')
+            for listener in device_listeners:
+                try:
+                    listener(event, device)
+                except Exception as err:
+                    logging.warning(f'Device listener failed, {err}')
+
+def restore_known_devices(device_class, i2c_session_provider, device_registry, bus):
+    # rebuilds the devices saved in the device registry, without querying them
+    devices = []
+    for entry in device_registry.load(bus):
+        try:
+            device = device_class(i2c_session_provider, entry['address'], AtlasScientificDeviceInfo.from_registry_entry(entry))
+            if entry.get('output_units', None) is not None:
+                device._set_current_output_units(entry['output_units'])
+            devices.append(device)
+        except Exception as err:
+            logging.info(f'Ignoring saved device {entry}, {err}')
+    return devices
+
+def get_device_polling(device_polling):
+    # the polling strategy of each device type, keyed by lower case device type
+    return {device_type.lower(): get_polling_strategy(polling) for device_type, polling in (device_polling or {}).items()}
+
+def get_readable_device(device):
+    # devices without a read capability can't be sampled
+    if not device.capabilities.read:
+        raise RequestValidationError
+    return device
+
+def get_bus_device_address(bus, bus_address):
+    # the address on the bus of a plain or bus:address address, which must be of the bus
+    address_bus, address = parse_bus_address(bus_address)
+    if address_bus is not None and address_bus != bus:
+        raise AtlasScientificNoDeviceAtAddress
+    return address
+
+def get_query_command(query):
+    # the command latencies are learnt for, without its parameters. such as 'r' or 'cal'
+    return query.split(',')[0].lower()
+
+def query_device(i2c_session_provider, address, query, process_delay, device_log, response_latencies=None, polling=default_polling):
+    query_bytes = encode_query(query, device_log)
+    expected_latency = response_latencies.get_expected_latency(query) if response_latencies else None
+    written_at = None
+
+    # Lock access to this device address to prevent
+    # interleaving of reads and writes
+    with i2c_session_provider.acquire_access(address) as i2c_session:
+        for wait_duration in polling.get_wait_durations(process_delay, expected_latency):
+            device_log.debug(f' WAIT :: {wait_duration}')
+            transaction = i2c_session.create_transaction(query_bytes, wait_duration, polling.reads_status)
+            response_bytes = i2c_session.execute(transaction)
+            written_at = written_at if written_at is not None else transaction.written_at
+
+            if not is_not_ready(response_bytes):
+                # the time the device took to be ready, rather than the time planned to be waited
+                ready_after = transaction.read_at - written_at
+                if polling.reads_status:
+                    # only the status byte has been read
+                    response_bytes = i2c_session.read()
+
+                response = parse_response(response_bytes, device_log)
+                if response_latencies:
+                    response_latencies.observe(query, ready_after)
+                return response
+
+            # the query is still being processed, so only read again
+            query_bytes = None
+
+        raise AtlasScientificDeviceNotReadyError
+
+def encode_query(query, device_log):
+    query_bytes = query.encode('ascii') + b'\00'
+    device_log.debug(f' TX   >> {query_bytes}')
+    return query_bytes
+
+def is_not_ready(response_bytes):
+    # checks if the device is still processing, without parsing the response
+    return len(response_bytes) > 0 and response_bytes[0] == RequestResult.NOT_READY.value
+
+def parse_response(data, device_log):
+    device_log.debug(f' RX   << {data}')
+
+    response = AtlasScientificResponse(data, get_datetime_now(timezone.utc))
+    if response.status == RequestResult.SYNTAX_ERROR:
+        raise AtlasScientificSyntaxError
+    return response
 
 def insensitive_eq(a, b):
     return a.lower() == b.lower()
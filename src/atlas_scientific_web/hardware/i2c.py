@@ -1,21 +1,68 @@
+import asyncio
+import heapq
 import io
+import itertools
+import logging
 import threading
+import time
 
+from concurrent.futures import Future
 from sys import platform
 
 default_bus = 1 # the default bus for I2C on the newer Raspberry Pis, certain older boards use bus 0
 read_chunk_size = 128
 
+# the addresses scanned for devices, 0x00-0x07 and 0x78-0x7F are reserved by the I2C specification.
+# Devices at a reserved address can still be used by their address, they just aren't found by a scan
+scan_addresses = range(0x08, 0x78)
+
+# the most messages the kernel accepts in a single I2C_RDWR ioctl
+max_batch_reads = 42
+
+# waiting for a transaction may time out marginally before the expected duration,
+# treat transactions this close to ready as ready
+ready_tolerance_seconds = 0.000001
+
 class I2CSessionProvider:
     def __init__(self, bus_io):
         self.bus_io = bus_io
         self.channel_locks_lock = threading.RLock()
-        self.file_lock = threading.RLock()
         self.channel_locks = {}
+        self.async_channel_locks = {}
+        self.scheduler = I2CBusScheduler(bus_io)
 
     def acquire_access(self, address, timeout_seconds=30):
         channel_lock = self._get_channel_lock(address)
-        return I2CSession(channel_lock,  self.file_lock, self.bus_io, address, timeout_seconds)
+        return I2CSession(channel_lock, self.scheduler, address, timeout_seconds)
+
+    def acquire_async_access(self, address):
+        # the asyncio counterpart of acquire_access, a lock held by a query while it awaits its response
+        with self.channel_locks_lock:
+            channel_lock = self.async_channel_locks.get(address, None)
+            if not channel_lock:
+                channel_lock = asyncio.Lock()
+                self.async_channel_locks[address] = channel_lock
+            return channel_lock
+
+    def submit(self, transactions):
+        self.scheduler.submit(transactions)
+
+    def ping_all(self, addresses):
+        # ping every address back to back, returning the addresses which responded
+        transactions = [I2CTransaction(address, ping=True) for address in addresses]
+        self.scheduler.submit(transactions)
+
+        responding_addresses = []
+        for transaction in transactions:
+            try:
+                if transaction.future.result():
+                    responding_addresses.append(transaction.address)
+            except Exception:
+                pass
+        return responding_addresses
+
+    def close(self):
+        self.scheduler.stop()
 
     def _get_channel_lock(self, address):
         with self.channel_locks_lock:
@@ -26,11 +73,10 @@ class I2CSessionProvider:
             return channel_lock
 
 class I2CSession:
-    def __init__(self, rx_tx_lock, file_lock, bus_io, address, timeout_seconds):
+    def __init__(self, rx_tx_lock, scheduler, address, timeout_seconds):
         self.address = address
-        self.bus_io = bus_io
+        self.scheduler = scheduler
         self.timeout_seconds = timeout_seconds
-        self.file_lock = file_lock
         self.rx_tx_lock = rx_tx_lock
 
     def __enter__(self):
@@ -41,68 +87,400 @@ class I2CSession:
         self.rx_tx_lock.release()
 
     def ping(self):
-        with self.file_lock:
-            return self.bus_io.ping(self.address)
+        return self.scheduler.execute(I2CTransaction(self.address, ping=True))
 
     def read(self):
-        with self.file_lock:
-            return self.bus_io.read(self.address)
+        return self.scheduler.execute(I2CTransaction(self.address))
 
     def write(self, value):
-        with self.file_lock:
-            return self.bus_io.write(self.address, value)
+        return self.scheduler.execute(I2CTransaction(self.address, write_bytes=value, read=False))
 
-# TODO: implement this for windows if needed, otherwise this is just for running unit tests
-if platform == "win32" or platform == "win64":
-    class I2CBusIo:
-     
-        def __init__(self, bus=default_bus):
-            pass
+    def query(self, value, delay, status_only=False):
+        # write the value, and read the response once the device has had time to process it,
+        # when the value is None the device is only read after the delay
+        return self.execute(self.create_transaction(value, delay, status_only))
 
-        def ping(self, address):
-            try:
-                self.read(address, 1)
-                return True
-            except IOError:
-                return False
+    def execute(self, transaction):
+        return self.scheduler.execute(transaction)
 
-        def read(self, address, num_of_bytes=read_chunk_size):
-            return ''
+    def create_transaction(self, value, delay, status_only=False):
+        # creates a query transaction which can be submitted along with others
+        return I2CTransaction(self.address, write_bytes=value, delay=delay, status_only=status_only)
 
-        def write(self, address, value):
-            pass
+class I2CTransaction:
+    def __init__(self, address, write_bytes=None, delay=0, read=True, ping=False, status_only=False):
+        self.address = address
+        self.write_bytes = write_bytes
+        # seconds the device needs to process the written bytes before it can be read
+        self.delay = delay
+        self.read = read
+        # only read the first byte of the response, which is the device's status
+        self.status_only = status_only
+        self.ping = ping
+        self.future = Future()
+        # the scheduler's monotonic time of the write, and of the read
+        self.written_at = None
+        self.read_at = None
 
-        def close(self):
-            pass
+    def remaining_delay(self, now):
+        return self.delay - (now - self.written_at)
 
-        def __enter__(self):
-            return self
+class I2CBusScheduler:
+    # Owns all access to the bus from a single thread. Transactions are written as soon
+    # as they are submitted, and read as soon as their device has finished processing,
+    # so many devices can process requests at once while the bus is only ever used by one.
+    def __init__(self, bus_io):
+        self.scheduler_log = logging.getLogger('I2CBusScheduler')
+        self.bus_io = bus_io
+        # every response is read into the same buffer, and only its content is copied out.
+        # Devices ready at the same time are read together, each into their own buffer
+        self.read_buffer = bytearray(read_chunk_size)
+        self.batch_read_buffers = []
+        self.condition = threading.Condition()
+        self.submitted = []
+        self.processing = []
+        self.sequence = itertools.count()
+        self.scheduler_thread = None
+        self.is_stopped = False
 
-        def __exit__(self, type, value, traceback):
-            self.close()
+    def submit(self, transactions):
+        # transactions submitted together are written back to back
+        with self.condition:
+            if self.is_stopped:
+                raise IOError('I2C bus scheduler has been stopped')
+
+            self.submitted.extend(transactions)
+            self.__ensure_started()
+            self.condition.notify()
+
+    def execute(self, transaction):
+        self.submit([transaction])
+        return transaction.future.result()
+
+    def stop(self, timeout_seconds=5):
+        with self.condition:
+            self.is_stopped = True
+            self.condition.notify()
+            scheduler_thread = self.scheduler_thread
+
+        if scheduler_thread and scheduler_thread is not threading.current_thread():
+            scheduler_thread.join(timeout_seconds)
+
+    def __ensure_started(self):
+        if self.scheduler_thread is None:
+            self.scheduler_thread = threading.Thread(target=self.__run, name='I2CBusScheduler', daemon=True)
+            self.scheduler_thread.start()
+
+    def wait_until_ready(self, timeout_seconds):
+        # waits for the earliest transaction to be ready, called holding the condition.
+        # Returns True when woken early, such as by a transaction being submitted
+        return self.condition.wait(timeout_seconds)
+
+    def __run(self):
+        now = time.monotonic()
+
+        while True:
+            with self.condition:
+                while not self.submitted and not self.is_stopped:
+                    if not self.processing:
+                        self.condition.wait()
+                        continue
+
+                    wait_duration = self.processing[0][2].remaining_delay(now)
+                    if wait_duration <= ready_tolerance_seconds:
+                        break
+
+                    if self.wait_until_ready(wait_duration):
+                        now = max(now, time.monotonic())
+                    else:
+                        # the wait timed out, so don't trust a clock which hasn't moved
+                        now = max(now + wait_duration, time.monotonic())
+
+                if self.is_stopped:
+                    break
+
+                submitted = self.submitted
+                self.submitted = []
+
+            now = max(now, time.monotonic())
+
+            # Start new transactions first, so their devices begin processing as soon as possible
+            for transaction in submitted:
+                self.__start(transaction, now)
+
+            # Then read every device which has finished processing
+            ready = []
+            while self.processing and self.processing[0][2].remaining_delay(now) <= ready_tolerance_seconds:
+                _, _, transaction = heapq.heappop(self.processing)
+                transaction.read_at = now
+                ready.append(transaction)
+            self.__complete_all(ready)
+
+        self.__abort_all()
+
+    def __start(self, transaction, now):
+        try:
+            if transaction.ping:
+                transaction.future.set_result(self.bus_io.ping(transaction.address))
+                return
+
+            if transaction.write_bytes is not None:
+                self.bus_io.write(transaction.address, transaction.write_bytes)
+            transaction.written_at = now
+
+            if not transaction.read:
+                transaction.future.set_result(None)
+                return
+
+            heapq.heappush(self.processing, (now + transaction.delay, next(self.sequence), transaction))
+        except Exception as err:
+            transaction.future.set_exception(err)
+
+    def __complete_all(self, transactions):
+        # status reads are a single byte so aren't worth batching
+        batched = [t for t in transactions if not t.status_only]
+        for transaction in transactions:
+            if transaction.status_only or len(batched) == 1:
+                self.__complete(transaction)
+
+        if len(batched) > 1:
+            for start in range(0, len(batched), max_batch_reads):
+                self.__complete_batch(batched[start:start + max_batch_reads])
+
+    def __complete_batch(self, transactions):
+        while len(self.batch_read_buffers) < len(transactions):
+            self.batch_read_buffers.append(bytearray(read_chunk_size))
+
+        reads = [(t.address, buffer) for t, buffer in zip(transactions, self.batch_read_buffers)]
+        try:
+            results = self.bus_io.read_all_into(reads)
+        except Exception as err:
+            # devices can't be read again, as any already read have no response left to read
+            for transaction in transactions:
+                transaction.future.set_exception(err)
+            return
+
+        # a device failing only fails its own transaction
+        for transaction, (_, buffer), result in zip(transactions, reads, results):
+            if isinstance(result, Exception):
+                transaction.future.set_exception(result)
+            else:
+                transaction.future.set_result(copy_response(buffer, result))
+
+    def __complete(self, transaction):
+        try:
+            if transaction.status_only:
+                transaction.future.set_result(self.bus_io.read_status(transaction.address))
+            else:
+                count = self.bus_io.read_into(transaction.address, self.read_buffer)
+                transaction.future.set_result(copy_response(self.read_buffer, count))
+        except Exception as err:
+            transaction.future.set_exception(err)
+
+    def __abort_all(self):
+        with self.condition:
+            pending = self.submitted + [transaction for _, _, transaction in self.processing]
+            self.submitted = []
+            self.processing = []
+
+        for transaction in pending:
+            transaction.future.set_exception(IOError('I2C bus scheduler has been stopped'))
+
+def read_each_into(bus_io, reads):
+    # reads each of a list of (address, buffer) on its own, returning the count of bytes read into
+    # each buffer, or the error reading it, so a device failing doesn't fail the others
+    results = []
+    for address, buffer in reads:
+        try:
+            results.append(bus_io.read_into(address, buffer))
+        except Exception as err:
+            results.append(err)
+    return results
+
+def copy_response(read_buffer, count):
+    # responses are padded with nulls after their content, which needn't be copied.
+    # The first byte is the status, which can be null when a device has no response
+    length = read_buffer.find(b'\x00', 1, count)
+    return bytes(memoryview(read_buffer)[:length if length != -1 else count])
+
+class StubI2CBusIo(object):
+    # A bus without any devices, standing in for I2CBusIo where there is no I2C, such as when running
+    # the unit tests on any platform. Tests replace read, write and ping, which everything else is built on
+    def __init__(self, bus=default_bus):
+        pass
+
+    def ping(self, address):
+        try:
+            self.read(address, 1)
+            return True
+        except IOError:
+            return False
+
+    def read(self, address, num_of_bytes=read_chunk_size):
+        return b''
+
+    def read_into(self, address, buffer):
+        data = self.read(address)[:len(buffer)]
+        buffer[:len(data)] = data
+        return len(data)
+
+    def read_all_into(self, reads):
+        return read_each_into(self, reads)
+
+    def read_status(self, address):
+        return self.read(address)[:1]
+
+    def write(self, address, value):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+# TODO: implement this for windows if needed, otherwise the stub is just for running unit tests
+if platform == "win32" or platform == "win64":
+    I2CBusIo = StubI2CBusIo
 
 else:
+    import ctypes
+    import errno
     import fcntl
     I2C_SLAVE = 0x703
+    I2C_RDWR = 0x707
+    I2C_M_RD = 0x0001
+
+    # the errors of a message which wasn't acknowledged, as there is no device at the address
+    no_acknowledge_errors = (errno.EREMOTEIO, errno.ENXIO, errno.EIO)
+
+    # addresses commonly used by EEPROMs, which a quick write can corrupt, so are probed with a read
+    read_probe_addresses = set(range(0x30, 0x38)) | set(range(0x50, 0x60))
+
+    class i2c_msg(ctypes.Structure):
+        _fields_ = [
+            ('addr', ctypes.c_uint16),
+            ('flags', ctypes.c_uint16),
+            ('len', ctypes.c_uint16),
+            ('buf', ctypes.POINTER(ctypes.c_uint8))
+        ]
+
+    class i2c_rdwr_ioctl_data(ctypes.Structure):
+        _fields_ = [
+            ('msgs', ctypes.POINTER(i2c_msg)),
+            ('nmsgs', ctypes.c_uint32)
+        ]
 
     class I2CBusIo:
         def __init__(self, bus=default_bus):
             self.file_read = io.open("/dev/i2c-"+str(bus), "rb", buffering=0)
             self.file_write = io.open("/dev/i2c-"+str(bus), "wb", buffering=0)
 
+            # the address each handle is currently talking to, so it
+            # is only selected when the address changes
+            self.read_address = None
+            self.write_address = None
+
+            # reused by pings and status reads, which only need a single byte
+            self.status_buffer = bytearray(1)
+            self.probe_buffer = (ctypes.c_uint8 * 1)()
+
+            # cleared when the bus adapter can't probe with a single message
+            self.supports_probe = True
+            # cleared when the bus adapter can't read many devices with a single ioctl
+            self.supports_batch_reads = True
+
         def ping(self, address):
+            # probes the address with a single I2C_RDWR message, as i2cdetect does, rather than
+            # selecting the address and reading from it. A zero length quick write is
+            # acknowledged by any device present, without sending it any data
+            if self.supports_probe:
+                if address in read_probe_addresses:
+                    message = i2c_msg(address, I2C_M_RD, 1, self.probe_buffer)
+                else:
+                    message = i2c_msg(address, 0, 0, None)
+
+                try:
+                    fcntl.ioctl(self.file_read, I2C_RDWR, i2c_rdwr_ioctl_data(ctypes.pointer(message), 1))
+                    return True
+                except IOError as err:
+                    if err.errno in no_acknowledge_errors:
+                        return False
+                    logging.info(f'I2C bus does not support probing devices, falling back to reading, {err}')
+                    self.supports_probe = False
+
             try:
-                self.read(address, 1)
+                self.read_into(address, self.status_buffer)
                 return True
             except IOError:
                 return False
 
         def read(self, address, num_of_bytes=read_chunk_size):
-            fcntl.ioctl(self.file_read, I2C_SLAVE, address)
+            self.__select_read_address(address)
             return self.file_read.read(num_of_bytes)
 
+        def read_into(self, address, buffer):
+            # reads as many bytes as fit in the buffer, without allocating
+            self.__select_read_address(address)
+            return self.file_read.readinto(buffer)
+
+        def read_all_into(self, reads):
+            # reads a list of (address, buffer) with a single I2C_RDWR ioctl, a message per device,
+            # rather than selecting and reading each device with two syscalls.
+            # Returns the count of bytes read into each buffer, or the error reading it
+            if not self.supports_batch_reads:
+                return read_each_into(self, reads)
+
+            messages = (i2c_msg * len(reads))()
+            for message, (address, buffer) in zip(messages, reads):
+                message.addr = address
+                message.flags = I2C_M_RD
+                message.len = len(buffer)
+                message.buf = (ctypes.c_uint8 * len(buffer)).from_buffer(buffer)
+
+            try:
+                fcntl.ioctl(self.file_read, I2C_RDWR, i2c_rdwr_ioctl_data(messages, len(reads)))
+            except IOError as err:
+                if err.errno in no_acknowledge_errors:
+                    return self.__complete_failed_read_all(reads, err)
+                # the adapter rejects the ioctl before reading any device
+                logging.info(f'I2C bus does not support batched reads, falling back to reading each device, {err}')
+                self.supports_batch_reads = False
+                return read_each_into(self, reads)
+            return [len(buffer) for _, buffer in reads]
+
+        def __complete_failed_read_all(self, reads, err):
+            # the ioctl stops at the first device not acknowledging its message, and the kernel discards
+            # the responses read before it. Those devices have no response left to read again,
+            # so only the devices after it are read
+            results = []
+            for index, (address, _) in enumerate(reads):
+                if not self.ping(address):
+                    return results + [err] + read_each_into(self, reads[index + 1:])
+                results.append(IOError(f'Response was lost, as a batched read failed, {err}'))
+            return results
+
+        def read_status(self, address):
+            # the first byte of a response is the status, so it can be checked without reading the rest.
+            # single bytes objects are cached by python, so this doesn't allocate
+            self.read_into(address, self.status_buffer)
+            return bytes(self.status_buffer)
+
+        def __select_read_address(self, address):
+            if self.read_address != address:
+                # forget the address first, in case the ioctl fails
+                self.read_address = None
+                fcntl.ioctl(self.file_read, I2C_SLAVE, address)
+                self.read_address = address
+
         def write(self, address, value):
-            fcntl.ioctl(self.file_write, I2C_SLAVE, address)
+            if self.write_address != address:
+                self.write_address = None
+                fcntl.ioctl(self.file_write, I2C_SLAVE, address)
+                self.write_address = address
             self.file_write.write(value)
 
         def close(self):
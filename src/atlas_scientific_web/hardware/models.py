@@ -1,5 +1,7 @@
 #!flask/bin/python
 
+import re
+
 from enum import Enum
 
 class AtlasScientificError(Exception):
@@ -17,6 +19,9 @@ class AtlasScientificNoDeviceAtAddress(AtlasScientificError):
 class AtlasScientificDeviceNotYetSupported(AtlasScientificError):
     pass
 
+class AtlasScientificCalibrationPointNotAllowed(AtlasScientificError):
+    pass
+
 class AtlasScientificResponseSyntaxError(AtlasScientificError):
 
     def __init__(self, felid, message):
@@ -32,8 +37,14 @@ class RequestResult(Enum):
     NOT_READY = 254
     ACK = 255  # ok with no message response body
 
+response_terminator = re.compile(b'\x00')
+
 class AtlasScientificResponse(object):
+    __slots__ = ('response_timestamp', 'status', 'fields')
+
     def __init__(self, response_bytes, response_timestamp):
+        # response_bytes can be bytes, a bytearray or a memoryview, such as a reused read buffer.
+        # Only the body is copied out, each field is decoded to a string when asked for
         self.response_timestamp = response_timestamp
 
         try:
@@ -46,16 +57,26 @@ class AtlasScientificResponse(object):
                 # omit first byte, as it's the status bytes,
                 # find the response length to strip the unused data
                 length = AtlasScientificResponse.__find_response_length(response_bytes)
-                self.attributes = response_bytes[1:length].decode('ascii').split(",")
+                body = bytes(memoryview(response_bytes)[1:length])
+                if not body.isascii():
+                    raise ValueError('response is not ascii')
+                self.fields = body.split(b',')
             else:
-                self.attributes = []
+                self.fields = []
         except Exception as err:
             raise AtlasScientificResponseSyntaxError('body', str(err))
 
+    @property
+    def attributes(self):
+        return [f.decode('ascii') for f in self.fields]
 
     def get_field(self, name, index):
+        return self.get_raw_field(name, index).decode('ascii')
+
+    def get_raw_field(self, name, index):
+        # the field as bytes, which can be parsed as a number without decoding
         try:
-            return self.attributes[index]
+            return self.fields[index]
         except IndexError:
             raise AtlasScientificResponseSyntaxError(name, "expected field missing from response")
         except Exception as err:
@@ -63,7 +84,7 @@ class AtlasScientificResponse(object):
 
     def get_fields(self, name, start, end):
         try:
-            return self.attributes[start:end]
+            return [f.decode('ascii') for f in self.fields[start:end]]
         except IndexError:
             raise AtlasScientificResponseSyntaxError(name, "expected fields missing from response")
         except Exception as err:
@@ -73,62 +94,119 @@ class AtlasScientificResponse(object):
     def __find_response_length(response_bytes):
         # omit content after the first x00, as the device
         # may return more bytes then expected.
-        l = response_bytes.find(b'\x00')
+        # memoryviews have no find, but regular expressions search any buffer without copying it
+        match = response_terminator.search(response_bytes, 1)
         # if no x00 was found, assume all bytes contain data
-        return l if l != -1 else None
+        return match.start() if match else None
 
 class AtlasScientificDeviceOutput(object): 
+    __slots__ = ('units',)
+
     def __init__(self, device_response):
         # expected format ?O,%,MG"
         self.units = device_response.get_fields('output', 1, None)    
 
 class AtlasScientificDeviceInfo(object): 
+    __slots__ = ('device_type', 'version', 'address', 'vendor')
+
     def __init__(self, device_response, address):
         self.device_type = device_response.get_field('device_type', 1)
         self.version = device_response.get_field('version', 2)
         self.address = address
         self.vendor = 'atlas-scientific'
 
-class AtlasScientificDeviceSample(object): 
+    @staticmethod
+    def from_registry_entry(entry):
+        # the device info saved by the device registry, rather than read from the device
+        device_info = AtlasScientificDeviceInfo.__new__(AtlasScientificDeviceInfo)
+        device_info.device_type = entry['device_type']
+        device_info.version = entry['version']
+        device_info.address = entry['address']
+        device_info.vendor = 'atlas-scientific'
+        return device_info
+
+# marks a value yet to be parsed, as None is also a parsed value
+unparsed_value = object()
+
+class AtlasScientificDeviceSample(object):
+    __slots__ = ('symbol', 'device_value', 'value_type', 'timestamp', 'unit_code', 'parsed_value')
+
     def __init__(self, symbol, value, value_type, timestamp, unit_code):
         self.symbol = symbol
-        self.value = value
+        # the value as the device returned it, either a string or the bytes of the response
+        self.device_value = value
         self.value_type = value_type
         self.timestamp = timestamp
         self.unit_code = unit_code
+        self.parsed_value = unparsed_value
+
+    @property
+    def numeric_value(self):
+        # parsed once when first needed, samples only returned by the api are never parsed
+        if self.parsed_value is unparsed_value:
+            self.parsed_value = parse_numeric_value(self.device_value, self.value_type)
+        return self.parsed_value
+
+    @property
+    def value(self):
+        # samples which are only stored never need their value as a string
+        if isinstance(self.device_value, bytes):
+            self.device_value = self.device_value.decode('ascii')
+        return self.device_value
 
     @staticmethod
     def from_expected_device_output(device_response, expected_output_units):
         result = []
         unit_index = 0
         for unit in expected_output_units:
-            value = device_response.get_field('sample', unit_index)
+            value = device_response.get_raw_field('sample', unit_index)
             result.append(AtlasScientificDeviceSample(unit.symbol, value, unit.value_type, device_response.response_timestamp, unit.unit_code))
             unit_index = unit_index + 1
         return result
 
+def parse_numeric_value(value, value_type):
+    # the value as a float or int, according to its type. None when not numeric
+    try:
+        if value_type == 'float':
+            return float(value)
+        if value_type == 'int':
+            return int(value)
+    except (TypeError, ValueError):
+        pass
+    return None
+
 class AtlasScientificDeviceCompensationFactor(object): 
+    __slots__ = ('factor', 'symbol', 'value')
+
     def __init__(self, factor, symbol, value):
         self.factor = factor
         self.symbol = symbol
         self.value = value
 
 class AtlasScientificDeviceCalibrationPoint(object): 
+    __slots__ = ('point', 'actual_value')
+
     def __init__(self, point, actual_value = None ):
         self.point = point
         self.actual_value = actual_value
 
 class AtlasScientificDeviceConfigurationParameter(object): 
+    __slots__ = ('parameter', 'value')
+
     def __init__(self, parameter, value):
         self.parameter = parameter
         self.value = value
 
 class ExpectedValueType(object):
+    __slots__ = ('t', 'validate')
+
     def __init__(self, expected_value_type):
         if expected_value_type:
             self.t = expected_value_type
         else:
             self.t = "none"
+        # chosen once, rather than each time a value is validated
+        self.validate = value_type_validators.get(self.t, validate_any_value)
     
     @property
     def is_none(self):
@@ -141,19 +219,31 @@ class ExpectedValueType(object):
                     return None
                 raise RequestValidationError
 
-            elif self.t == "float":
-                float(value)
-            elif self.t == "int":
-                int(value)
-            elif self.t == "string":
-                pass
-            elif self.t == "bool":
-                if value.lower() in ['false', '0','no']:
-                    return '0'
-                if value.lower() in ['true', '1','yes']:
-                    return '1'
-                raise RequestValidationError  
-            
-            return value
+            return self.validate(value)
         except ValueError:
-            raise RequestValidationError
\ No newline at end of file
+            raise RequestValidationError
+
+def validate_float_value(value):
+    float(value)
+    return value
+
+def validate_int_value(value):
+    int(value)
+    return value
+
+def validate_bool_value(value):
+    if value.lower() in ['false', '0','no']:
+        return '0'
+    if value.lower() in ['true', '1','yes']:
+        return '1'
+    raise RequestValidationError
+
+def validate_any_value(value):
+    return value
+
+value_type_validators = {
+    'float': validate_float_value,
+    'int': validate_int_value,
+    'string': validate_any_value,
+    'bool': validate_bool_value,
+}
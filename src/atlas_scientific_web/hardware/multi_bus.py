@@ -0,0 +1,112 @@
+import asyncio
+import itertools
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .models import AtlasScientificNoDeviceAtAddress
+
+# Aggregates the devices of many I2C buses, such as /dev/i2c-1 and /dev/i2c-3, addressing
+# each device as bus:address. Each bus has its own scheduler, so buses are used in parallel
+# and adding a bus adds throughput.
+
+class AtlasScientificMultiDeviceBus(object):
+    def __init__(self, device_buses):
+        # bus number -> AtlasScientificDeviceBus
+        self.device_buses = device_buses
+        self.executor = ThreadPoolExecutor(max_workers=len(device_buses), thread_name_prefix='AtlasScientificMultiDeviceBus')
+
+    def add_device_listener(self, listener):
+        for device_bus in self.device_buses.values():
+            device_bus.add_device_listener(listener)
+
+    def forget_known_devices(self):
+        for device_bus in self.device_buses.values():
+            device_bus.forget_known_devices()
+
+    def scan_for_devices(self):
+        self.__map_buses(lambda device_bus: device_bus.scan_for_devices())
+
+    def get_known_devices(self):
+        return list(itertools.chain(*self.__map_buses(lambda device_bus: list(device_bus.get_known_devices()))))
+
+    def get_device_by_address(self, address):
+        bus, _ = parse_bus_address(address)
+        return get_device_bus(self.device_buses, bus).get_device_by_address(address)
+
+    def read_samples(self, addresses=None):
+        bus_addresses, results = group_bus_addresses(self.device_buses, addresses)
+        bus_results = self.__map_buses(lambda device_bus: device_bus.read_samples(bus_addresses[device_bus.bus]), bus_addresses)
+        return merge_bus_results(bus_addresses, bus_results, results)
+
+    def __map_buses(self, func, buses=None):
+        device_buses = [self.device_buses[bus] for bus in (self.device_buses if buses is None else buses)]
+        return list(self.executor.map(func, device_buses))
+
+class AsyncAtlasScientificMultiDeviceBus(object):
+    def __init__(self, device_buses):
+        # bus number -> AsyncAtlasScientificDeviceBus
+        self.device_buses = device_buses
+
+    def add_device_listener(self, listener):
+        for device_bus in self.device_buses.values():
+            device_bus.add_device_listener(listener)
+
+    def forget_known_devices(self):
+        for device_bus in self.device_buses.values():
+            device_bus.forget_known_devices()
+
+    async def scan_for_devices(self):
+        await asyncio.gather(*(device_bus.scan_for_devices() for device_bus in self.device_buses.values()))
+
+    async def get_known_devices(self):
+        bus_devices = await asyncio.gather(*(device_bus.get_known_devices() for device_bus in self.device_buses.values()))
+        return list(itertools.chain(*bus_devices))
+
+    async def get_device_by_address(self, address):
+        bus, _ = parse_bus_address(address)
+        return await get_device_bus(self.device_buses, bus).get_device_by_address(address)
+
+    async def read_samples(self, addresses=None):
+        bus_addresses, results = group_bus_addresses(self.device_buses, addresses)
+        bus_results = await asyncio.gather(*(self.device_buses[bus].read_samples(a) for bus, a in bus_addresses.items()))
+        return merge_bus_results(bus_addresses, bus_results, results)
+
+def format_bus_address(bus, address):
+    # devices of a single bus keep their plain address
+    return address if bus is None else f'{bus}:{address}'
+
+def parse_bus_address(bus_address):
+    # returns the bus and address of either 'bus:address' or a plain address, which has no bus
+    if isinstance(bus_address, int):
+        return None, bus_address
+
+    bus, separator, address = str(bus_address).rpartition(':')
+    return (int(bus) if separator else None), int(address)
+
+def get_device_bus(device_buses, bus):
+    device_bus = device_buses.get(bus, None)
+    if device_bus is None:
+        raise AtlasScientificNoDeviceAtAddress
+    return device_bus
+
+def group_bus_addresses(device_buses, bus_addresses):
+    # the addresses to sample on each bus, None samples every known device of every bus.
+    # Also returns the error of each address which isn't of a bus
+    if bus_addresses is None:
+        return {bus: None for bus in device_buses}, {}
+
+    grouped = {}
+    errors = {}
+    for bus_address in bus_addresses:
+        bus, address = parse_bus_address(bus_address)
+        if bus in device_buses:
+            grouped.setdefault(bus, []).append(address)
+        else:
+            errors[format_bus_address(bus, address)] = AtlasScientificNoDeviceAtAddress()
+    return grouped, errors
+
+def merge_bus_results(bus_addresses, bus_results, results):
+    for bus, results_by_address in zip(bus_addresses, bus_results):
+        for address, result in results_by_address.items():
+            results[format_bus_address(bus, address)] = result
+    return results
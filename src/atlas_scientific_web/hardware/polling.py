@@ -0,0 +1,83 @@
+import math
+
+# Strategies for when to read a device's response after it has been sent a command.
+# Each gives the durations to wait before each read, until the device is ready.
+
+# the time between reads when polling a device expected to be ready soon
+ready_poll_interval = 0.05
+
+class AtlasScientificFixedPolling(object):
+    # Waits the documented latency, then backs off by 1/3 while not ready
+    reads_status = False
+
+    def get_wait_durations(self, process_delay, expected_latency=None):
+        return get_wait_durations(process_delay)
+
+class AtlasScientificAdaptivePolling(object):
+    # Polls from just before the device's learnt latency, falling back to
+    # the fixed back off until enough of its responses have been observed
+    reads_status = False
+
+    def get_wait_durations(self, process_delay, expected_latency=None):
+        return get_wait_durations(process_delay, expected_latency)
+
+class AtlasScientificStatusPolling(object):
+    # Reads only the status byte at a short interval after a minimum wait,
+    # so the full response is read the moment the device is ready
+    reads_status = True
+
+    def __init__(self, poll_interval=0.02, min_wait_ratio=0.5, timeout_ratio=2):
+        self.poll_interval = poll_interval
+        # the fraction of the documented latency waited before the first poll
+        self.min_wait_ratio = min_wait_ratio
+        # the multiple of the documented latency to keep polling for, the same as the fixed back off
+        self.timeout_ratio = timeout_ratio
+
+    def get_wait_durations(self, process_delay, expected_latency=None):
+        if expected_latency is None:
+            first_wait = process_delay * self.min_wait_ratio
+        else:
+            first_wait = min(expected_latency, process_delay) - self.poll_interval
+
+        first_wait = max(first_wait, self.poll_interval)
+        # keep polling for at least the timeout
+        poll_count = max(math.ceil((process_delay * self.timeout_ratio - first_wait) / self.poll_interval - 1e-9), 1)
+        return [first_wait] + [self.poll_interval] * poll_count
+
+polling_strategies = {
+    'fixed': AtlasScientificFixedPolling,
+    'adaptive': AtlasScientificAdaptivePolling,
+    'status': AtlasScientificStatusPolling,
+}
+
+default_polling = AtlasScientificAdaptivePolling()
+
+def get_polling_strategy(polling):
+    # polling strategies can be given by name, such as 'status'
+    if isinstance(polling, str):
+        try:
+            return polling_strategies[polling.lower()]()
+        except KeyError:
+            raise ValueError(f'Unknown polling strategy {polling}, expected one of {", ".join(polling_strategies)}')
+    return polling
+
+def get_wait_durations(process_delay, expected_latency=None):
+    # back off by 1/3 when data not ready
+    back_off_durations = [
+        process_delay / 3,
+        process_delay / 3,
+        process_delay / 3,
+    ]
+
+    if expected_latency is None:
+        return [process_delay] + back_off_durations
+
+    # Start polling one interval before the device is expected to be ready, so a device
+    # getting faster is noticed. The documented latency is still waited out before backing off
+    wait_durations = [max(min(expected_latency, process_delay) - ready_poll_interval, ready_poll_interval)]
+    waited = wait_durations[0]
+    while process_delay - waited > 1e-9:
+        wait_durations.append(min(ready_poll_interval, process_delay - waited))
+        waited += wait_durations[-1]
+
+    return wait_durations + back_off_durations
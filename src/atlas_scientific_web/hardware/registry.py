@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+import threading
+
+# Persists the known devices of every bus to a local file, so after a restart devices
+# are known straight away rather than after scanning the bus and querying each device.
+# The file holds a list of entries, such as
+# {"bus": null, "address": 99, "device_type": "pH", "version": "1.98", "output_units": ["PH"]}
+
+class AtlasScientificDeviceRegistry(object):
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # read from the file on first use
+        self.entries = None
+
+    def load(self, bus=None):
+        # returns the saved entries of the devices of a bus
+        with self.lock:
+            return [entry for entry in self.__get_entries() if entry.get('bus', None) == bus]
+
+    def save(self, bus, entries):
+        # replaces the saved entries of the devices of a bus
+        with self.lock:
+            self.entries = [entry for entry in self.__get_entries() if entry.get('bus', None) != bus] + list(entries)
+            write_registry(self.path, self.entries)
+
+    def __get_entries(self):
+        if self.entries is None:
+            self.entries = read_registry(self.path)
+        return self.entries
+
+def read_registry(path):
+    # a missing or unreadable registry is the same as an empty one, the bus is scanned instead
+    try:
+        with open(path, 'r') as registry_file:
+            entries = json.load(registry_file)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as err:
+        logging.warning(f'Failed to read device registry {path}, {err}')
+        return []
+
+    if not isinstance(entries, list):
+        logging.warning(f'Ignoring device registry {path}, it is not a list of devices')
+        return []
+    return [entry for entry in entries if isinstance(entry, dict)]
+
+def write_registry(path, entries):
+    # written to a temporary file and then renamed, so a restart mid write can't leave a partial registry
+    temp_path = f'{path}.tmp'
+    try:
+        with open(temp_path, 'w') as registry_file:
+            json.dump(entries, registry_file, indent=2)
+        os.replace(temp_path, path)
+    except OSError as err:
+        logging.warning(f'Failed to write device registry {path}, {err}')
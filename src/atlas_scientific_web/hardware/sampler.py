@@ -0,0 +1,342 @@
+import logging
+import threading
+import time
+
+# the most sampling passes a cached sample can be behind, with no explicit limit, before the device is read instead.
+# Passes failing to sample the device otherwise leave the last sample served for ever
+max_missed_sample_passes = 3
+
+class SampleStreamLimitError(Exception):
+    pass
+
+class AtlasScientificCachedSample(object):
+    def __init__(self, samples, sampled_at):
+        self.samples = samples
+        # monotonic time in seconds, only useful for calculating an age
+        self.sampled_at = sampled_at
+
+    def age(self, now):
+        return now - self.sampled_at
+
+class AtlasScientificSampleSubscription(object):
+    # Holds only the latest result published, so a slow
+    # subscriber skips samples rather than falling behind
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.result = None
+        self.has_result = False
+        self.is_closed = False
+
+    def publish(self, result):
+        with self.condition:
+            self.result = result
+            self.has_result = True
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify_all()
+
+    def get(self, timeout_seconds=None):
+        # returns the next samples, or error, published.
+        # None is returned when timed out or closed
+        with self.condition:
+            if not self.has_result and not self.is_closed:
+                self.condition.wait(timeout_seconds)
+
+            if not self.has_result:
+                return None
+
+            self.has_result = False
+            return self.result
+
+class AtlasScientificSamplesSubscription(object):
+    # A subscription to the samples of many devices, holding only the latest
+    # result of each, so they can all be waited for together
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.results = {}
+        self.is_closed = False
+        # address -> the device's part of the subscription, subscribed to its feed
+        self.device_subscriptions = {}
+
+    def publish(self, address, result):
+        with self.condition:
+            self.results[address] = result
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify_all()
+
+    def get(self, timeout_seconds=None):
+        # returns the results published since the last get, keyed by address.
+        # None is returned when timed out or closed
+        with self.condition:
+            if not self.results and not self.is_closed:
+                self.condition.wait(timeout_seconds)
+
+            if not self.results:
+                return None
+
+            results = self.results
+            self.results = {}
+            return results
+
+class AtlasScientificDeviceSubscription(object):
+    # A device's part of a subscription to many devices
+    def __init__(self, subscription, address):
+        self.subscription = subscription
+        self.address = address
+
+    def publish(self, result):
+        self.subscription.publish(self.address, result)
+
+    def close(self):
+        self.subscription.close()
+
+class AtlasScientificDeviceSampleFeed(object):
+    # Samples a single device while it has subscribers,
+    # and fans out each new sample to all of them
+    def __init__(self, device_sampler, address, sample_interval):
+        self.feed_log = logging.getLogger(f'AtlasScientificDeviceSampleFeed[{address}]')
+        self.device_sampler = device_sampler
+        self.address = address
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        self.subscriptions = set()
+        self.last_sample = None
+        self.feed_thread = None
+
+    def subscribe(self, subscription=None):
+        subscription = subscription or AtlasScientificSampleSubscription()
+
+        with self.lock:
+            # new subscribers don't need to wait for the next sample
+            if self.last_sample:
+                subscription.publish(self.last_sample.samples)
+
+            self.subscriptions.add(subscription)
+            if self.feed_thread is None:
+                self.feed_thread = threading.Thread(
+                    target=self.__run,
+                    name=f'AtlasScientificDeviceSampleFeed[{self.address}]',
+                    daemon=True
+                )
+                self.feed_thread.start()
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+            if not self.subscriptions:
+                self.wake_event.set()
+        subscription.close()
+
+    def stop(self):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+            self.subscriptions.clear()
+            self.wake_event.set()
+
+        for subscription in subscriptions:
+            subscription.close()
+
+    def __publish(self, result):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+
+        for subscription in subscriptions:
+            subscription.publish(result)
+
+    def __run(self):
+        while True:
+            with self.lock:
+                if not self.subscriptions:
+                    self.feed_thread = None
+                    return
+                # the last subscriber may have left and another subscribed since the last sample,
+                # which mustn't wake every following wait
+                self.wake_event.clear()
+
+            started = time.monotonic()
+            try:
+                # a sample from the background sampler is used when it's recent enough
+                self.device_sampler.read_sample(self.address, self.sample_interval)
+                cached_sample = self.device_sampler.get_cached_sample(self.address)
+                if cached_sample is not None and cached_sample is not self.last_sample:
+                    self.last_sample = cached_sample
+                    self.__publish(cached_sample.samples)
+            except Exception as err:
+                self.feed_log.warning(f'Failed to sample device, {err}')
+                self.__publish(err)
+
+            elapsed = time.monotonic() - started
+            self.wake_event.wait(max(0, self.sample_interval - elapsed))
+
+class AtlasScientificDeviceSampler(object):
+    def __init__(self, device_bus, sample_interval=None, stream_interval=1, sample_store=None, recent_samples=None):
+        self.sampler_log = logging.getLogger('AtlasScientificDeviceSampler')
+        self.device_bus = device_bus
+        # keeps every sample read, when given
+        self.sample_store = sample_store
+        # keeps the latest samples read in memory, when given
+        self.recent_samples = recent_samples
+
+        # seconds between the start of each sampling pass,
+        # None disables background sampling
+        self.sample_interval = sample_interval
+        self.cache_lock = threading.Lock()
+        self.cache = {}
+        self.stop_event = threading.Event()
+        self.sampler_thread = None
+
+        # seconds between each sample sent to subscribers of a device
+        self.stream_interval = stream_interval
+        self.feeds_lock = threading.Lock()
+        self.feeds = {}
+        # subscriptions to many devices which also subscribe to each device found later
+        self.all_subscriptions_lock = threading.Lock()
+        self.new_device_subscriptions = set()
+
+    @property
+    def is_running(self):
+        return self.sampler_thread is not None and self.sampler_thread.is_alive()
+
+    def start(self):
+        if self.sample_interval is None or self.is_running:
+            return
+
+        self.sampler_log.info(f'Starting background sampling every {self.sample_interval} seconds.')
+        self.stop_event.clear()
+        self.sampler_thread = threading.Thread(
+            target=self.__run,
+            name='AtlasScientificDeviceSampler',
+            daemon=True
+        )
+        self.sampler_thread.start()
+
+    def stop(self, timeout_seconds=5):
+        self.stop_event.set()
+        if self.sampler_thread:
+            self.sampler_thread.join(timeout_seconds)
+        self.sampler_thread = None
+
+        with self.feeds_lock:
+            feeds = list(self.feeds.values())
+        for feed in feeds:
+            feed.stop()
+
+    def subscribe(self, address, subscription=None):
+        with self.feeds_lock:
+            feed = self.feeds.get(address, None)
+            if feed is None:
+                feed = AtlasScientificDeviceSampleFeed(self, address, self.stream_interval)
+                self.feeds[address] = feed
+        return feed.subscribe(subscription)
+
+    def subscribe_all(self, addresses, follow_new_devices=False):
+        # subscribes to many devices at once, sampled by the same feeds as each device's subscribers.
+        # When following new devices, each device found afterwards is subscribed to as well
+        subscription = AtlasScientificSamplesSubscription()
+        with self.all_subscriptions_lock:
+            if follow_new_devices:
+                self.new_device_subscriptions.add(subscription)
+            for address in addresses:
+                self.__subscribe_device(subscription, address)
+        return subscription
+
+    def unsubscribe_all(self, subscription):
+        with self.all_subscriptions_lock:
+            self.new_device_subscriptions.discard(subscription)
+            device_subscriptions = list(subscription.device_subscriptions.items())
+        for address, device_subscription in device_subscriptions:
+            self.unsubscribe(address, device_subscription)
+
+    def __subscribe_device(self, subscription, address):
+        if address not in subscription.device_subscriptions:
+            subscription.device_subscriptions[address] = self.subscribe(address, AtlasScientificDeviceSubscription(subscription, address))
+
+    def unsubscribe(self, address, subscription):
+        with self.feeds_lock:
+            feed = self.feeds.get(address, None)
+        if feed:
+            feed.unsubscribe(subscription)
+
+    def get_cached_sample(self, address):
+        with self.cache_lock:
+            return self.cache.get(address, None)
+
+    def forget_cached_sample(self, address):
+        with self.cache_lock:
+            self.cache.pop(address, None)
+
+    def on_device_changed(self, event, device):
+        # samples of a device which has been removed aren't served
+        if event == 'removed':
+            self.forget_cached_sample(device.bus_address)
+        elif event == 'added':
+            with self.all_subscriptions_lock:
+                for subscription in self.new_device_subscriptions:
+                    self.__subscribe_device(subscription, device.bus_address)
+
+    def read_sample(self, address, max_age=None):
+        cached_sample = self.get_cached_sample(address)
+
+        if cached_sample and self.__is_fresh_enough(cached_sample, max_age):
+            return cached_sample.samples
+
+        device = self.device_bus.get_device_by_address(address)
+        return self.sample_device(device)
+
+    def sample_device(self, device):
+        samples = device.read_sample([])
+        self.__cache_sample(device.bus_address, samples)
+        return samples
+
+    def __cache_sample(self, address, samples):
+        with self.cache_lock:
+            self.cache[address] = AtlasScientificCachedSample(samples, time.monotonic())
+
+        if self.recent_samples:
+            self.recent_samples.append(address, samples)
+
+        if self.sample_store:
+            try:
+                self.sample_store.append(address, samples)
+            except Exception as err:
+                self.sampler_log.error(f'Failed to store samples of device at address {address}, {err}')
+
+    def __is_fresh_enough(self, cached_sample, max_age):
+        if max_age is not None:
+            return cached_sample.age(time.monotonic()) <= max_age
+
+        # With no explicit limit, only trust the cache while the background
+        # sampler is keeping it up to date, otherwise every request reads the device
+        return self.is_running and cached_sample.age(time.monotonic()) <= self.sample_interval * max_missed_sample_passes
+
+    def __run(self):
+        while not self.stop_event.is_set():
+            pass_started = time.monotonic()
+
+            try:
+                # sample every device at once, so a pass only takes as long as the slowest device
+                results = self.device_bus.read_samples()
+            except Exception as err:
+                self.sampler_log.warning(f'Failed to sample known devices, {err}')
+                results = {}
+
+            for address, result in results.items():
+                if isinstance(result, Exception):
+                    # don't serve samples from a device which has stopped responding
+                    self.sampler_log.warning(f'Failed to sample device at address {address}, {result}')
+                    self.forget_cached_sample(address)
+                else:
+                    self.__cache_sample(address, result)
+
+            elapsed = time.monotonic() - pass_started
+            self.stop_event.wait(max(0, self.sample_interval - elapsed))
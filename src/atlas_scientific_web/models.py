@@ -1,18 +1,43 @@
 from flask_restx import Api, Resource, fields, Namespace
-from marshmallow import ValidationError, Schema, post_load, fields as m_fields
+from marshmallow import ValidationError, Schema, post_load, fields as m_fields, validate as m_validate
 from .hardware.models import \
     AtlasScientificDeviceCompensationFactor, \
     AtlasScientificDeviceCalibrationPoint, \
     AtlasScientificDeviceConfigurationParameter
+from .hardware.multi_bus import format_bus_address, parse_bus_address
+from .sample_history import supported_aggregations
 
 class DeviceModels(object):
     pass
 
+class DeviceAddressField(m_fields.Field):
+    # an I2C address, or bus:address when devices are spread across many buses
+    def _deserialize(self, value, attr, data, **kwargs):
+        try:
+            bus, address = parse_bus_address(value)
+        except (TypeError, ValueError):
+            raise ValidationError('Not a valid device address.')
+
+        if address < 0 or address > 127 or bus is not None and bus < 0:
+            raise ValidationError('Not a valid device address.')
+        return format_bus_address(bus, address)
+
 def add_device_models(self):
     m = DeviceModels()
+    m.device_error = self.model('device_error', {
+        'message': fields.String(
+            description='A description of the error encountered',
+            example='This is your error message'
+        ),
+        'error_code': fields.String(
+            description='The error code of the error encountered',
+            example='DEVICE_NOT_READY'
+        ),
+    })
+
     m.device_info = self.model('device_info', {
-        'address': fields.Integer(
-            description='The I2C address of the device.',
+        'address': fields.Raw(
+            description='The I2C address of the device, as bus:address when devices are spread across many buses.',
             example='97'
         ),
         'device_type': fields.String(
@@ -52,6 +77,26 @@ def add_device_models(self):
         ),
     })
 
+    m.device_samples_result = self.model('device_samples_result', {
+        'samples': fields.List(
+            fields.Nested(m.device_sample),
+            description='The samples recorded by the device, omitted when the device could not be sampled.'
+        ),
+        'error': fields.Nested(
+            m.device_error,
+            description='The error encountered while sampling the device, omitted when the device was sampled.',
+            allow_null=True,
+            skip_none=True
+        ),
+    })
+
+    m.device_samples = self.model('device_samples', {
+        '*': fields.Wildcard(
+            fields.Nested(m.device_samples_result, skip_none=True),
+            description='The sample result of each device, keyed by the I2C address of the device.'
+        ),
+    })
+
     m.device_sample_output = self.model('device_sample_output', {
         'is_enable': fields.Boolean(
             description='The current enable state of the device output. True indicates the output will be reported when the device is sampled',
@@ -98,6 +143,36 @@ def add_device_models(self):
         ), 
     })
 
+    m.device_calibration_point = self.model('device_calibration_point', {
+        'id': fields.String(
+            description='The calibration point.',
+            example="low"
+        ),
+        'description': fields.String(
+            description='What the calibration point calibrates.',
+            example='Two point calibration at lowpoint'
+        ),
+        'value_type': fields.String(
+            description='The type of the actual value of the calibration point, none when it has no value.',
+            example='float'
+        ),
+    })
+
+    m.device_calibration = self.model('device_calibration', {
+        'point': fields.String(
+            description='The calibration point last set, null until one has been set.',
+            example="mid"
+        ),
+        'is_complete': fields.Boolean(
+            description='If the device is calibrated once the last calibration point is set.',
+            example=True
+        ),
+        'next_points': fields.List(
+            fields.Nested(m.device_calibration_point),
+            description='The calibration points which can be set next.'
+        ),
+    })
+
     class AtlasScientificDeviceCalibrationPointSchema(Schema):
         point = m_fields.Str(required=True)
         actual_value = m_fields.Str(required=False)
@@ -159,6 +234,109 @@ def add_device_models(self):
             return AtlasScientificDeviceConfigurationParameter(**data)
         
     m.device_configuration_parameter_schema = AtlasScientificDeviceConfigurationParameterSchema()
+
+    class DeviceSampleQuerySchema(Schema):
+        # the oldest cached sample in seconds the client is willing to accept
+        max_age = m_fields.Float(required=False, validate=m_validate.Range(min=0))
+
+    m.device_sample_query_schema = DeviceSampleQuerySchema()
+
+    class DeviceSamplesQuerySchema(Schema):
+        # the I2C addresses of the devices to sample, all known devices when omitted
+        address = m_fields.List(DeviceAddressField(), required=False)
+
+    m.device_samples_query_schema = DeviceSamplesQuerySchema()
+
+    class DeviceTelemetryRequestSchema(Schema):
+        # changes the samples sent over a telemetry channel, all output units when unit_code is omitted
+        action = m_fields.Str(required=True, validate=m_validate.OneOf(['subscribe', 'unsubscribe']))
+        address = m_fields.List(DeviceAddressField(), required=True)
+        unit_code = m_fields.List(m_fields.Str(), required=False)
+
+    m.device_telemetry_request_schema = DeviceTelemetryRequestSchema()
+
+    m.device_sample_history = self.model('device_sample_history', {
+        'unit_code': fields.String(
+            description='The unit code of the samples.',
+            example='MG'
+        ),
+        'symbol': fields.String(
+            description='The samples unit of measurement.',
+            example='mg/L'
+        ),
+        'unit': fields.String(
+            description='The name of the samples unit of measurement.',
+            example='Milligrams per litre'
+        ),
+        'resolution': fields.Float(
+            description='The seconds covered by each bucket of samples.',
+            example=60
+        ),
+        'timestamp': fields.List(fields.String(
+            description='The start of each bucket, in UTC. Buckets without samples are omitted.',
+            example='2020-02-25 23:08:00+00:00'
+        )),
+        'count': fields.List(fields.Integer(
+            description='The number of samples in each bucket.',
+            example=60
+        )),
+        'min': fields.List(fields.Float(
+            description='The lowest sample in each bucket.',
+            example=238.1
+        )),
+        'max': fields.List(fields.Float(
+            description='The highest sample in each bucket.',
+            example=241.5
+        )),
+        'mean': fields.List(fields.Float(
+            description='The mean of the samples in each bucket.',
+            example=239.6
+        )),
+    })
+
+    class DeviceSampleHistoryQuerySchema(Schema):
+        # the range of samples, and the seconds covered by each bucket they're aggregated into
+        start = m_fields.DateTime(data_key='from', required=False)
+        end = m_fields.DateTime(data_key='to', required=False)
+        resolution = m_fields.Float(required=False, validate=m_validate.Range(min=0.001))
+        agg = m_fields.Str(required=False, validate=m_validate.Regexp(r'^(min|max|mean)(,(min|max|mean))*$'))
+
+        @post_load
+        def make(self, data, **kwargs):
+            if 'agg' in data:
+                data['agg'] = [a for a in supported_aggregations if a in data['agg'].split(',')]
+            return data
+
+    m.device_sample_history_query_schema = DeviceSampleHistoryQuerySchema()
+
+    m.device_recent_samples = self.model('device_recent_samples', {
+        'unit_code': fields.String(
+            description='The unit code of the samples.',
+            example='PH'
+        ),
+        'symbol': fields.String(
+            description='The samples unit of measurement.',
+            example=''
+        ),
+        'unit': fields.String(
+            description='The name of the samples unit of measurement.',
+            example='Power of Hydrogen'
+        ),
+        'timestamp': fields.List(fields.Integer(
+            description='The time of each sample, in nanoseconds since the unix epoch.',
+            example=1582672093000000000
+        )),
+        'value': fields.List(fields.Float(
+            description='The value of each sample.',
+            example=9.56
+        )),
+    })
+
+    class DeviceRecentSamplesQuerySchema(Schema):
+        # the seconds before the latest sample to include, all samples held when omitted
+        period = m_fields.Float(required=False, validate=m_validate.Range(min=0))
+
+    m.device_recent_samples_query_schema = DeviceRecentSamplesQuerySchema()
     
     return m
 
@@ -0,0 +1,104 @@
+import threading
+
+from array import array
+from bisect import bisect_left
+
+from .sample_store import parse_sample_value
+
+# Keeps the most recent numeric samples of each device address and unit code in memory.
+# Each series is a fixed size ring buffer of int64 timestamps and float64 values,
+# so holding thousands of samples costs 16 bytes each rather than a python object each.
+
+class AtlasScientificSampleRingBuffer(object):
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # nanoseconds since the unix epoch
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0
+        self.next_index = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp_ns, value):
+        # overwrites the oldest sample once full
+        self.timestamps[self.next_index] = timestamp_ns
+        self.values[self.next_index] = value
+        self.next_index = (self.next_index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def read(self, since_ns=None):
+        # returns copies of the timestamps and values, oldest first,
+        # of samples taken at or after since_ns
+        first = self.next_index - self.count
+        if first >= 0:
+            timestamps = self.timestamps[first:self.next_index]
+            values = self.values[first:self.next_index]
+        else:
+            timestamps = self.timestamps[first:] + self.timestamps[:self.next_index]
+            values = self.values[first:] + self.values[:self.next_index]
+
+        if since_ns is not None:
+            # samples are appended in the order they're read, which is almost always time order
+            start = bisect_left(timestamps, since_ns)
+            timestamps, values = timestamps[start:], values[start:]
+        return timestamps, values
+
+class AtlasScientificRecentSamples(object):
+    def __init__(self, capacity=3600):
+        # the most samples kept of each series, an hour when sampling every second
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        # (address, unit_code) -> AtlasScientificSampleRingBuffer
+        self.series = {}
+
+    def append(self, address, samples):
+        # keeps the numeric values of a device's samples, others such as strings are ignored
+        with self.lock:
+            for sample in samples:
+                value = parse_sample_value(sample)
+                if value is None:
+                    continue
+
+                key = (address, sample.unit_code)
+                ring_buffer = self.series.get(key, None)
+                if ring_buffer is None:
+                    ring_buffer = AtlasScientificSampleRingBuffer(self.capacity)
+                    self.series[key] = ring_buffer
+                ring_buffer.append(to_timestamp_ns(sample.timestamp), value)
+
+    def read(self, address, unit_code, period=None):
+        # reads the samples of a series, limited to those taken within
+        # period seconds of the latest sample when given
+        with self.lock:
+            ring_buffer = self.series.get((address, unit_code), None)
+            if ring_buffer is None or not len(ring_buffer):
+                return array('q'), array('d')
+
+            if period is None:
+                return ring_buffer.read()
+
+            latest_ns = ring_buffer.timestamps[ring_buffer.next_index - 1]
+            return ring_buffer.read(latest_ns - int(period * 1e9))
+
+def to_timestamp_ns(timestamp):
+    # avoids float rounding of the whole timestamp, which can't hold nanoseconds
+    seconds = int(timestamp.timestamp())
+    return seconds * 1000000000 + timestamp.microsecond * 1000
+
+def read_recent_samples(recent_samples, device, period=None):
+    recent = []
+    for output in device.get_supported_output_measurements():
+        timestamps, values = recent_samples.read(device.bus_address, output.unit_code, period)
+        if not timestamps:
+            continue
+
+        recent.append({
+            'unit_code': output.unit_code,
+            'symbol': output.symbol,
+            'unit': output.unit,
+            'timestamp': timestamps.tolist(),
+            'value': values.tolist(),
+        })
+    return recent
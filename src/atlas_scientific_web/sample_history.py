@@ -0,0 +1,152 @@
+import math
+import numpy
+
+from datetime import datetime, timedelta, timezone
+
+from .sample_store import SampleHistoryNotEnabledError, to_timestamp_ms
+
+supported_aggregations = ['min', 'max', 'mean']
+
+# the history returned when no range is requested
+default_history_period = timedelta(days=1)
+
+# the most buckets returned when no resolution is requested
+default_bucket_count = 500
+
+def read_sample_history(sample_store, device, history_query):
+    # Reads each of the device's stored series within the requested range,
+    # aggregated into buckets of the requested resolution
+    if sample_store is None:
+        raise SampleHistoryNotEnabledError
+
+    end = history_query.get('end', None) or datetime.now(timezone.utc)
+    start = history_query.get('start', None) or end - default_history_period
+    start_ms = to_timestamp_ms(as_utc(start))
+    end_ms = to_timestamp_ms(as_utc(end))
+
+    resolution = history_query.get('resolution', None) or max(math.ceil((end_ms - start_ms) / 1000 / default_bucket_count), 1)
+    resolution_ms = int(round(resolution * 1000))
+    aggregations = history_query.get('agg', None) or supported_aggregations
+
+    history = []
+    stored_unit_codes = set(sample_store.get_unit_codes(device.bus_address))
+    for output in device.get_supported_output_measurements():
+        if output.unit_code not in stored_unit_codes:
+            continue
+
+        # aggregated a block at a time, rather than reading every sample of the range at once
+        series_buckets = AtlasScientificSampleBuckets(start_ms, resolution_ms, end_ms)
+        for block in sample_store.read_blocks(device.bus_address, output.unit_code, start_ms, end_ms):
+            series_buckets.add_block(block)
+        buckets = series_buckets.get_aggregations(aggregations)
+
+        bucket_history = {
+            'unit_code': output.unit_code,
+            'symbol': output.symbol,
+            'unit': output.unit,
+            'resolution': resolution,
+            'timestamp': [str(datetime.fromtimestamp(t / 1000, timezone.utc)) for t in buckets['timestamp']],
+            'count': buckets['count'],
+        }
+        for aggregation in aggregations:
+            bucket_history[aggregation] = buckets[aggregation]
+        history.append(bucket_history)
+
+    return history
+
+class AtlasScientificSampleBuckets(object):
+    # The count, min, max and sum of the samples in each bucket of resolution_ms from start_ms,
+    # accumulated from any number of blocks of samples, in any order
+    def __init__(self, start_ms, resolution_ms, end_ms=None):
+        self.start_ms = start_ms
+        self.resolution_ms = resolution_ms
+        # samples after end_ms are ignored, when given
+        self.end_ms = end_ms
+        # bucket index -> [count, min, max, sum]
+        self.buckets = {}
+
+    def get_bucket_index(self, timestamp_ms):
+        return (timestamp_ms - self.start_ms) // self.resolution_ms
+
+    def add_block(self, block):
+        # a block whose samples all fall within one bucket is added from its summary, without decoding them
+        bucket_index = self.get_bucket_index(block.start_ms)
+        is_within_range = block.start_ms >= self.start_ms and (self.end_ms is None or block.end_ms <= self.end_ms)
+        if is_within_range and bucket_index == self.get_bucket_index(block.end_ms):
+            self.add_summary(bucket_index, block.count, block.minimum, block.maximum, block.total)
+            return
+
+        timestamps, values = block.decode()
+        self.add_samples(timestamps, values)
+
+    def add_summary(self, bucket_index, count, minimum, maximum, total):
+        bucket = self.buckets.get(bucket_index, None)
+        if bucket is None:
+            self.buckets[bucket_index] = [count, minimum, maximum, total]
+            return
+
+        bucket[0] += count
+        bucket[1] = min(bucket[1], minimum)
+        bucket[2] = max(bucket[2], maximum)
+        bucket[3] += total
+
+    def add_samples(self, timestamps, values):
+        timestamps = numpy.asarray(timestamps, dtype=numpy.int64)
+        values = numpy.asarray(values, dtype=numpy.float64)
+
+        is_within_range = timestamps >= self.start_ms
+        if self.end_ms is not None:
+            is_within_range &= timestamps <= self.end_ms
+        if not is_within_range.all():
+            timestamps = timestamps[is_within_range]
+            values = values[is_within_range]
+        if not len(timestamps):
+            return
+
+        # samples are almost always in time order, otherwise they're sorted
+        # so that each bucket's samples are next to each other
+        bucket_indexes = (timestamps - self.start_ms) // self.resolution_ms
+        if (bucket_indexes[1:] < bucket_indexes[:-1]).any():
+            order = numpy.argsort(bucket_indexes, kind='stable')
+            bucket_indexes = bucket_indexes[order]
+            values = values[order]
+
+        buckets, bucket_starts, counts = numpy.unique(bucket_indexes, return_index=True, return_counts=True)
+        summaries = zip(
+            buckets.tolist(),
+            counts.tolist(),
+            numpy.minimum.reduceat(values, bucket_starts).tolist(),
+            numpy.maximum.reduceat(values, bucket_starts).tolist(),
+            numpy.add.reduceat(values, bucket_starts).tolist())
+        for summary in summaries:
+            self.add_summary(*summary)
+
+    def get_aggregations(self, aggregations):
+        # returns the start time and sample count of each bucket holding a sample, along with each aggregation of its values
+        bucket_indexes = sorted(self.buckets)
+        buckets = [self.buckets[bucket_index] for bucket_index in bucket_indexes]
+
+        result = {
+            'timestamp': [self.start_ms + bucket_index * self.resolution_ms for bucket_index in bucket_indexes],
+            'count': [count for count, _, _, _ in buckets],
+        }
+        if 'min' in aggregations:
+            result['min'] = [minimum for _, minimum, _, _ in buckets]
+        if 'max' in aggregations:
+            result['max'] = [maximum for _, _, maximum, _ in buckets]
+        if 'mean' in aggregations:
+            result['mean'] = [total / count for count, _, _, total in buckets]
+        return result
+
+def downsample(timestamps, values, start_ms, resolution_ms, aggregations):
+    # Groups the samples into buckets of resolution_ms from start_ms, returning the start time
+    # and sample count of each bucket holding a sample, along with each aggregation of its values
+    buckets = AtlasScientificSampleBuckets(start_ms, resolution_ms)
+    buckets.add_samples(timestamps, values)
+    return buckets.get_aggregations(aggregations)
+
+def as_utc(timestamp):
+    # timestamps without a timezone are assumed to be UTC, as samples are
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
@@ -0,0 +1,355 @@
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote
+
+# An append-only store of numeric samples, kept as a series per device address and unit code.
+#
+# Samples are buffered in memory and appended to the series' file for the day as a block,
+# so the SD card is written once per block rather than once per sample.
+# Each block holds its timestamps and values as separate columns,
+#  - timestamps, in milliseconds, as varint encoded deltas of deltas. Samples taken
+#    at a regular interval take a byte each
+#  - values, as float64s XOR'ed with the previous value, with zero leading and trailing
+#    bytes dropped. Unchanged values take a byte each
+# Each block is headed by a summary of its samples, their count, earliest and latest timestamp,
+# and min, max and sum of their values, so it can be aggregated without decoding its samples.
+# Blocks end with a CRC, so a block partially written before a power cut is skipped,
+# and reading resumes at the next block appended after it.
+
+class SampleHistoryNotEnabledError(Exception):
+    pass
+
+block_magic = b'AS'
+block_version = 2
+block_header = struct.Struct('<2sB')
+block_summary = struct.Struct('<qqddd')
+block_crc = struct.Struct('<I')
+
+class AtlasScientificSampleSeries(object):
+    def __init__(self, timestamps, values):
+        # milliseconds since the unix epoch, in ascending order
+        self.timestamps = timestamps
+        self.values = values
+
+    def __len__(self):
+        return len(self.timestamps)
+
+class AtlasScientificSampleBlock(object):
+    def __init__(self, summary, decode_samples):
+        self.count, self.start_ms, self.end_ms, self.minimum, self.maximum, self.total = summary
+        self.decode_samples = decode_samples
+
+    def decode(self):
+        # returns the block's timestamps and values, as array buffers
+        return self.decode_samples()
+
+class AtlasScientificSampleStore(object):
+    def __init__(self, path, block_size=300, flush_interval=300):
+        self.store_log = logging.getLogger('AtlasScientificSampleStore')
+        self.path = path
+        # the most samples buffered in a series before they are written as a block
+        self.block_size = block_size
+        # the most seconds a sample is buffered before being written
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        # (address, unit_code) -> ([timestamps], [values], monotonic time of first sample)
+        self.buffers = {}
+
+    def append(self, address, samples):
+        # stores the numeric values of a device's samples, others such as strings are ignored
+        with self.lock:
+            for sample in samples:
+                value = parse_sample_value(sample)
+                if value is None:
+                    continue
+
+                key = (address, sample.unit_code)
+                if key not in self.buffers:
+                    self.buffers[key] = ([], [], time.monotonic())
+
+                timestamps, values, _ = self.buffers[key]
+                timestamps.append(to_timestamp_ms(sample.timestamp))
+                values.append(value)
+
+            self.__flush_due(time.monotonic())
+
+    def flush(self):
+        with self.lock:
+            for key in list(self.buffers):
+                self.__flush_series(key)
+
+    def close(self):
+        self.flush()
+
+    def get_unit_codes(self, address):
+        with self.lock:
+            unit_codes = set(unit_code for a, unit_code in self.buffers if a == address)
+        address_path = os.path.join(self.path, str(address))
+        if os.path.isdir(address_path):
+            unit_codes.update(unquote(name) for name in os.listdir(address_path))
+        return sorted(unit_codes)
+
+    def read(self, address, unit_code, start_ms=None, end_ms=None):
+        # reads the samples of a series within the optional range, inclusive of both ends
+        timestamps = array('q')
+        values = array('d')
+
+        for block in self.read_blocks(address, unit_code, start_ms, end_ms):
+            block_timestamps, block_values = block.decode()
+            timestamps.extend(block_timestamps)
+            values.extend(block_values)
+
+        # samples are appended in the order they're read, which is almost always time order
+        if any(a > b for a, b in zip(timestamps, timestamps[1:])):
+            ordered = sorted(zip(timestamps, values), key=lambda s: s[0])
+            timestamps, values = [t for t, _ in ordered], [v for _, v in ordered]
+
+        first = bisect_left(timestamps, start_ms) if start_ms is not None else 0
+        last = bisect_right(timestamps, end_ms) if end_ms is not None else len(timestamps)
+
+        return AtlasScientificSampleSeries(list(timestamps[first:last]), list(values[first:last]))
+
+    def read_blocks(self, address, unit_code, start_ms=None, end_ms=None):
+        # yields each block of a series holding samples within the optional range, followed by
+        # the samples yet to be written. Blocks may also hold samples outside of the range
+        yield from self.__read_blocks(address, unit_code, start_ms, end_ms)
+
+        with self.lock:
+            buffered_timestamps, buffered_values, _ = self.buffers.get((address, unit_code), ([], [], None))
+            timestamps = array('q', buffered_timestamps)
+            values = array('d', buffered_values)
+
+        if not timestamps:
+            return
+
+        block = AtlasScientificSampleBlock(summarise_samples(timestamps, values), lambda: (timestamps, values))
+        if (start_ms is None or block.end_ms >= start_ms) and (end_ms is None or block.start_ms <= end_ms):
+            yield block
+
+    def __flush_due(self, now):
+        for key, (timestamps, _, buffered_at) in list(self.buffers.items()):
+            if len(timestamps) >= self.block_size or now - buffered_at >= self.flush_interval:
+                self.__flush_series(key)
+
+    def __flush_series(self, key):
+        timestamps, values, _ = self.buffers.pop(key)
+        if not timestamps:
+            return
+
+        address, unit_code = key
+        series_path = self.__get_series_path(address, unit_code)
+        os.makedirs(series_path, exist_ok=True)
+
+        file_path = os.path.join(series_path, get_segment_name(timestamps[0]))
+        try:
+            with open(file_path, 'ab') as f:
+                f.write(encode_block(timestamps, values))
+        except OSError as err:
+            self.store_log.error(f'Failed to write {len(timestamps)} samples to {file_path}, {err}')
+
+    def __read_blocks(self, address, unit_code, start_ms, end_ms):
+        series_path = self.__get_series_path(address, unit_code)
+        if not os.path.isdir(series_path):
+            return
+
+        # a block is stored in the segment of its first sample, so may run into the next day
+        first_segment = get_segment_name(start_ms - segment_ms) if start_ms is not None else None
+        last_segment = get_segment_name(end_ms) if end_ms is not None else None
+
+        for segment in sorted(os.listdir(series_path)):
+            if first_segment and segment < first_segment or last_segment and segment > last_segment:
+                continue
+
+            with open(os.path.join(series_path, segment), 'rb') as f:
+                data = f.read()
+
+            for block in decode_blocks(data):
+                if start_ms is not None and block.end_ms < start_ms:
+                    continue
+                if end_ms is not None and block.start_ms > end_ms:
+                    continue
+                yield block
+
+    def __get_series_path(self, address, unit_code):
+        # unit codes such as '%' aren't safe file names
+        return os.path.join(self.path, str(address), quote(unit_code, safe=''))
+
+segment_ms = 24 * 60 * 60 * 1000
+
+def get_segment_name(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).strftime('%Y-%m-%d') + '.blocks'
+
+def to_timestamp_ms(timestamp):
+    return int(round(timestamp.timestamp() * 1000))
+
+def parse_sample_value(sample):
+    if sample.value_type != 'float':
+        return None
+    return sample.numeric_value
+
+def summarise_samples(timestamps, values):
+    return len(timestamps), min(timestamps), max(timestamps), min(values), max(values), sum(values)
+
+def encode_block(timestamps, values):
+    timestamp_bytes = encode_timestamps(timestamps)
+    value_bytes = encode_values(values)
+    block = block_header.pack(block_magic, block_version) \
+        + encode_varint(len(timestamps)) \
+        + encode_varint(len(timestamp_bytes)) \
+        + encode_varint(len(value_bytes)) \
+        + block_summary.pack(*summarise_samples(timestamps, values)[1:]) \
+        + timestamp_bytes \
+        + value_bytes
+    return block + block_crc.pack(zlib.crc32(block))
+
+def decode_blocks(data):
+    # yields each block, skipping incomplete or corrupt blocks.
+    # The samples of a block are only decoded when it's asked to be
+    offset = 0
+    while offset < len(data):
+        start = offset
+        try:
+            magic, version = block_header.unpack_from(data, offset)
+            if magic != block_magic or version != block_version:
+                raise ValueError('unexpected block header')
+            offset += block_header.size
+
+            count, offset = decode_varint(data, offset)
+            timestamps_length, offset = decode_varint(data, offset)
+            values_length, offset = decode_varint(data, offset)
+
+            summary = (count,) + block_summary.unpack_from(data, offset)
+            offset += block_summary.size
+
+            timestamps_end = offset + timestamps_length
+            values_end = timestamps_end + values_length
+            crc, = block_crc.unpack_from(data, values_end)
+            if crc != zlib.crc32(data[start:values_end]):
+                raise ValueError('block crc mismatch')
+
+            block = decode_block(data[offset:timestamps_end], data[timestamps_end:values_end], count, summary)
+            offset = values_end + block_crc.size
+        except (ValueError, IndexError, struct.error) as err:
+            # blocks are still appended after a block cut short by a power cut, so
+            # reading resumes at the next block header, which the crc confirms
+            offset = data.find(block_magic, start + 1)
+            logging.getLogger('AtlasScientificSampleStore').warning(f'Ignoring unreadable samples, {err}')
+            if offset == -1:
+                return
+            continue
+
+        yield block
+
+def decode_block(timestamp_bytes, value_bytes, count, summary):
+    return AtlasScientificSampleBlock(summary, lambda: (decode_timestamps(timestamp_bytes, count), decode_values(value_bytes, count)))
+
+def encode_timestamps(timestamps):
+    # the first timestamp is stored in full, the rest as the change in the time between samples
+    encoded = bytearray()
+    previous = None
+    previous_delta = 0
+    for timestamp in timestamps:
+        if previous is None:
+            encoded += encode_varint(zigzag(timestamp))
+        else:
+            delta = timestamp - previous
+            encoded += encode_varint(zigzag(delta - previous_delta))
+            previous_delta = delta
+        previous = timestamp
+    return bytes(encoded)
+
+def decode_timestamps(data, count):
+    timestamps = array('q')
+    if not count:
+        return timestamps
+
+    value, offset = decode_varint(data, 0)
+    timestamp = unzigzag(value)
+    timestamps.append(timestamp)
+
+    previous_delta = 0
+    for _ in range(count - 1):
+        value, offset = decode_varint(data, offset)
+        previous_delta += unzigzag(value)
+        timestamp += previous_delta
+        timestamps.append(timestamp)
+    return timestamps
+
+def encode_values(values):
+    # each value is a control byte, with the count of leading and trailing zero bytes
+    # of the XOR with the previous value, followed by the bytes between them
+    encoded = bytearray()
+    previous = 0
+    for value in values:
+        bits = float_bits(value)
+        xor = (bits ^ previous).to_bytes(8, 'big')
+        previous = bits
+
+        leading = len(xor) - len(xor.lstrip(b'\x00'))
+        if leading == 8:
+            encoded.append(0x80)
+            continue
+
+        trailing = len(xor) - len(xor.rstrip(b'\x00'))
+        encoded.append(leading << 3 | trailing)
+        encoded += xor[leading:8 - trailing]
+    return bytes(encoded)
+
+def decode_values(data, count):
+    # the bits of each value are decoded, then read as float64s all at once
+    bits = array('Q')
+    offset = 0
+    previous = 0
+    for _ in range(count):
+        control = data[offset]
+        offset += 1
+        if control != 0x80:
+            leading, trailing = control >> 3, control & 0x07
+            length = 8 - leading - trailing
+            xor = int.from_bytes(data[offset:offset + length], 'big') << (trailing * 8)
+            offset += length
+            previous ^= xor
+        bits.append(previous)
+
+    values = array('d')
+    values.frombytes(bits.tobytes())
+    return values
+
+def float_bits(value):
+    return struct.unpack('<Q', struct.pack('<d', value))[0]
+
+def zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+def encode_varint(value):
+    encoded = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
+
+def decode_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
@@ -27,5 +27,4 @@ object-assign
  *
  * This source code is licensed under the MIT license found in the
  * LICENSE file in the root directory of this source tree.
- */var r,l,i,a,o;if("undefined"==typeof window||"function"!=typeof MessageChannel){var u=null,c=null,s=function(){if(null!==u)try{var e=t.unstable_now();u(!0,e),u=null}catch(e){throw setTimeout(s,0),e}},f=Date.now();t.unstable_now=function(){return Date.now()-f},r=function(e){null!==u?setTimeout(r,0,e):(u=e,setTimeout(s,0))},l=function(e,t){c=setTimeout(e,t)},i=function(){clearTimeout(c)},a=function(){return!1},o=t.unstable_forceFrameRate=function(){}}else{var d=window.performance,p=window.Date,m=window.setTimeout,h=window.clearTimeout;if("undefined"!=typeof console){var v=window.cancelAnimationFrame;"function"!=typeof window.requestAnimationFrame&&console.error("This browser doesn't support requestAnimationFrame. Make sure that you load a polyfill in older browsers. https://fb.me/react-polyfills"),"function"!=typeof v&&console.error("This browser doesn't support cancelAnimationFrame. Make sure that you load a polyfill in older browsers. https://fb.me/react-polyfills")}if("object"==typeof d&&"function"==typeof d.now)t.unstable_now=function(){return d.now()};else{var y=p.now();t.unstable_now=function(){return p.now()-y}}var g=!1,b=null,w=-1,k=5,x=0;a=function(){return t.unstable_now()>=x},o=function(){},t.unstable_forceFrameRate=function(e){0>e||125<e?console.error("forceFrameRate takes a positive int between 0 and 125, forcing framerates higher than 125 fps is not unsupported"):k=0<e?Math.floor(1e3/e):5};var E=new MessageChannel,T=E.port2;E.port1.onmessage=function(){if(null!==b){var e=t.unstable_now();x=e+k;try{b(!0,e)?T.postMessage(null):(g=!1,b=null)}catch(e){throw T.postMessage(null),e}}else g=!1},r=function(e){b=e,g||(g=!0,T.postMessage(null))},l=function(e,n){w=m((function(){e(t.unstable_now())}),n)},i=function(){h(w),w=-1}}function S(e,t){var n=e.length;e.push(t);e:for(;;){var r=n-1>>>1,l=e[r];if(!(void 0!==l&&0<P(l,t)))break e;e[r]=t,e[n]=l,n=r}}function C(e){return void 0===(e=e[0])?null:e}function _(e){var t=e[0];if(void 0!==t){var n=e.pop();if(n!==t){e[0]=n;e:for(var r=0,l=e.length;r<l;){var i=2*(r+1)-1,a=e[i],o=i+1,u=e[o];if(void 0!==a&&0>P(a,n))void 0!==u&&0>P(u,a)?(e[r]=u,e[o]=n,r=o):(e[r]=a,e[i]=n,r=i);else{if(!(void 0!==u&&0>P(u,n)))break e;e[r]=u,e[o]=n,r=o}}}return t}return null}function P(e,t){var n=e.sortIndex-t.sortIndex;return 0!==n?n:e.id-t.id}var N=[],O=[],z=1,M=null,R=3,I=!1,F=!1,D=!1;function L(e){for(var t=C(O);null!==t;){if(null===t.callback)_(O);else{if(!(t.startTime<=e))break;_(O),t.sortIndex=t.expirationTime,S(N,t)}t=C(O)}}function A(e){if(D=!1,L(e),!F)if(null!==C(N))F=!0,r(j);else{var t=C(O);null!==t&&l(A,t.startTime-e)}}function j(e,n){F=!1,D&&(D=!1,i()),I=!0;var r=R;try{for(L(n),M=C(N);null!==M&&(!(M.expirationTime>n)||e&&!a());){var o=M.callback;if(null!==o){M.callback=null,R=M.priorityLevel;var u=o(M.expirationTime<=n);n=t.unstable_now(),"function"==typeof u?M.callback=u:M===C(N)&&_(N),L(n)}else _(N);M=C(N)}if(null!==M)var c=!0;else{var s=C(O);null!==s&&l(A,s.startTime-n),c=!1}return c}finally{M=null,R=r,I=!1}}function U(e){switch(e){case 1:return-1;case 2:return 250;case 5:return 1073741823;case 4:return 1e4;default:return 5e3}}var V=o;t.unstable_IdlePriority=5,t.unstable_ImmediatePriority=1,t.unstable_LowPriority=4,t.unstable_NormalPriority=3,t.unstable_Profiling=null,t.unstable_UserBlockingPriority=2,t.unstable_cancelCallback=function(e){e.callback=null},t.unstable_continueExecution=function(){F||I||(F=!0,r(j))},t.unstable_getCurrentPriorityLevel=function(){return R},t.unstable_getFirstCallbackNode=function(){return C(N)},t.unstable_next=function(e){switch(R){case 1:case 2:case 3:var t=3;break;default:t=R}var n=R;R=t;try{return e()}finally{R=n}},t.unstable_pauseExecution=function(){},t.unstable_requestPaint=V,t.unstable_runWithPriority=function(e,t){switch(e){case 1:case 2:case 3:case 4:case 5:break;default:e=3}var n=R;R=e;try{return t()}finally{R=n}},t.unstable_scheduleCallback=function(e,n,a){var o=t.unstable_now();if("object"==typeof a&&null!==a){var u=a.delay;u="number"==typeof u&&0<u?o+u:o,a="number"==typeof a.timeout?a.timeout:U(e)}else a=U(e),u=o;return e={id:z++,callback:n,priorityLevel:e,startTime:u,expirationTime:a=u+a,sortIndex:-1},u>o?(e.sortIndex=u,S(O,e),null===C(N)&&e===C(O)&&(D?i():D=!0,l(A,u-o))):(e.sortIndex=a,S(N,e),F||I||(F=!0,r(j))),e},t.unstable_shouldYield=function(){var e=t.unstable_now();L(e);var n=C(N);return n!==M&&null!==M&&null!==n&&null!==n.callback&&n.startTime<=e&&n.expirationTime<M.expirationTime||a()},t.unstable_wrapCallback=function(e){var t=R;return function(){var n=R;R=t;try{return e.apply(this,arguments)}finally{R=n}}}},function(e,t,n){},function(e,t,n){"use strict";n.r(t);var r=n(0),l=n.n(r),i=n(2),a=n.n(i);function o(e){return(o="function"==typeof Symbol&&"symbol"==typeof Symbol.iterator?function(e){return typeof e}:function(e){return e&&"function"==typeof Symbol&&e.constructor===Symbol&&e!==Symbol.prototype?"symbol":typeof e})(e)}function u(e,t){if(!(e instanceof t))throw new TypeError("Cannot call a class as a function")}function c(e,t){for(var n=0;n<t.length;n++){var r=t[n];r.enumerable=r.enumerable||!1,r.configurable=!0,"value"in r&&(r.writable=!0),Object.defineProperty(e,r.key,r)}}function s(e,t,n){return t&&c(e.prototype,t),n&&c(e,n),e}function f(e,t){if("function"!=typeof t&&null!==t)throw new TypeError("Super expression must either be null or a function");e.prototype=Object.create(t&&t.prototype,{constructor:{value:e,writable:!0,configurable:!0}}),t&&d(e,t)}function d(e,t){return(d=Object.setPrototypeOf||function(e,t){return e.__proto__=t,e})(e,t)}function p(e){var t=function(){if("undefined"==typeof Reflect||!Reflect.construct)return!1;if(Reflect.construct.sham)return!1;if("function"==typeof Proxy)return!0;try{return Date.prototype.toString.call(Reflect.construct(Date,[],(function(){}))),!0}catch(e){return!1}}();return function(){var n,r=h(e);if(t){var l=h(this).constructor;n=Reflect.construct(r,arguments,l)}else n=r.apply(this,arguments);return m(this,n)}}function m(e,t){return!t||"object"!==o(t)&&"function"!=typeof t?function(e){if(void 0===e)throw new ReferenceError("this hasn't been initialised - super() hasn't been called");return e}(e):t}function h(e){return(h=Object.setPrototypeOf?Object.getPrototypeOf:function(e){return e.__proto__||Object.getPrototypeOf(e)})(e)}var v=function(e){f(n,e);var t=p(n);function n(){return u(this,n),t.apply(this,arguments)}return s(n,[{key:"render",value:function(){return l.a.createElement("div",null,l.a.createElement("div",{className:"header"},this.props.title),l.a.createElement(y,null))}}]),n}(l.a.Component),y=function(e){f(n,e);var t=p(n);function n(){var e;return u(this,n),(e=t.call(this)).state={devices:[]},e}return s(n,[{key:"componentDidMount",value:function(){var e=this;fetch("/api/device").then((function(e){return e.json()})).then((function(t){return e.setState({devices:t})}))}},{key:"render",value:function(){return l.a.createElement("div",null,this.state.devices.map((function(e){return l.a.createElement(g,e)})))}}]),n}(l.a.Component),g=function(e){f(n,e);var t=p(n);function n(){var e;return u(this,n),(e=t.call(this)).state={samples:[{value:"",symbol:""}]},e}return s(n,[{key:"componentDidMount",value:function(){var e=this;this.sampleDevice(),this.timer=setInterval((function(){return e.sampleDevice()}),1e3)}},{key:"componentWillUnmount",value:function(){clearInterval(this.timer),this.timer=null}},{key:"sampleDevice",value:function(){var e=this;fetch("/api/device/"+this.props.address+"/sample").then((function(e){return e.json()})).then((function(t){return e.setState({samples:t})}))}},{key:"render",value:function(){var e=this.props;return l.a.createElement("div",null,l.a.createElement("h1",{className:"p-3 mb-2 text-white "+e.device_type.toLowerCase()+"_device"},e.device_type," :",this.state.samples.map((function(e){return l.a.createElement(b,e)})).reduce((function(e,t){return[e," ",t]}))))}}]),n}(l.a.Component),b=function(e){return e.symbol?l.a.createElement(l.a.Fragment,null,e.value," ",e.symbol):l.a.createElement(l.a.Fragment,null,e.value)},w=v;n(7);a.a.render(l.a.createElement(l.a.StrictMode,null,l.a.createElement(w,null)),document.getElementById("app"))}]);
-//# sourceMappingURL=bundle.ac23bd04b5b6b7aa49c7.js.map
\ No newline at end of file
+ */var r,l,i,a,o;if("undefined"==typeof window||"function"!=typeof MessageChannel){var u=null,c=null,s=function(){if(null!==u)try{var e=t.unstable_now();u(!0,e),u=null}catch(e){throw setTimeout(s,0),e}},f=Date.now();t.unstable_now=function(){return Date.now()-f},r=function(e){null!==u?setTimeout(r,0,e):(u=e,setTimeout(s,0))},l=function(e,t){c=setTimeout(e,t)},i=function(){clearTimeout(c)},a=function(){return!1},o=t.unstable_forceFrameRate=function(){}}else{var d=window.performance,p=window.Date,m=window.setTimeout,h=window.clearTimeout;if("undefined"!=typeof console){var v=window.cancelAnimationFrame;"function"!=typeof window.requestAnimationFrame&&console.error("This browser doesn't support requestAnimationFrame. Make sure that you load a polyfill in older browsers. https://fb.me/react-polyfills"),"function"!=typeof v&&console.error("This browser doesn't support cancelAnimationFrame. Make sure that you load a polyfill in older browsers. https://fb.me/react-polyfills")}if("object"==typeof d&&"function"==typeof d.now)t.unstable_now=function(){return d.now()};else{var y=p.now();t.unstable_now=function(){return p.now()-y}}var g=!1,b=null,w=-1,k=5,x=0;a=function(){return t.unstable_now()>=x},o=function(){},t.unstable_forceFrameRate=function(e){0>e||125<e?console.error("forceFrameRate takes a positive int between 0 and 125, forcing framerates higher than 125 fps is not unsupported"):k=0<e?Math.floor(1e3/e):5};var E=new MessageChannel,T=E.port2;E.port1.onmessage=function(){if(null!==b){var e=t.unstable_now();x=e+k;try{b(!0,e)?T.postMessage(null):(g=!1,b=null)}catch(e){throw T.postMessage(null),e}}else g=!1},r=function(e){b=e,g||(g=!0,T.postMessage(null))},l=function(e,n){w=m((function(){e(t.unstable_now())}),n)},i=function(){h(w),w=-1}}function S(e,t){var n=e.length;e.push(t);e:for(;;){var r=n-1>>>1,l=e[r];if(!(void 0!==l&&0<P(l,t)))break e;e[r]=t,e[n]=l,n=r}}function C(e){return void 0===(e=e[0])?null:e}function _(e){var t=e[0];if(void 0!==t){var n=e.pop();if(n!==t){e[0]=n;e:for(var r=0,l=e.length;r<l;){var i=2*(r+1)-1,a=e[i],o=i+1,u=e[o];if(void 0!==a&&0>P(a,n))void 0!==u&&0>P(u,a)?(e[r]=u,e[o]=n,r=o):(e[r]=a,e[i]=n,r=i);else{if(!(void 0!==u&&0>P(u,n)))break e;e[r]=u,e[o]=n,r=o}}}return t}return null}function P(e,t){var n=e.sortIndex-t.sortIndex;return 0!==n?n:e.id-t.id}var N=[],O=[],z=1,M=null,R=3,I=!1,F=!1,D=!1;function L(e){for(var t=C(O);null!==t;){if(null===t.callback)_(O);else{if(!(t.startTime<=e))break;_(O),t.sortIndex=t.expirationTime,S(N,t)}t=C(O)}}function A(e){if(D=!1,L(e),!F)if(null!==C(N))F=!0,r(j);else{var t=C(O);null!==t&&l(A,t.startTime-e)}}function j(e,n){F=!1,D&&(D=!1,i()),I=!0;var r=R;try{for(L(n),M=C(N);null!==M&&(!(M.expirationTime>n)||e&&!a());){var o=M.callback;if(null!==o){M.callback=null,R=M.priorityLevel;var u=o(M.expirationTime<=n);n=t.unstable_now(),"function"==typeof u?M.callback=u:M===C(N)&&_(N),L(n)}else _(N);M=C(N)}if(null!==M)var c=!0;else{var s=C(O);null!==s&&l(A,s.startTime-n),c=!1}return c}finally{M=null,R=r,I=!1}}function U(e){switch(e){case 1:return-1;case 2:return 250;case 5:return 1073741823;case 4:return 1e4;default:return 5e3}}var V=o;t.unstable_IdlePriority=5,t.unstable_ImmediatePriority=1,t.unstable_LowPriority=4,t.unstable_NormalPriority=3,t.unstable_Profiling=null,t.unstable_UserBlockingPriority=2,t.unstable_cancelCallback=function(e){e.callback=null},t.unstable_continueExecution=function(){F||I||(F=!0,r(j))},t.unstable_getCurrentPriorityLevel=function(){return R},t.unstable_getFirstCallbackNode=function(){return C(N)},t.unstable_next=function(e){switch(R){case 1:case 2:case 3:var t=3;break;default:t=R}var n=R;R=t;try{return e()}finally{R=n}},t.unstable_pauseExecution=function(){},t.unstable_requestPaint=V,t.unstable_runWithPriority=function(e,t){switch(e){case 1:case 2:case 3:case 4:case 5:break;default:e=3}var n=R;R=e;try{return t()}finally{R=n}},t.unstable_scheduleCallback=function(e,n,a){var o=t.unstable_now();if("object"==typeof a&&null!==a){var u=a.delay;u="number"==typeof u&&0<u?o+u:o,a="number"==typeof a.timeout?a.timeout:U(e)}else a=U(e),u=o;return e={id:z++,callback:n,priorityLevel:e,startTime:u,expirationTime:a=u+a,sortIndex:-1},u>o?(e.sortIndex=u,S(O,e),null===C(N)&&e===C(O)&&(D?i():D=!0,l(A,u-o))):(e.sortIndex=a,S(N,e),F||I||(F=!0,r(j))),e},t.unstable_shouldYield=function(){var e=t.unstable_now();L(e);var n=C(N);return n!==M&&null!==M&&null!==n&&null!==n.callback&&n.startTime<=e&&n.expirationTime<M.expirationTime||a()},t.unstable_wrapCallback=function(e){var t=R;return function(){var n=R;R=t;try{return e.apply(this,arguments)}finally{R=n}}}},function(e,t,n){},function(e,t,n){"use strict";n.r(t);var r=n(0),l=n.n(r),i=n(2),a=n.n(i);function o(e){return(o="function"==typeof Symbol&&"symbol"==typeof Symbol.iterator?function(e){return typeof e}:function(e){return e&&"function"==typeof Symbol&&e.constructor===Symbol&&e!==Symbol.prototype?"symbol":typeof e})(e)}function u(e,t){if(!(e instanceof t))throw new TypeError("Cannot call a class as a function")}function c(e,t){for(var n=0;n<t.length;n++){var r=t[n];r.enumerable=r.enumerable||!1,r.configurable=!0,"value"in r&&(r.writable=!0),Object.defineProperty(e,r.key,r)}}function s(e,t,n){return t&&c(e.prototype,t),n&&c(e,n),e}function f(e,t){if("function"!=typeof t&&null!==t)throw new TypeError("Super expression must either be null or a function");e.prototype=Object.create(t&&t.prototype,{constructor:{value:e,writable:!0,configurable:!0}}),t&&d(e,t)}function d(e,t){return(d=Object.setPrototypeOf||function(e,t){return e.__proto__=t,e})(e,t)}function p(e){var t=function(){if("undefined"==typeof Reflect||!Reflect.construct)return!1;if(Reflect.construct.sham)return!1;if("function"==typeof Proxy)return!0;try{return Date.prototype.toString.call(Reflect.construct(Date,[],(function(){}))),!0}catch(e){return!1}}();return function(){var n,r=h(e);if(t){var l=h(this).constructor;n=Reflect.construct(r,arguments,l)}else n=r.apply(this,arguments);return m(this,n)}}function m(e,t){return!t||"object"!==o(t)&&"function"!=typeof t?function(e){if(void 0===e)throw new ReferenceError("this hasn't been initialised - super() hasn't been called");return e}(e):t}function h(e){return(h=Object.setPrototypeOf?Object.getPrototypeOf:function(e){return e.__proto__||Object.getPrototypeOf(e)})(e)}var v=function(e){f(n,e);var t=p(n);function n(){return u(this,n),t.apply(this,arguments)}return s(n,[{key:"render",value:function(){return l.a.createElement("div",null,l.a.createElement("div",{className:"header"},this.props.title),l.a.createElement(y,null))}}]),n}(l.a.Component),y=function(e){f(n,e);var t=p(n);function n(){var e;return u(this,n),(e=t.call(this)).state={devices:[],samples:{}},e}return s(n,[{key:"componentDidMount",value:function(){var e=this;this.fetchDevices(),this.sampleStream=new EventSource("/api/device/sample/stream"),this.sampleStream.onmessage=function(t){return e.addSamples(JSON.parse(t.data))},this.sampleStream.onerror=function(){e.sampleStream.readyState===EventSource.CLOSED&&(e.samplePolling=setInterval((function(){return e.pollSamples()}),1e3))}}},{key:"componentWillUnmount",value:function(){this.sampleStream.close(),this.sampleStream=null,clearInterval(this.samplePolling)}},{key:"fetchDevices",value:function(){var e=this;fetch("/api/device").then((function(e){return e.json()})).then((function(t){return e.setState({devices:t})}))}},{key:"pollSamples",value:function(){var e=this;fetch("/api/device/sample").then((function(e){return e.json()})).then((function(t){return e.addSamples(t)}))}},{key:"addSamples",value:function(e){var t=this,n=Object.keys(e);n.some((function(e){return!t.state.devices.some((function(t){return String(t.address)===e}))}))&&this.fetchDevices(),this.setState((function(t){var r=Object.assign({},t.samples);return n.filter((function(t){return e[t].samples})).forEach((function(t){return r[t]=e[t].samples})),{samples:r}}))}},{key:"render",value:function(){var e=this;return l.a.createElement("div",null,this.state.devices.map((function(t){return l.a.createElement(g,Object.assign({},t,{samples:e.state.samples[t.address]}))})))}}]),n}(l.a.Component),g=function(e){f(n,e);var t=p(n);function n(){return u(this,n),t.apply(this,arguments)}return s(n,[{key:"render",value:function(){var e=this.props,t=e.samples||[{value:"",symbol:""}];return l.a.createElement("div",null,l.a.createElement("h1",{className:"p-3 mb-2 text-white "+e.device_type.toLowerCase()+"_device"},e.device_type," :",t.map((function(e){return l.a.createElement(b,e)})).reduce((function(e,t){return[e," ",t]}))))}}]),n}(l.a.Component),b=function(e){return e.symbol?l.a.createElement(l.a.Fragment,null,e.value," ",e.symbol):l.a.createElement(l.a.Fragment,null,e.value)},w=v;n(7);a.a.render(l.a.createElement(l.a.StrictMode,null,l.a.createElement(w,null)),document.getElementById("app"))}]);
@@ -3,7 +3,7 @@ from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus, get_datetime_now
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -11,16 +11,16 @@ date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
 class AnyDeviceErrorTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
         
         self.app = create_app(self.i2cbus).test_client()
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_retry_sample_atlas_scientific_ph_device_if_receive_device_not_ready_response(self, datetime_now_mock, patched_time_sleep):
+    def test_should_retry_sample_atlas_scientific_ph_device_if_receive_device_not_ready_response(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -42,7 +42,7 @@ class AnyDeviceErrorTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9),
                 call(0.3) # wait only 0.3 to resample
@@ -60,9 +60,9 @@ class AnyDeviceErrorTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.56", "value_type": "float", "unit_code": "PH"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_return_device_not_ready_error_if_sample_atlas_scientific_ph_device_if_receive_device_not_ready_response_for_more_then_four_tries(self, datetime_now_mock, patched_time_sleep):
+    def test_should_return_device_not_ready_error_if_sample_atlas_scientific_ph_device_if_receive_device_not_ready_response_for_more_then_four_tries(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -86,7 +86,7 @@ class AnyDeviceErrorTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9),
                 call(0.3), # wait only 0.3 to resample
@@ -108,9 +108,9 @@ class AnyDeviceErrorTests(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(b'{"message": "Device did not return the expected response in a timely mannor.", "error_code": "DEVICE_NOT_READY"}\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_return_error_if_sample_atlas_scientific_ph_device_returns_syntax_error(self, datetime_now_mock, patched_time_sleep):
+    def test_should_return_error_if_sample_atlas_scientific_ph_device_returns_syntax_error(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -131,7 +131,7 @@ class AnyDeviceErrorTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9)
             ], 
@@ -147,9 +147,9 @@ class AnyDeviceErrorTests(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(b'{"message": "Device has rejected your request, please confrim the request is supported by the device and the device has the latest firmware.", "error_code": "COMMAND_ERROR"}\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_return_device_not_found_error_if_no_device_exists_at_address(self, datetime_now_mock, patched_time_sleep):
+    def test_should_return_device_not_found_error_if_no_device_exists_at_address(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 110 # nothing at this address
@@ -166,9 +166,9 @@ class AnyDeviceErrorTests(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(b'{"message": "No device is connected to the given address.", "error_code": "DEVICE_NOT_FOUND"}\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_return_device_not_recognized_error_when_device_response_is_novel(self, datetime_now_mock, patched_time_sleep):
+    def test_should_return_device_not_recognized_error_when_device_response_is_novel(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -187,7 +187,7 @@ class AnyDeviceErrorTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
             ], 
             any_order=False)
@@ -201,9 +201,9 @@ class AnyDeviceErrorTests(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(b'{"message": "Detected unsupported atlas scientific device.", "error_code": "UNSUPPORTED_DEVICE"}\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_return_device_not_supported_error_when_response_does_not_match_any_known_device(self, datetime_now_mock, patched_time_sleep):
+    def test_should_return_device_not_supported_error_when_response_does_not_match_any_known_device(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -222,7 +222,7 @@ class AnyDeviceErrorTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
             ], 
             any_order=False)
@@ -0,0 +1,394 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
+from atlas_scientific_web.asgi import create_asgi_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+real_asyncio_sleep = asyncio.sleep
+
+class AsgiTestClient(object):
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, json_body=None):
+        path, _, query_string = path.partition('?')
+        body = json.dumps(json_body).encode('utf-8') if json_body is not None else b''
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query_string.encode('latin-1'),
+            'headers': [],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.app(scope, receive, send))
+        return messages[0]['status'], b''.join(m.get('body', b'') for m in messages[1:])
+
+    def websocket(self, path, requests, frame_count):
+        # sends each request, then disconnects once the expected number of frames are received
+        scope = {'type': 'websocket', 'path': path, 'query_string': b'', 'headers': []}
+        messages = [{'type': 'websocket.connect'}] + [{'type': 'websocket.receive', 'text': r} for r in requests]
+        sent = []
+
+        async def session():
+            received_all = asyncio.Event()
+            if frame_count == 0:
+                received_all.set()
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await received_all.wait()
+                return {'type': 'websocket.disconnect', 'code': 1000}
+
+            async def send(message):
+                sent.append(message)
+                if len([m for m in sent if m['type'] == 'websocket.send']) >= frame_count:
+                    received_all.set()
+
+            await asyncio.wait_for(self.app(scope, receive, send), 5)
+
+        asyncio.run(session())
+        frames = [json.loads(m['text']) for m in sent if m['type'] == 'websocket.send']
+        return sent[0]['type'], frames
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, json_body):
+        return self.request('POST', path, json_body)
+
+class AsgiApiTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+        self.sleeps = []
+        real_asyncio_sleep = asyncio.sleep
+        async def asyncio_sleep(duration):
+            self.sleeps.append(duration)
+            await real_asyncio_sleep(0)
+
+        sleep_patcher = patch('asyncio.sleep', new=asyncio_sleep)
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+        self.app = AsgiTestClient(create_asgi_app(self.i2cbus))
+
+    def given_devices(self, device_responses):
+        def i2cbus_ping(address):
+            return address in device_responses
+
+        def i2cbus_read(address):
+            return device_responses[address].pop(0)
+
+        self.i2cbus.ping.side_effect = i2cbus_ping
+        self.i2cbus.read.side_effect = i2cbus_read
+
+    def test_can_return_list_of_devices(self):
+
+        # Arrange
+        self.given_devices({
+            98: [b'\x01?i,ORP,1.97\00'],
+        })
+
+        # Act
+        status, body = self.app.get('/api/device')
+
+        # Assert
+        self.i2cbus.write.assert_called_once_with(98, b'i\00')
+        self.assertEqual([0.3], self.sleeps)
+
+        self.assertEqual(200, status)
+        self.assertEqual(b'[{"address": 98, "device_type": "ORP", "vendor": "atlas-scientific", "firmware_version": "1.97"}]\n', body)
+
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_device(self, datetime_now_mock):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        })
+
+        # Act
+        status, body = self.app.get('/api/device/99/sample')
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'),
+                call(99, b'r\00'),
+            ],
+            any_order=False)
+        self.assertEqual([0.3, 0.9], self.sleeps)
+
+        self.assertEqual(200, status)
+        self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n', body)
+
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_device_with_temperature_compensation(self, datetime_now_mock):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        })
+
+        request_body = [{
+            'factor': 'temperature',
+            'symbol': '°C',
+            'value': '25.5'
+        }]
+
+        # Act
+        status, body = self.app.post('/api/device/99/sample', request_body)
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'),
+                call(99, b'rt,25.5\00'),
+            ],
+            any_order=False)
+
+        self.assertEqual(200, status)
+        self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n', body)
+
+    def test_sample_within_max_age_should_be_served_from_cache(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        })
+
+        # Act
+        self.app.get('/api/device/99/sample?max_age=60')
+        status, body = self.app.get('/api/device/99/sample?max_age=60')
+
+        # Assert
+        self.assertEqual(2, self.i2cbus.write.call_count)
+        self.assertEqual(200, status)
+        self.assertIn(b'"value": "9.560"', body)
+
+    def test_should_return_device_errors_using_the_same_error_model(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x02\00'],
+        })
+
+        # Act
+        not_found_status, not_found_body = self.app.get('/api/device/110/sample')
+        rejected_status, rejected_body = self.app.get('/api/device/99/sample')
+        invalid_status, invalid_body = self.app.post('/api/device/99/sample', [{'factor': 'temperature'}])
+
+        # Assert
+        self.assertEqual(400, not_found_status)
+        self.assertEqual(b'{"message": "No device is connected to the given address.", "error_code": "DEVICE_NOT_FOUND"}\n', not_found_body)
+
+        self.assertEqual(400, rejected_status)
+        self.assertEqual(b'{"message": "Device has rejected your request, please confrim the request is supported by the device and the device has the latest firmware.", "error_code": "COMMAND_ERROR"}\n', rejected_body)
+
+        self.assertEqual(400, invalid_status)
+        self.assertEqual(b'{"message": "Request contains a missing or incorrectly formatted felid.", "error_code": "INVALID_REQUEST_ERROR"}\n', invalid_body)
+
+    def test_can_configure_device(self):
+
+        # Arrange
+        self.given_devices({
+            100: [b'\x01?i,pH,1.98\00', b'\x01\00'],
+        })
+
+        # Act
+        status, body = self.app.post('/api/device/100/configuration', {'parameter': 'led', 'value': 'true'})
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(100, b'i\00'),
+                call(100, b'l,1\00'),
+            ],
+            any_order=False)
+        self.assertEqual(200, status)
+
+    def test_can_calibrate_device_and_read_next_calibration_points(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x01\00'],
+        })
+
+        # Act
+        status, _ = self.app.request('PUT', '/api/device/99/sample/calibration', {'point': 'mid', 'actual_value': '7.00'})
+        calibration_status, calibration_body = self.app.get('/api/device/99/sample/calibration')
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'),
+                call(99, b'Cal,mid,7.00\00'),
+            ],
+            any_order=False)
+        self.assertEqual(200, status)
+
+        self.assertEqual(200, calibration_status)
+        calibration = json.loads(calibration_body)
+        self.assertEqual('mid', calibration['point'])
+        self.assertEqual(True, calibration['is_complete'])
+        self.assertEqual(['low', 'mid'], [p['id'] for p in calibration['next_points']])
+
+    def test_should_return_not_found_for_unknown_route(self):
+
+        # Act
+        status, body = self.app.get('/api/unknown')
+
+        # Assert
+        self.assertEqual(404, status)
+
+    def test_should_return_method_not_allowed_for_unsupported_method(self):
+
+        # Act
+        status, body = self.app.request('DELETE', '/api/device/99/sample')
+
+        # Assert
+        self.assertEqual(405, status)
+
+    def test_can_receive_samples_of_many_devices_over_one_websocket(self):
+
+        # Arrange
+        self.given_devices({
+            97: [b'\x01?I,DO,1.98\00', b'\x01?O,MG,%\00', b'\x01238.15,419.6\00'],
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        })
+
+        # Act
+        accepted, frames = self.app.websocket('/api/device/telemetry', [
+            '{"action": "subscribe", "address": [97, 99]}'
+        ], 2)
+
+        # Assert
+        self.assertEqual('websocket.accept', accepted)
+        frames.sort(key=lambda f: f['address'])
+        self.assertEqual([97, 99], [f['address'] for f in frames])
+        self.assertEqual([('238.15', 'MG'), ('419.6', '%')], [(s['value'], s['unit_code']) for s in frames[0]['samples']])
+        self.assertEqual([('9.560', 'PH')], [(s['value'], s['unit_code']) for s in frames[1]['samples']])
+        self.assertEqual(['symbol', 'timestamp', 'value', 'value_type', 'unit_code'], list(frames[1]['samples'][0].keys()))
+
+    def test_websocket_should_only_send_subscribed_units(self):
+
+        # Arrange
+        self.given_devices({
+            97: [b'\x01?I,DO,1.98\00', b'\x01?O,MG,%\00', b'\x01238.15,419.6\00'],
+        })
+
+        # Act
+        _, frames = self.app.websocket('/api/device/telemetry', [
+            '{"action": "subscribe", "address": [97], "unit_code": ["mg"]}'
+        ], 1)
+
+        # Assert
+        self.assertEqual([('238.15', 'MG')], [(s['value'], s['unit_code']) for s in frames[0]['samples']])
+
+    def test_websocket_should_report_errors_without_closing(self):
+
+        # Arrange
+        self.given_devices({})
+
+        # Act
+        accepted, frames = self.app.websocket('/api/device/telemetry', [
+            'not json',
+            '{"action": "subscribe", "address": [110]}',
+        ], 2)
+
+        # Assert
+        self.assertEqual('websocket.accept', accepted)
+        self.assertEqual([
+                {'error': {'message': 'Request contains a missing or incorrectly formatted felid.', 'error_code': 'INVALID_REQUEST_ERROR'}},
+                {'error': {'message': 'No device is connected to the given address.', 'error_code': 'DEVICE_NOT_FOUND'}, 'address': 110},
+            ], frames)
+
+    def test_websocket_should_be_rejected_for_unknown_path(self):
+
+        # Act
+        rejected, frames = self.app.websocket('/api/unknown', [], 0)
+
+        # Assert
+        self.assertEqual('websocket.close', rejected)
+
+    def test_can_serve_the_web_app(self):
+
+        # Act
+        status, body = self.app.get('/')
+
+        # Assert
+        self.assertEqual(200, status)
+        self.assertIn(b'<html', body)
+
+    def test_can_return_swagger_of_the_api(self):
+
+        # Act
+        status, body = self.app.get('/swagger.json')
+
+        # Assert
+        self.assertEqual(200, status)
+        self.assertIn('/api/device/{address}/sample', json.loads(body)['paths'])
+
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_should_sample_devices_in_the_background_once_started(self, datetime_now_mock):
+
+        # Arrange
+        self.i2cbus.ping.side_effect = lambda address: address == 99
+        self.i2cbus.read.side_effect = lambda address: b'\x01?i,pH,1.98\00' if self.i2cbus.write.call_args[0][1] == b'i\00' else b'\x019.560\00'
+
+        app = create_asgi_app(self.i2cbus, sample_interval=60)
+        sent = []
+
+        async def serve():
+            lifespan_messages = asyncio.Queue()
+            await lifespan_messages.put({'type': 'lifespan.startup'})
+            async def receive():
+                return await lifespan_messages.get()
+            async def send(message):
+                sent.append(message['type'])
+
+            async def get_recent_samples():
+                response = []
+                async def receive_request():
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                async def send_response(message):
+                    response.append(message)
+                await app({'type': 'http', 'method': 'GET', 'path': '/api/device/99/sample/recent', 'query_string': b'', 'headers': []}, receive_request, send_response)
+                return json.loads(response[1]['body'])
+
+            lifespan = asyncio.ensure_future(app({'type': 'lifespan'}, receive, send))
+            # nothing requests a sample, so expect the background sampler to fill the recent samples
+            recent = await get_recent_samples()
+            waited_until = time.monotonic() + 5
+            while not recent and time.monotonic() < waited_until:
+                # the bus is queried from another thread, so give it time to respond
+                await real_asyncio_sleep(0.01)
+                recent = await get_recent_samples()
+
+            await lifespan_messages.put({'type': 'lifespan.shutdown'})
+            await lifespan
+            return recent
+
+        # Act
+        recent = asyncio.run(serve())
+
+        # Assert
+        self.assertEqual(['lifespan.startup.complete', 'lifespan.shutdown.complete'], sent)
+        self.assertEqual([('PH', 9.56)], [(r['unit_code'], r['value'][0]) for r in recent])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.async_device import AsyncAtlasScientificDeviceBus
+from atlas_scientific_web.hardware.async_sampler import AsyncAtlasScientificDeviceSampler
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.models import AtlasScientificDeviceNotReadyError, AtlasScientificNoDeviceAtAddress
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+class AsyncDeviceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.bus_calls = []
+        self.sleeps = []
+
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+        self.i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.device_bus = AsyncAtlasScientificDeviceBus(self.i2c_session_provider)
+
+        real_asyncio_sleep = asyncio.sleep
+        async def asyncio_sleep(duration):
+            self.sleeps.append(duration)
+            # still yield to other tasks, as a real sleep would
+            await real_asyncio_sleep(0)
+
+        sleep_patcher = patch('asyncio.sleep', new=asyncio_sleep)
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def tearDown(self):
+        self.i2c_session_provider.close()
+
+    def given_devices(self, device_responses):
+        def i2cbus_ping(address):
+            return address in device_responses
+
+        def i2cbus_write(address, value):
+            self.bus_calls.append(('write', address, value))
+
+        def i2cbus_read(address):
+            self.bus_calls.append(('read', address))
+            return device_responses[address].pop(0)
+
+        self.i2cbus.ping.side_effect = i2cbus_ping
+        self.i2cbus.write.side_effect = i2cbus_write
+        self.i2cbus.read.side_effect = i2cbus_read
+
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_atlas_scientific_ph_device(self, datetime_now_mock):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        })
+
+        async def sample():
+            device = await self.device_bus.get_device_by_address(99)
+            return await device.read_sample([])
+
+        # Act
+        samples = asyncio.run(sample())
+
+        # Assert
+        self.assertEqual([
+                ('write', 99, b'i\00'),
+                ('read', 99),
+                ('write', 99, b'r\00'),
+                ('read', 99),
+            ], self.bus_calls)
+        self.assertEqual([0.3, 0.9], self.sleeps)
+
+        self.assertEqual(1, len(samples))
+        self.assertEqual('9.560', samples[0].value)
+        self.assertEqual('PH', samples[0].unit_code)
+        self.assertEqual(datetime.fromtimestamp(1582672093, timezone.utc), samples[0].timestamp)
+
+    def test_should_retry_sample_if_device_is_not_ready(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\xfe\00', b'\x019.560\00'],
+        })
+
+        async def sample():
+            device = await self.device_bus.get_device_by_address(99)
+            return await device.read_sample([])
+
+        # Act
+        samples = asyncio.run(sample())
+
+        # Assert
+        self.assertEqual([0.3, 0.9, 0.3], self.sleeps)
+        self.assertEqual('9.560', samples[0].value)
+
+    def test_should_learn_the_time_taken_for_the_device_to_be_ready(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\xfe\00', b'\x019.560\00'],
+        })
+
+        async def sample():
+            device = await self.device_bus.get_device_by_address(99)
+            await device.read_sample([])
+            return device
+
+        # Act
+        device = asyncio.run(sample())
+
+        # Assert
+        # the sleeps return at once, so expect far less than the 1.2 seconds planned to be waited
+        ready_after, = device.response_latencies.observations['r']
+        self.assertLess(ready_after, 0.5)
+
+    def test_should_raise_not_ready_error_when_device_never_becomes_ready(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\xfe\00', b'\xfe\00', b'\xfe\00', b'\xfe\00'],
+        })
+
+        async def sample():
+            device = await self.device_bus.get_device_by_address(99)
+            return await device.read_sample([])
+
+        # Act / Assert
+        with self.assertRaises(AtlasScientificDeviceNotReadyError):
+            asyncio.run(sample())
+
+    def test_should_raise_no_device_error_when_nothing_is_at_address(self):
+
+        # Arrange
+        self.given_devices({})
+
+        # Act / Assert
+        with self.assertRaises(AtlasScientificNoDeviceAtAddress):
+            asyncio.run(self.device_bus.get_device_by_address(110))
+
+    def test_concurrent_requests_for_a_new_device_should_share_one_connection(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00'],
+        })
+
+        async def connect_twice():
+            return await asyncio.gather(self.device_bus.get_device_by_address(99), self.device_bus.get_device_by_address(99))
+
+        # Act
+        first_device, second_device = asyncio.run(connect_twice())
+
+        # Assert
+        self.assertIs(first_device, second_device)
+        self.assertEqual([('write', 99, b'i\00'), ('read', 99)], self.bus_calls)
+
+    def test_scan_should_wait_for_a_query_of_the_same_device(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00', b'\x01?i,pH,1.98\00'],
+        })
+
+        async def sample_while_scanning():
+            device = await self.device_bus.get_device_by_address(99)
+            await asyncio.gather(device.read_sample([]), self.device_bus.scan_for_devices())
+            return device
+
+        # Act
+        device = asyncio.run(sample_while_scanning())
+
+        # Assert
+        # expect the device to respond to the read before it's identified again
+        self.assertEqual([
+                ('write', 99, b'i\00'), ('read', 99),
+                ('write', 99, b'r\00'), ('read', 99),
+                ('write', 99, b'i\00'), ('read', 99),
+            ], self.bus_calls)
+        self.assertIs(device, self.device_bus.known_devices[99])
+
+    def test_should_identify_all_devices_before_reading_responses_when_scanning(self):
+
+        # Arrange
+        self.given_devices({
+            97: [b'\x01?i,DO,1.98\00'],
+            105: [b'\x01?i,CO2,1.00\00'],
+            110: [b'Novel response\00'],
+        })
+
+        async def scan():
+            return list(await self.device_bus.get_known_devices())
+
+        # Act
+        devices = asyncio.run(scan())
+
+        # Assert
+        self.assertEqual([
+                ('write', 97, b'i\00'), ('write', 105, b'i\00'), ('write', 110, b'i\00'),
+                ('read', 97), ('read', 105), ('read', 110),
+            ], self.bus_calls)
+
+        self.assertEqual([97, 105], [d.address for d in devices])
+        self.assertEqual(['DO', 'CO2'], [d.get_device_info().device_type for d in devices])
+
+    def test_can_sample_many_devices_at_once(self):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+            100: [b'\x01?i,pH,1.98\00', b'\x02\00'],
+        })
+
+        # Act
+        results = asyncio.run(self.device_bus.read_samples([99, 100, 110]))
+
+        # Assert
+        self.assertEqual('9.560', results[99][0].value)
+        self.assertIsInstance(results[100], Exception)
+        self.assertIsInstance(results[110], AtlasScientificNoDeviceAtAddress)
+
+    def test_sampler_should_store_samples_off_the_event_loop(self):
+
+        # Arrange
+        self.given_devices({99: [b'\x01?i,pH,1.98\00', b'\x019.560\00']})
+
+        store_threads = []
+        sample_store = Mock()
+        sample_store.append.side_effect = lambda address, samples: store_threads.append(threading.get_ident())
+        device_sampler = AsyncAtlasScientificDeviceSampler(self.device_bus, sample_store=sample_store)
+
+        async def read_sample():
+            samples = await device_sampler.read_sample(99)
+            return samples, threading.get_ident()
+
+        # Act
+        samples, event_loop_thread = asyncio.run(read_sample())
+
+        # Assert
+        sample_store.append.assert_called_once_with(99, samples)
+        self.assertNotEqual(event_loop_thread, store_threads[0])
+
+if __name__ == '__main__':
+    unittest.main()
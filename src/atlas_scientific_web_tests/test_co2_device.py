@@ -3,7 +3,7 @@ from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -12,7 +12,7 @@ class Co2DeviceTests(unittest.TestCase):
  
     def setUp(self):
         self.device_address = 105
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -22,9 +22,9 @@ class Co2DeviceTests(unittest.TestCase):
 
     # Sample tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_co2_device_with_ppm_output_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_co2_device_with_ppm_output_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [ 
@@ -45,7 +45,7 @@ class Co2DeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.3), 
                 call(0.9)  
@@ -63,9 +63,9 @@ class Co2DeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "ppm", "timestamp": "2020-02-25 23:08:13+00:00", "value": "800", "value_type": "int", "unit_code": "PPM"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_co2_device_with_device_temperature_output_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_co2_device_with_device_temperature_output_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [ 
@@ -86,7 +86,7 @@ class Co2DeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.3), 
                 call(0.9)  
@@ -107,8 +107,8 @@ class Co2DeviceTests(unittest.TestCase):
 
     # Sample output tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_resolve_supported_outputs_atlas_scientific_co2_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_resolve_supported_outputs_atlas_scientific_co2_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -127,7 +127,7 @@ class Co2DeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3),
                 call(0.3)
             ], 
@@ -149,8 +149,8 @@ class Co2DeviceTests(unittest.TestCase):
         self.assertEqual(expected_response.encode('utf8'), response.data)
 
 
-    @patch('time.sleep', return_value=None)
-    def test_can_enable_internal_temperature_output_on_atlas_scientific_co2_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_enable_internal_temperature_output_on_atlas_scientific_co2_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -178,7 +178,7 @@ class Co2DeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.3), # "o,t,1"
@@ -200,8 +200,8 @@ class Co2DeviceTests(unittest.TestCase):
 
     # configuration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_co2_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_co2_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -225,7 +225,7 @@ class Co2DeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,co2_device"
             ], 
@@ -241,8 +241,8 @@ class Co2DeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_leds_in_atlas_scientific_co2_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_leds_in_atlas_scientific_co2_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -266,7 +266,7 @@ class Co2DeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "l,1"
             ], 
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock, call, patch
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
+from atlas_scientific_web.hardware.async_device import AsyncAtlasScientificDeviceBus
+from atlas_scientific_web.hardware.models import AtlasScientificDeviceCompensationFactor, AtlasScientificDeviceNotReadyError
+
+class ConcurrentDeviceReadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+        self.i2cbus.ping.return_value = True
+
+        self.i2c_session_provider = I2CSessionProvider(self.i2cbus)
+
+    def tearDown(self):
+        self.i2c_session_provider.close()
+
+    def given_second_read_starts_during_first(self, device, compensation_factors):
+        # starts a second read while the device is processing the first
+        results = {}
+
+        def second_read():
+            results['second'] = device.read_sample(compensation_factors)
+
+        second_thread = threading.Thread(target=second_read)
+        def i2cbus_write(address, value):
+            if value.startswith(b'r') and not second_thread.is_alive() and 'second' not in results:
+                second_thread.start()
+                # give the second read time to join the first
+                threading.Event().wait(0.2)
+
+        self.i2cbus.write.side_effect = i2cbus_write
+        return second_thread, results
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_concurrent_reads_of_the_same_device_should_share_one_query(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample
+            ]
+
+        device = AtlasScientificDeviceBus(self.i2c_session_provider).get_device_by_address(99)
+        second_thread, results = self.given_second_read_starts_during_first(device, [])
+
+        # Act
+        first_samples = device.read_sample([])
+        second_thread.join(5)
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'), # expect 'i' for read info
+                call(99, b'r\00')  # expect 'r' for read device sample, only once
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+
+        self.assertEqual('9.560', first_samples[0].value)
+        self.assertIs(first_samples, results['second'])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_concurrent_reads_with_different_compensation_should_not_be_shared(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00',  # second call should be for reading the device sample
+                b'\x019.570\00'  # third call should be for reading the compensated device sample
+            ]
+
+        device = AtlasScientificDeviceBus(self.i2c_session_provider).get_device_by_address(99)
+        compensation_factors = [AtlasScientificDeviceCompensationFactor('temperature', '°C', '25.5')]
+        second_thread, results = self.given_second_read_starts_during_first(device, compensation_factors)
+
+        # Act
+        first_samples = device.read_sample([])
+        second_thread.join(5)
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'),
+                call(99, b'r\00'),
+                call(99, b'rt,25.5\00')
+            ],
+            any_order=False)
+
+        self.assertEqual('9.560', first_samples[0].value)
+        self.assertEqual('9.570', results['second'][0].value)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_reads_after_a_shared_read_has_finished_should_query_the_device_again(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00',  # second call should be for reading the device sample
+                b'\x019.570\00'  # third call should be for reading the device sample again
+            ]
+
+        device = AtlasScientificDeviceBus(self.i2c_session_provider).get_device_by_address(99)
+
+        # Act
+        first_samples = device.read_sample([])
+        second_samples = device.read_sample([])
+
+        # Assert
+        self.assertEqual(self.i2cbus.write.call_count, 3)
+        self.assertEqual('9.560', first_samples[0].value)
+        self.assertEqual('9.570', second_samples[0].value)
+
+    def test_concurrent_async_reads_of_the_same_device_should_share_one_query(self):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample
+            ]
+
+        device_bus = AsyncAtlasScientificDeviceBus(self.i2c_session_provider)
+
+        real_asyncio_sleep = asyncio.sleep
+        async def asyncio_sleep(duration):
+            await real_asyncio_sleep(0)
+
+        async def read_concurrently():
+            device = await device_bus.get_device_by_address(99)
+            return await asyncio.gather(device.read_sample([]), device.read_sample([]))
+
+        # Act
+        with patch('asyncio.sleep', new=asyncio_sleep):
+            first_samples, second_samples = asyncio.run(read_concurrently())
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'),
+                call(99, b'r\00')
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+        self.assertIs(first_samples, second_samples)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_errors_of_a_shared_read_should_be_raised_to_every_caller(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00'] + [b'\xfe\00'] * 4
+
+        device = AtlasScientificDeviceBus(self.i2c_session_provider).get_device_by_address(99)
+        errors = []
+
+        def second_read():
+            try:
+                device.read_sample([])
+            except Exception as err:
+                errors.append(err)
+
+        second_thread = threading.Thread(target=second_read)
+        def i2cbus_write(address, value):
+            if value.startswith(b'r'):
+                second_thread.start()
+                threading.Event().wait(0.2)
+        self.i2cbus.write.side_effect = i2cbus_write
+
+        # Act
+        with self.assertRaises(AtlasScientificDeviceNotReadyError):
+            device.read_sample([])
+        second_thread.join(5)
+
+        # Assert
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+        self.assertIsInstance(errors[0], AtlasScientificDeviceNotReadyError)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,9 @@ import unittest
 from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
-from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus, AtlasScientificMissingDevices
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider, scan_addresses
+from atlas_scientific_web.hardware.models import AtlasScientificNoDeviceAtAddress
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -11,7 +12,7 @@ date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
 class DevicesTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock()
@@ -29,16 +30,18 @@ class DevicesTests(unittest.TestCase):
         response = self.app.get('/api/device', follow_redirects=True)
 
         # Assert
-        # expect a scan from address 0 to 128
-        expected_calls = (call(addr) for addr in range(0, 128))
+        # expect a scan of every address not reserved by the I2C specification
+        expected_calls = (call(addr) for addr in scan_addresses)
         self.i2cbus.ping.assert_has_calls(expected_calls, any_order=True)
+        self.assertNotIn(call(0x00), self.i2cbus.ping.call_args_list)
+        self.assertNotIn(call(0x7f), self.i2cbus.ping.call_args_list)
 
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_return_a_connected_atlas_scientific_orp_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_return_a_connected_atlas_scientific_orp_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 98
@@ -64,15 +67,15 @@ class DevicesTests(unittest.TestCase):
         response = self.app.get('/api/device', follow_redirects=True)
 
         # Assert
-        # expect a scan from address 0 to 128
-        expected_calls = (call(addr) for addr in range (0,128))
+        # expect a scan of every address not reserved by the I2C specification
+        expected_calls = (call(addr) for addr in scan_addresses)
         self.i2cbus.ping.assert_has_calls(expected_calls, any_order=True)
 
         # expect 'i' to be written
         self.i2cbus.write.assert_called_once_with(device_address, b'i\00')
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_called_once_with(0.3)
+        patched_bus_wait.assert_called_once_with(0.3)
 
         # expect device info to be read from bus
         self.i2cbus.read.assert_called_once_with(device_address)
@@ -81,8 +84,8 @@ class DevicesTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"address": 98, "device_type": "ORP", "vendor": "atlas-scientific", "firmware_version": "1.97"}]\n', response.data)
  
-    @patch('time.sleep', return_value=None)
-    def test_can_return_a_connected_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_return_a_connected_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -108,15 +111,15 @@ class DevicesTests(unittest.TestCase):
         response = self.app.get('/api/device', follow_redirects=True)
 
         # Assert
-        # expect a scan from address 0 to 128
-        expected_calls = (call(addr) for addr in range (0,128))
+        # expect a scan of every address not reserved by the I2C specification
+        expected_calls = (call(addr) for addr in scan_addresses)
         self.i2cbus.ping.assert_has_calls(expected_calls, any_order=True)
 
         # expect 'i' to be written
         self.i2cbus.write.assert_called_once_with(device_address, b'i\00')
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_called_once_with(0.3)
+        patched_bus_wait.assert_called_once_with(0.3)
 
         # expect device info to be read from bus
         self.i2cbus.read.assert_called_once_with(device_address)
@@ -126,8 +129,8 @@ class DevicesTests(unittest.TestCase):
         self.assertEqual(b'[{"address": 99, "device_type": "pH", "vendor": "atlas-scientific", "firmware_version": "1.98"}]\n', response.data)
  
 
-    @patch('time.sleep', return_value=None)
-    def test_can_return_multiple_atlas_scientific_devices(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_return_multiple_atlas_scientific_devices(self, patched_bus_wait):
 
         # Arrange
         device1_address = 97
@@ -157,17 +160,16 @@ class DevicesTests(unittest.TestCase):
         response = self.app.get('/api/device', follow_redirects=True)
 
         # Assert
-        # expect a scan from address 0 to 128
-        expected_ping_calls = (call(addr) for addr in range (0,128))
+        # expect a scan of every address not reserved by the I2C specification
+        expected_ping_calls = (call(addr) for addr in scan_addresses)
         self.i2cbus.ping.assert_has_calls(expected_ping_calls, any_order=True)
 
         # expect 'i' to be written to both devices
         expected_write_calls = [call(device1_address, b'i\00'), call(device2_address, b'i\00')]
         self.i2cbus.write.assert_has_calls(expected_write_calls, any_order=True)
 
-        # expect to wait for result to be ready
-        expected_sleep_calls = [call(0.3), call(0.3)]
-        patched_time_sleep.assert_has_calls(expected_sleep_calls, any_order=True)
+        # expect to wait once for both results to be ready
+        patched_bus_wait.assert_called_once_with(0.3)
 
         # expect device info to be read from bus
         expected_read_calls = [call(device1_address), call(device2_address)]
@@ -177,5 +179,206 @@ class DevicesTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"address": 97, "device_type": "DO", "vendor": "atlas-scientific", "firmware_version": "1.98"}, {"address": 105, "device_type": "CO2", "vendor": "atlas-scientific", "firmware_version": "1.00"}]\n', response.data)
  
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_identify_all_responding_devices_before_reading_responses(self, patched_bus_wait):
+
+        # Arrange
+        device_addresses = [97, 99, 105]
+        bus_calls = []
+
+        def i2cbus_ping(address):
+            return address in device_addresses
+
+        self.i2cbus.ping.side_effect = i2cbus_ping
+
+        def i2cbus_write(address, value):
+            bus_calls.append(('write', address))
+
+        self.i2cbus.write.side_effect = i2cbus_write
+
+        def i2cbus_read(address):
+            bus_calls.append(('read', address))
+            return b'\x01?i,pH,1.98\00'
+
+        self.i2cbus.read.side_effect = i2cbus_read
+        patched_bus_wait.side_effect = lambda duration: bus_calls.append(('sleep', duration))
+
+        # Act
+        response = self.app.get('/api/device', follow_redirects=True)
+
+        # Assert
+        # expect every 'i' query to be written, then a single wait, then every response read
+        self.assertEqual([
+                ('write', 97), ('write', 99), ('write', 105),
+                ('sleep', 0.3),
+                ('read', 97), ('read', 99), ('read', 105),
+            ], bus_calls)
+
+        self.assertEqual(response.status_code, 200)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_retry_only_devices_which_are_not_ready_when_scanning(self, patched_bus_wait):
+
+        # Arrange
+        device1_address = 97
+        device2_address = 105
+
+        def i2cbus_ping(address):
+            return address == device1_address or address == device2_address
+
+        self.i2cbus.ping.side_effect = i2cbus_ping
+
+        device2_responses = [b'\xfe\00', b'\x01?i,CO2,1.00\00']
+        def i2cbus_read(address):
+            if address == device1_address:
+                return b'\x01?i,DO,1.98\00'
+            return device2_responses.pop(0)
+
+        self.i2cbus.read.side_effect = i2cbus_read
+
+        # Act
+        response = self.app.get('/api/device', follow_redirects=True)
+
+        # Assert
+        patched_bus_wait.assert_has_calls([call(0.3), call(0.3 / 3)], any_order=False)
+        self.i2cbus.read.assert_has_calls([
+                call(device1_address),
+                call(device2_address),
+                call(device2_address), # only the device which wasn't ready is read again
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.read.call_count, 3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b'[{"address": 97, "device_type": "DO", "vendor": "atlas-scientific", "firmware_version": "1.98"}, {"address": 105, "device_type": "CO2", "vendor": "atlas-scientific", "firmware_version": "1.00"}]\n', response.data)
+
+    def test_should_not_use_the_bus_for_an_address_which_recently_had_no_device(self):
+
+        # Arrange
+        self.i2cbus.ping.return_value = False
+
+        # Act
+        responses = [self.app.get('/api/device/42/sample') for _ in range(3)]
+
+        # Assert
+        self.assertEqual([400, 400, 400], [r.status_code for r in responses])
+        self.assertIn(b'DEVICE_NOT_FOUND', responses[2].data)
+        self.i2cbus.ping.assert_called_once_with(42)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_try_a_device_again_when_it_could_not_be_read(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.ping.return_value = True
+        self.i2cbus.read.side_effect = [
+                IOError('Remote I/O error'), # the device is briefly busy
+                b'\x01?i,pH,1.98\00',
+                b'\x019.560\00'
+            ]
+
+        # Act
+        failed_response = self.app.get('/api/device/99/sample')
+        response = self.app.get('/api/device/99/sample')
+
+        # Assert
+        self.assertNotEqual(200, failed_response.status_code)
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b'"value": "9.560"', response.data)
+
+    @patch('time.monotonic')
+    def test_missing_device_should_be_forgotten_once_expired(self, patched_monotonic):
+
+        # Arrange
+        missing_devices = AtlasScientificMissingDevices(ttl=60)
+        patched_monotonic.return_value = 1000
+        missing_devices.add(42, AtlasScientificNoDeviceAtAddress())
+
+        # Act
+        patched_monotonic.return_value = 1059
+        before_expiry = missing_devices.get(42)
+        patched_monotonic.return_value = 1060
+        after_expiry = missing_devices.get(42)
+
+        # Assert
+        self.assertIsInstance(before_expiry, AtlasScientificNoDeviceAtAddress)
+        self.assertIsNone(after_expiry)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_rescan_in_the_background_for_plugged_in_devices(self, patched_bus_wait):
+
+        # Arrange
+        device_addresses = [99]
+        self.i2cbus.ping.side_effect = lambda address: address in device_addresses
+        self.i2cbus.read.side_effect = lambda address: b'\x01?i,pH,1.98\00'
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+        device_bus = AtlasScientificDeviceBus(i2c_session_provider, rescan_interval=0)
+        device_bus.get_known_devices()
+
+        # Act
+        device_addresses.append(105)
+        listed_during_rescan = [d.address for d in device_bus.get_known_devices()]
+        device_bus.revalidation.join()
+
+        # Assert
+        # expect the known devices to be listed while the bus is rescanned
+        self.assertEqual([99], listed_during_rescan)
+        self.assertEqual([99, 105], sorted(device_bus.known_devices))
+        # expect the plugged in device to no longer be missing
+        self.assertIsNotNone(device_bus.get_device_by_address(105))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_rescan_should_only_identify_devices_at_addresses_which_changed(self, patched_bus_wait):
+
+        # Arrange
+        device_addresses = [97, 99]
+        self.i2cbus.ping.side_effect = lambda address: address in device_addresses
+        self.i2cbus.read.side_effect = lambda address: b'\x01?i,pH,1.98\00'
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+        device_bus = AtlasScientificDeviceBus(i2c_session_provider)
+        device_bus.scan_for_devices()
+        known_device = device_bus.known_devices[97]
+
+        device_events = []
+        device_bus.add_device_listener(lambda event, device: device_events.append((event, device.address)))
+
+        # Act
+        device_addresses[:] = [97, 105]
+        self.i2cbus.write.reset_mock()
+        device_bus.scan_for_devices()
+
+        # Assert
+        # expect only the newly responding address to be identified
+        self.i2cbus.write.assert_called_once_with(105, b'i\00')
+        self.assertIs(known_device, device_bus.known_devices[97])
+        self.assertEqual([97, 105], sorted(device_bus.known_devices))
+        self.assertEqual([('removed', 99), ('added', 105)], device_events)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_scan_should_identify_a_device_again_when_it_could_not_be_read(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.ping.side_effect = lambda address: address == 99
+        self.i2cbus.read.side_effect = [
+                IOError('Remote I/O error'), # the device is briefly busy
+                b'\x01?i,pH,1.98\00'
+            ]
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+        device_bus = AtlasScientificDeviceBus(i2c_session_provider)
+
+        # Act
+        first_scan = [d.address for d in device_bus.get_known_devices()]
+        second_scan = [d.address for d in device_bus.get_known_devices()]
+
+        # Assert
+        self.assertEqual([], first_scan)
+        self.assertEqual([99], second_scan)
+        self.assertIs(device_bus.known_devices[99], device_bus.get_device_by_address(99))
+
 if __name__ == '__main__':
     unittest.main()
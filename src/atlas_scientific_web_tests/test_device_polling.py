@@ -0,0 +1,191 @@
+import asyncio
+import unittest
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.async_device import AsyncAtlasScientificDeviceBus
+from atlas_scientific_web.hardware.polling import AtlasScientificStatusPolling, get_polling_strategy
+from atlas_scientific_web.api import create_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+class DevicePollingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.read_status = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+        self.i2cbus.ping.return_value = True
+
+    def sleep_durations(self, patched_bus_wait):
+        return [round(c[0][0], 6) for c in patched_bus_wait.call_args_list]
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_status_polling_should_read_response_as_soon_as_device_is_ready(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample, once ready
+            ]
+        self.i2cbus.read_status.side_effect = [b'\xfe', b'\xfe', b'\x01']
+
+        app = create_app(self.i2cbus, device_polling={'pH': 'status'}).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample')
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'), # expect 'i' for read info
+                call(99, b'r\00')  # expect 'r' for read device sample, only once
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+
+        # expect the status to be polled from half the documented latency, rather than waiting all of it
+        self.assertEqual(3, self.i2cbus.read_status.call_count)
+        self.assertEqual([0.3, 0.45, 0.02, 0.02], self.sleep_durations(patched_bus_wait))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n', response.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_status_polling_should_only_apply_to_selected_device_types(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,ORP,1.98\00', # first call should be for the device info
+                b'\x01209.6\00'  # second call should be for reading the device sample
+            ]
+
+        app = create_app(self.i2cbus, device_polling={'pH': 'status'}).test_client()
+
+        # Act
+        response = app.get('/api/device/98/sample')
+
+        # Assert
+        self.i2cbus.read_status.assert_not_called()
+        self.assertEqual([0.3, 0.9], self.sleep_durations(patched_bus_wait))
+        self.assertEqual(response.status_code, 200)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_status_polling_should_raise_not_ready_error_when_device_never_becomes_ready(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00']
+        self.i2cbus.read_status.return_value = b'\xfe'
+
+        app = create_app(self.i2cbus, device_polling={'pH': AtlasScientificStatusPolling(poll_interval=0.1)}).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample')
+
+        # Assert
+        # expect polling to continue for twice the documented latency, the same as the fixed back off
+        polled_for = sum(self.sleep_durations(patched_bus_wait)[1:])
+        self.assertGreaterEqual(polled_for, 1.8)
+        self.assertLess(polled_for, 1.9)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'DEVICE_NOT_READY', response.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_fixed_polling_should_not_learn_from_device_latency(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00'] + [b'\x019.560\00'] * 11
+
+        app = create_app(self.i2cbus, device_polling={'pH': 'fixed'}).test_client()
+
+        # Act
+        for _ in range(10):
+            app.get('/api/device/99/sample')
+        patched_bus_wait.reset_mock()
+        app.get('/api/device/99/sample')
+
+        # Assert
+        self.assertEqual([0.9], self.sleep_durations(patched_bus_wait))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_status_polling_can_sample_many_devices_at_once(self, patched_bus_wait):
+
+        # Arrange
+        device_responses = {
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+            100: [b'\x01?i,pH,1.98\00', b'\x017.120\00'],
+        }
+        status_responses = {
+            99: [b'\x01'],
+            100: [b'\xfe', b'\x01'],
+        }
+        self.i2cbus.ping.side_effect = lambda address: address in device_responses
+        self.i2cbus.read.side_effect = lambda address: device_responses[address].pop(0)
+        self.i2cbus.read_status.side_effect = lambda address: status_responses[address].pop(0)
+
+        app = create_app(self.i2cbus, device_polling={'pH': 'status'}).test_client()
+
+        # Act
+        response = app.get('/api/device/sample')
+
+        # Assert
+        self.assertEqual([0.3, 0.45, 0.02], self.sleep_durations(patched_bus_wait))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"value": "9.560"', response.data)
+        self.assertIn(b'"value": "7.120"', response.data)
+
+    def test_async_status_polling_should_read_response_as_soon_as_device_is_ready(self):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00', b'\x019.560\00']
+        self.i2cbus.read_status.side_effect = [b'\xfe', b'\x01']
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+        device_bus = AsyncAtlasScientificDeviceBus(i2c_session_provider, {'ph': 'status'})
+
+        sleeps = []
+        real_asyncio_sleep = asyncio.sleep
+        async def asyncio_sleep(duration):
+            sleeps.append(round(duration, 6))
+            await real_asyncio_sleep(0)
+
+        async def sample():
+            device = await device_bus.get_device_by_address(99)
+            return await device.read_sample([])
+
+        # Act
+        with patch('asyncio.sleep', new=asyncio_sleep):
+            samples = asyncio.run(sample())
+
+        # Assert
+        self.assertEqual([0.3, 0.45, 0.02], sleeps)
+        self.assertEqual('9.560', samples[0].value)
+
+    def test_status_only_query_should_only_read_the_bus_status(self):
+
+        # Arrange
+        self.i2cbus.read_status.return_value = b'\x01'
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+
+        # Act
+        with i2c_session_provider.acquire_access(99) as i2c_session:
+            status = i2c_session.query(b'r\00', 0, status_only=True)
+
+        # Assert
+        self.i2cbus.read_status.assert_called_once_with(99)
+        self.i2cbus.read.assert_not_called()
+        self.assertEqual(b'\x01', status)
+
+    def test_unknown_polling_strategy_should_raise_error(self):
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            get_polling_strategy('eager')
+
+if __name__ == '__main__':
+    unittest.main()
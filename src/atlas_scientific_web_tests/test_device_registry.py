@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
+from atlas_scientific_web.hardware.registry import AtlasScientificDeviceRegistry
+from atlas_scientific_web.api import create_app
+
+class DeviceRegistryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.registry_path = os.path.join(self.path, 'devices.json')
+
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+    def given_saved_devices(self, entries):
+        with open(self.registry_path, 'w') as registry_file:
+            json.dump(entries, registry_file)
+
+    def given_device_bus(self):
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+        return AtlasScientificDeviceBus(i2c_session_provider, device_registry=AtlasScientificDeviceRegistry(self.registry_path))
+
+    def test_registry_should_keep_the_devices_of_each_bus(self):
+
+        # Arrange
+        registry = AtlasScientificDeviceRegistry(self.registry_path)
+        registry.save(1, [{'bus': 1, 'address': 99, 'device_type': 'pH', 'version': '1.98', 'output_units': ['PH']}])
+        registry.save(3, [{'bus': 3, 'address': 97, 'device_type': 'DO', 'version': '1.98', 'output_units': ['MG']}])
+
+        # Act
+        registry.save(1, [])
+        reloaded = AtlasScientificDeviceRegistry(self.registry_path)
+
+        # Assert
+        self.assertEqual([], reloaded.load(1))
+        self.assertEqual([97], [entry['address'] for entry in reloaded.load(3)])
+
+    def test_registry_should_be_empty_when_its_file_is_unreadable(self):
+
+        # Arrange
+        with open(self.registry_path, 'w') as registry_file:
+            registry_file.write('{not json')
+
+        # Act
+        entries = AtlasScientificDeviceRegistry(self.registry_path).load()
+
+        # Assert
+        self.assertEqual([], entries)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_save_devices_found_by_scan(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.ping.side_effect = lambda address: address == 97
+        self.i2cbus.read.side_effect = [b'\x01?i,DO,1.98\00']
+
+        app = create_app(self.i2cbus, device_registry_path=self.registry_path).test_client()
+
+        # Act
+        app.get('/api/device', follow_redirects=True)
+
+        # Assert
+        device_bus = self.given_device_bus()
+        self.assertEqual(
+            [{'bus': None, 'address': 97, 'device_type': 'DO', 'version': '1.98', 'output_units': None}],
+            device_bus.device_registry.load())
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_list_saved_devices_before_revalidating_them(self, patched_bus_wait):
+
+        # Arrange
+        self.given_saved_devices([
+            {'bus': None, 'address': 97, 'device_type': 'DO', 'version': '1.98', 'output_units': ['MG']},
+            {'bus': None, 'address': 98, 'device_type': 'Unknown', 'version': '1.00', 'output_units': None},
+            {'bus': None, 'address': 99, 'device_type': 'pH', 'version': '1.98', 'output_units': ['PH']},
+        ])
+
+        # hold the bus until the restored devices have been listed
+        bus_released = threading.Event()
+        self.i2cbus.ping.side_effect = lambda address: bus_released.wait() and address == 97
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,DO,1.98\00', # first call should be for the device info
+                b'\x01?O,MG,%\00'     # second call should be for the enabled outputs
+            ]
+
+        device_bus = self.given_device_bus()
+
+        # Act
+        restored = [(d.address, d.get_device_info().device_type) for d in device_bus.get_known_devices()]
+        bus_released.set()
+        device_bus.revalidation.join()
+
+        # Assert
+        # expect unsupported device types to be ignored
+        self.assertEqual([(97, 'DO'), (99, 'pH')], restored)
+        self.assertEqual(
+            [{'bus': None, 'address': 97, 'device_type': 'DO', 'version': '1.98', 'output_units': ['MG', '%']}],
+            AtlasScientificDeviceRegistry(self.registry_path).load())
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_read_restored_device_with_its_saved_outputs(self, patched_bus_wait):
+
+        # Arrange
+        self.given_saved_devices([
+            {'bus': None, 'address': 97, 'device_type': 'DO', 'version': '1.98', 'output_units': ['MG', '%']},
+        ])
+        self.i2cbus.read.side_effect = [b'\x01238.1,91.2\00']
+
+        device_bus = self.given_device_bus()
+
+        # Act
+        samples = device_bus.read_samples([97])[97]
+
+        # Assert
+        # expect the device to only be asked for a sample
+        self.i2cbus.write.assert_called_once_with(97, b'r\00')
+        self.assertEqual([('MG', '238.1'), ('%', '91.2')], [(s.unit_code, s.value) for s in samples])
+
+if __name__ == '__main__':
+    unittest.main()
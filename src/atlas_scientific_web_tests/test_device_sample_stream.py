@@ -0,0 +1,288 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
+from atlas_scientific_web.hardware.sampler import AtlasScientificDeviceSampler, AtlasScientificDeviceSampleFeed
+from atlas_scientific_web.api import create_app
+from atlas_scientific_web.asgi import create_asgi_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+class DeviceSampleStreamTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_subscribers_of_the_same_device_should_share_each_sample(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample
+            ]
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        device_sampler = AtlasScientificDeviceSampler(AtlasScientificDeviceBus(i2c_session_provider), stream_interval=60)
+        self.addCleanup(i2c_session_provider.close)
+        self.addCleanup(device_sampler.stop)
+
+        # Act
+        subscription1 = device_sampler.subscribe(99)
+        samples1 = subscription1.get(5)
+        subscription2 = device_sampler.subscribe(99)
+        samples2 = subscription2.get(5)
+
+        # Assert
+        # expect the device to only be sampled once, for both subscribers
+        self.i2cbus.write.assert_has_calls([
+                call(99, b'i\00'), # expect 'i' for read info
+                call(99, b'r\00')  # expect 'r' for read device sample
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+
+        self.assertEqual('9.560', samples1[0].value)
+        self.assertIs(samples1, samples2)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_closed_subscription_should_stop_waiting_for_samples(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00', b'\xfe\00', b'\xfe\00', b'\xfe\00', b'\xfe\00']
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        device_sampler = AtlasScientificDeviceSampler(AtlasScientificDeviceBus(i2c_session_provider), stream_interval=60)
+        self.addCleanup(i2c_session_provider.close)
+
+        subscription = device_sampler.subscribe(99)
+
+        # Act
+        device_sampler.stop()
+
+        # Assert
+        self.assertIsNone(subscription.get(5))
+        self.assertTrue(subscription.is_closed)
+
+    def test_feed_should_wait_between_samples_after_resubscribing_while_sampling(self):
+
+        # Arrange
+        sampling = threading.Event()
+        sampled = threading.Event()
+        def read_sample(address, max_age):
+            sampling.set()
+            sampled.wait(5)
+
+        device_sampler = Mock()
+        device_sampler.read_sample.side_effect = read_sample
+        device_sampler.get_cached_sample.return_value = None
+
+        feed = AtlasScientificDeviceSampleFeed(device_sampler, 99, 60)
+        self.addCleanup(feed.stop)
+        subscription = feed.subscribe()
+        sampling.wait(5)
+
+        # Act
+        feed.unsubscribe(subscription)
+        feed.subscribe()
+        sampled.set()
+        time.sleep(0.2)
+
+        # Assert
+        # expect the last subscriber leaving to only bring the next sample forward,
+        # rather than the device being sampled continuously
+        self.assertEqual(2, device_sampler.read_sample.call_count)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_stream_device_samples(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample
+            ]
+
+        app = create_app(self.i2cbus, stream_interval=60).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample/stream', buffered=False)
+        event = next(iter(response.response))
+        response.close()
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(b'data: [{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n\n', event)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_stream_device_errors_as_events(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x02\00'  # second call should be rejected by the device
+            ]
+
+        app = create_app(self.i2cbus, stream_interval=60).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample/stream', buffered=False)
+        event = next(iter(response.response))
+        response.close()
+
+        # Assert
+        self.assertEqual(b'event: device_error\ndata: {"message": "Device has rejected your request, please confrim the request is supported by the device and the device has the latest firmware.", "error_code": "COMMAND_ERROR"}\n\n', event)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_stream_samples_of_every_device_over_one_stream(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        responses = {
+            97: [b'\x01?i,ORP,1.98\00', b'\x01210.5\00'],
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        }
+        self.i2cbus.ping.side_effect = lambda address: address in responses
+        self.i2cbus.read.side_effect = lambda address: responses[address].pop(0)
+
+        app = create_app(self.i2cbus, stream_interval=60).test_client()
+
+        # Act
+        response = app.get('/api/device/sample/stream', buffered=False)
+        samples = {}
+        for event in response.response:
+            samples.update(json.loads(event[len(b'data: '):]))
+            if len(samples) == 2:
+                break
+        response.close()
+
+        # Assert
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual({
+                '97': {'samples': [{'symbol': 'mV', 'timestamp': '2020-02-25 23:08:13+00:00', 'value': '210.5', 'value_type': 'float', 'unit_code': 'ORP'}]},
+                '99': {'samples': [{'symbol': '', 'timestamp': '2020-02-25 23:08:13+00:00', 'value': '9.560', 'value_type': 'float', 'unit_code': 'PH'}]},
+            }, samples)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_stream_of_every_device_should_include_devices_found_while_streaming(self, patched_bus_wait):
+
+        # Arrange
+        responses = {
+            97: [b'\x01?i,ORP,1.98\00', b'\x01210.5\00'],
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+        }
+        self.i2cbus.read.side_effect = lambda address: responses[address].pop(0)
+
+        i2c_session_provider = I2CSessionProvider(self.i2cbus)
+        device_bus = AtlasScientificDeviceBus(i2c_session_provider)
+        device_sampler = AtlasScientificDeviceSampler(device_bus, stream_interval=60)
+        device_bus.add_device_listener(device_sampler.on_device_changed)
+        self.addCleanup(i2c_session_provider.close)
+        self.addCleanup(device_sampler.stop)
+
+        subscription = device_sampler.subscribe_all([97], follow_new_devices=True)
+
+        # Act
+        device_bus.get_device_by_address(99)
+        samples = {}
+        while len(samples) < 2:
+            samples.update(subscription.get(5))
+        device_sampler.unsubscribe_all(subscription)
+
+        # Assert
+        self.assertEqual('210.5', samples[97][0].value)
+        self.assertEqual('9.560', samples[99][0].value)
+        self.assertEqual(set(), device_sampler.new_device_subscriptions)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_refuse_sample_streams_beyond_the_limit(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = lambda address: b'\x01?i,pH,1.98\00' if self.i2cbus.write.call_args[0][1] == b'i\00' else b'\x019.560\00'
+
+        app = create_app(self.i2cbus, stream_interval=60, max_sample_streams=1).test_client()
+
+        # Act
+        first_response = app.get('/api/device/99/sample/stream', buffered=False)
+        refused_response = app.get('/api/device/99/sample/stream', buffered=False)
+        first_response.close()
+        next_response = app.get('/api/device/99/sample/stream', buffered=False)
+        next_response.close()
+
+        # Assert
+        self.assertEqual(first_response.status_code, 200)
+        self.assertEqual(refused_response.status_code, 503)
+        self.assertIn(b'TOO_MANY_SAMPLE_STREAMS', refused_response.data)
+        # expect a closed stream to make way for another
+        self.assertEqual(next_response.status_code, 200)
+
+    def test_stream_of_unknown_device_should_return_error(self):
+
+        # Arrange
+        self.i2cbus.ping.return_value = False
+
+        app = create_app(self.i2cbus).test_client()
+
+        # Act
+        response = app.get('/api/device/110/sample/stream')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(b'{"message": "No device is connected to the given address.", "error_code": "DEVICE_NOT_FOUND"}\n', response.data)
+
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_stream_device_samples_from_asgi_app(self, datetime_now_mock):
+
+        # Arrange
+        responses = [b'\x01?i,pH,1.98\00', b'\x019.560\00']
+        self.i2cbus.ping.return_value = True
+        self.i2cbus.read.side_effect = lambda address: responses.pop(0)
+
+        app = create_asgi_app(self.i2cbus, stream_interval=60)
+        messages = []
+
+        async def stream():
+            first_event_sent = asyncio.Event()
+
+            requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            async def receive():
+                if requests:
+                    return requests.pop(0)
+                # the client disconnects once the first sample is received
+                await first_event_sent.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if message.get('body'):
+                    first_event_sent.set()
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/device/99/sample/stream', 'query_string': b'', 'headers': []}
+            await app(scope, receive, send)
+
+        real_asyncio_sleep = asyncio.sleep
+        async def asyncio_sleep(duration):
+            await real_asyncio_sleep(0)
+
+        # Act
+        with patch('asyncio.sleep', new=asyncio_sleep):
+            asyncio.run(stream())
+
+        # Assert
+        self.assertEqual(200, messages[0]['status'])
+        self.assertIn((b'content-type', b'text/event-stream'), messages[0]['headers'])
+        self.assertEqual(b'data: [{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n\n', messages[1]['body'])
+        self.assertTrue(messages[1]['more_body'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import time
+import unittest
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
+from atlas_scientific_web.hardware.sampler import AtlasScientificDeviceSampler, AtlasScientificCachedSample
+from atlas_scientific_web.api import create_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+class DeviceSamplerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+        self.app = create_app(self.i2cbus).test_client()
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_sample_within_max_age_should_be_served_from_cache(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        device_address = 99
+
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample
+            ]
+
+        # Act
+        response1 = self.app.get(f'/api/device/{device_address}/sample?max_age=60', follow_redirects=True)
+        response2 = self.app.get(f'/api/device/{device_address}/sample?max_age=60', follow_redirects=True)
+
+        # Assert
+        # expect the device to only be sampled once
+        self.i2cbus.write.assert_has_calls([
+                call(device_address, b'i\00'), # expect 'i' for read info
+                call(device_address, b'r\00')  # expect 'r' for read device sample
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+
+        self.assertEqual(response1.status_code, 200)
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n', response2.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_sample_with_zero_max_age_should_always_read_device(self, patched_bus_wait):
+
+        # Arrange
+        device_address = 99
+
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00',  # second call should be for reading the device sample
+                b'\x019.760\00',  # third call should be for reading the device sample again
+            ]
+
+        # Act
+        response1 = self.app.get(f'/api/device/{device_address}/sample?max_age=60', follow_redirects=True)
+        response2 = self.app.get(f'/api/device/{device_address}/sample?max_age=0', follow_redirects=True)
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(device_address, b'i\00'), # expect 'i' for read info
+                call(device_address, b'r\00'), # expect 'r' for read device sample
+                call(device_address, b'r\00'), # expect 'r' as cached sample is too old
+            ],
+            any_order=False)
+
+        self.assertEqual(response1.status_code, 200)
+        self.assertEqual(response2.status_code, 200)
+        self.assertIn(b'"value": "9.760"', response2.data)
+
+    def test_sample_with_invalid_max_age_should_return_validation_error(self):
+
+        # Act
+        response = self.app.get('/api/device/99/sample?max_age=-1', follow_redirects=True)
+
+        # Assert
+        self.i2cbus.write.assert_not_called()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(b'{"message": "Request contains a missing or incorrectly formatted felid.", "error_code": "INVALID_REQUEST_ERROR"}\n', response.data)
+
+    def test_background_sampler_should_serve_samples_from_cache(self):
+
+        # Arrange
+        samples = [Mock()]
+
+        device_bus = Mock()
+        device_bus.read_samples.return_value = {99: samples}
+
+        sampler = AtlasScientificDeviceSampler(device_bus, sample_interval=60)
+
+        # Act
+        sampler.start()
+        for _ in range(500):
+            if sampler.get_cached_sample(99):
+                break
+            time.sleep(0.01)
+        result = sampler.read_sample(99)
+        sampler.stop()
+
+        # Assert
+        self.assertIs(result, samples)
+        device_bus.read_samples.assert_called_with()
+        device_bus.get_device_by_address.assert_not_called()
+
+    def test_background_sampler_should_not_serve_samples_it_has_failed_to_update(self):
+
+        # Arrange
+        samples = [Mock()]
+
+        device_bus = Mock()
+        device_bus.read_samples.side_effect = IOError('bus failed')
+        device_bus.get_device_by_address.return_value.read_sample.return_value = samples
+
+        sampler = AtlasScientificDeviceSampler(device_bus, sample_interval=60)
+        sampler.start()
+        for _ in range(500):
+            if device_bus.read_samples.called:
+                break
+            time.sleep(0.01)
+        sampler.cache[99] = AtlasScientificCachedSample([Mock()], time.monotonic() - 600)
+
+        # Act
+        result = sampler.read_sample(99)
+        sampler.stop()
+
+        # Assert
+        # expect the device to be read, as the sampler has missed many passes of it
+        self.assertIs(result, samples)
+        device_bus.get_device_by_address.assert_called_with(99)
+
+if __name__ == '__main__':
+    unittest.main()
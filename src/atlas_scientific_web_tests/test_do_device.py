@@ -3,7 +3,7 @@ from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -11,7 +11,7 @@ date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
 class DoDeviceTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -20,9 +20,9 @@ class DoDeviceTests(unittest.TestCase):
 
     # Sample tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_do_device_with_all_output_units_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_do_device_with_all_output_units_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -45,7 +45,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -64,9 +64,9 @@ class DoDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "mg/L", "timestamp": "2020-02-25 23:08:13+00:00", "value": "238.15", "value_type": "float", "unit_code": "MG"}, {"symbol": "%", "timestamp": "2020-02-25 23:08:13+00:00", "value": "419.6", "value_type": "float", "unit_code": "%"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_do_device_with_no_output_units_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_do_device_with_no_output_units_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -89,7 +89,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -108,9 +108,9 @@ class DoDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_do_device_with_only_percent_saturation_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_do_device_with_only_percent_saturation_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -133,7 +133,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -152,9 +152,9 @@ class DoDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "%", "timestamp": "2020-02-25 23:08:13+00:00", "value": "419.6", "value_type": "float", "unit_code": "%"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_do_device_with_only_mg_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_do_device_with_only_mg_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -177,7 +177,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -198,8 +198,8 @@ class DoDeviceTests(unittest.TestCase):
 
     # Sample output tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_enable_mg_unit_on_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_enable_mg_unit_on_atlas_scientific_do_device(self, patched_bus_wait):
 
             # Arrange
             device_address = 97
@@ -233,7 +233,7 @@ class DoDeviceTests(unittest.TestCase):
                 any_order=False)
 
             # expect to wait for result to be ready
-            patched_time_sleep.assert_has_calls([
+            patched_bus_wait.assert_has_calls([
                     call(0.3), # "i"
                     call(0.3), # "o,?"
                     call(0.3), # "o,mg,1"
@@ -256,8 +256,8 @@ class DoDeviceTests(unittest.TestCase):
             self.assertEqual(enable_mg_response.status_code, 200)
             self.assertEqual(read_response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_enable_mg_case_insensitive_unit_on_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_enable_mg_case_insensitive_unit_on_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -287,7 +287,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.3), # "o,mg,1"
@@ -306,8 +306,8 @@ class DoDeviceTests(unittest.TestCase):
 
         self.assertEqual(enable_mg_response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_enable_both_percent_saturation_and_mg_unit_on_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_enable_both_percent_saturation_and_mg_unit_on_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -339,7 +339,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.3), # "o,mg,1"
@@ -361,8 +361,8 @@ class DoDeviceTests(unittest.TestCase):
         self.assertEqual(enable_response.status_code, 200)
         self.assertEqual(read_response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_resolve_supported_outputs_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_resolve_supported_outputs_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -377,7 +377,7 @@ class DoDeviceTests(unittest.TestCase):
 
         # Assert
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3)
             ], 
             any_order=False)
@@ -394,8 +394,8 @@ class DoDeviceTests(unittest.TestCase):
 
     # configuration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -421,7 +421,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,ec_device"
             ], 
@@ -437,8 +437,8 @@ class DoDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_led_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_led_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -464,7 +464,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "L,1"
             ], 
@@ -483,8 +483,8 @@ class DoDeviceTests(unittest.TestCase):
 
     # compensation tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_compensate_for_kpa_Pressure_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_compensate_for_kpa_Pressure_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -511,7 +511,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "P,90.25"
             ], 
@@ -527,8 +527,8 @@ class DoDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_compensate_for_temperature_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_compensate_for_temperature_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -555,7 +555,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "T,19.5"
             ], 
@@ -571,8 +571,8 @@ class DoDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_compensate_for_us_salinity_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_compensate_for_us_salinity_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 97
@@ -599,7 +599,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "S,50000"
             ], 
@@ -617,8 +617,8 @@ class DoDeviceTests(unittest.TestCase):
 
     # Calibration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_0_mg_point_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_0_mg_point_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -642,7 +642,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(1.3), # "Cal,0"
             ], 
@@ -657,8 +657,8 @@ class DoDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_atmospheric_point_in_atlas_scientific_do_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_atmospheric_point_in_atlas_scientific_do_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -682,7 +682,7 @@ class DoDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(1.3), # "Cal"
             ], 
@@ -1,9 +1,10 @@
+import json
 import unittest
 from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -11,7 +12,7 @@ date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
 class EcDeviceTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -20,9 +21,9 @@ class EcDeviceTests(unittest.TestCase):
 
     # sample tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value=datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_ec_device_with_ec_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_ec_device_with_ec_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -45,7 +46,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -63,9 +64,9 @@ class EcDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "\u03bcS/cm", "timestamp": "2020-02-25 23:08:13+00:00", "value": "1.2", "value_type": "float", "unit_code": "EC"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value=datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_ec_device_with_tds_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_ec_device_with_tds_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -88,7 +89,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -106,9 +107,9 @@ class EcDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "ppm", "timestamp": "2020-02-25 23:08:13+00:00", "value": "2000", "value_type": "float", "unit_code": "TDS"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_ec_device_with_us_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_ec_device_with_us_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -131,7 +132,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -149,9 +150,9 @@ class EcDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "ppt", "timestamp": "2020-02-25 23:08:13+00:00", "value": "50000", "value_type": "float", "unit_code": "S"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_ec_device_with_sg_enabled(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_ec_device_with_sg_enabled(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -174,7 +175,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "o,?"
                 call(0.6)  # "r"
@@ -194,8 +195,8 @@ class EcDeviceTests(unittest.TestCase):
 
     # sample output tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_resolve_supported_outputs_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_resolve_supported_outputs_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -210,7 +211,7 @@ class EcDeviceTests(unittest.TestCase):
 
         # Assert
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3)
             ], 
             any_order=False)
@@ -235,8 +236,8 @@ class EcDeviceTests(unittest.TestCase):
 
     # compensation tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_compensate_for_temperature_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_compensate_for_temperature_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -263,7 +264,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "T,19.5"
             ], 
@@ -281,8 +282,8 @@ class EcDeviceTests(unittest.TestCase):
 
     # configuration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_k_value_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_k_value_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -308,7 +309,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "K,1.0"
             ], 
@@ -324,8 +325,8 @@ class EcDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_leds_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_leds_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -351,7 +352,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "l,1"
             ], 
@@ -367,8 +368,8 @@ class EcDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -394,7 +395,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,ec_device"
             ], 
@@ -412,8 +413,8 @@ class EcDeviceTests(unittest.TestCase):
 
     # calibration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_dry_point_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_dry_point_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -437,7 +438,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.6), # "Cal"
             ], 
@@ -452,8 +453,8 @@ class EcDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_any_point_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_any_point_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -478,7 +479,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.6), # "Cal"
             ], 
@@ -493,8 +494,8 @@ class EcDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
     
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_low_point_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_low_point_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -519,7 +520,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.6), # "Cal"
             ], 
@@ -534,8 +535,8 @@ class EcDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_low_point_in_atlas_scientific_ec_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_low_point_in_atlas_scientific_ec_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -560,7 +561,7 @@ class EcDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.6), # "Cal"
             ], 
@@ -575,6 +576,62 @@ class EcDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_reject_calibration_point_which_can_not_be_set_next(self, patched_bus_wait):
+
+        # Arrange
+        device_address = 100
+
+        self.i2cbus.read.side_effect = [
+            b'\x01?i,EC,2.10\00',   # first call should be for the device info
+            b'\x01\00',            # call should be to read the result from setting the calibration point
+        ]
+
+        self.app.put(f'/api/device/{device_address}/sample/calibration', json={'point': 'dry'}, follow_redirects=True)
+
+        # Act
+        response = self.app.put(f'/api/device/{device_address}/sample/calibration', json={'point': 'high', 'actual_value': '80000'}, follow_redirects=True)
+        calibration_response = self.app.get(f'/api/device/{device_address}/sample/calibration')
+
+        # Assert
+        # expect the high point to be rejected without the device being asked
+        self.i2cbus.write.assert_has_calls([
+                call(device_address, b'i\00'),
+                call(device_address, b'Cal,dry\00'),
+            ], 
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'CALIBRATION_POINT_NOT_ALLOWED', response.data)
+
+        self.assertEqual(calibration_response.status_code, 200)
+        calibration = json.loads(calibration_response.data)
+        self.assertEqual('dry', calibration['point'])
+        self.assertEqual(False, calibration['is_complete'])
+        self.assertEqual(['any', 'low', 'dry'], [p['id'] for p in calibration['next_points']])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_not_set_calibration_point_which_the_device_did_not_confirm(self, patched_bus_wait):
+
+        # Arrange
+        device_address = 100
+
+        self.i2cbus.read.side_effect = [
+            b'\x01?i,EC,2.10\00',   # first call should be for the device info
+            b'\xff\00',            # the device has no result from setting the calibration point
+        ]
+
+        # Act
+        response = self.app.put(f'/api/device/{device_address}/sample/calibration', json={'point': 'dry'}, follow_redirects=True)
+        calibration_response = self.app.get(f'/api/device/{device_address}/sample/calibration')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'UNEXPECTED_DEVICE_RESPONSE', response.data)
+
+        calibration = json.loads(calibration_response.data)
+        self.assertEqual(None, calibration['point'])
 
     # TODO: add support for selecting probe k value
 if __name__ == '__main__':
@@ -0,0 +1,148 @@
+import errno
+import unittest
+from unittest.mock import Mock, patch
+
+from atlas_scientific_web.hardware import i2c
+
+@unittest.skipIf(not hasattr(i2c, 'I2C_RDWR'), 'I2C is only supported on linux')
+class I2CBusIoTests(unittest.TestCase):
+
+    def setUp(self):
+        # addresses acknowledging their messages
+        self.present = {97, 99}
+        # the messages of each I2C_RDWR ioctl, as (address, flags, length)
+        self.transfers = []
+        self.selected_address = None
+        self.unsupported_transfers = False
+
+        io_open_patcher = patch('io.open', side_effect=lambda *args, **kwargs: Mock())
+        io_open_patcher.start()
+        self.addCleanup(io_open_patcher.stop)
+
+        ioctl_patcher = patch('fcntl.ioctl', side_effect=self.ioctl)
+        ioctl_patcher.start()
+        self.addCleanup(ioctl_patcher.stop)
+
+        self.i2cbus = i2c.I2CBusIo()
+        self.i2cbus.file_read.readinto.side_effect = self.readinto
+
+    def ioctl(self, file, request, arg):
+        if request == i2c.I2C_SLAVE:
+            self.selected_address = arg
+            return 0
+
+        if self.unsupported_transfers:
+            raise OSError(errno.EOPNOTSUPP, 'Operation not supported')
+
+        messages = arg.msgs[:arg.nmsgs]
+        self.transfers.append([(m.addr, m.flags, m.len) for m in messages])
+        for message in messages:
+            if message.addr not in self.present:
+                raise OSError(errno.EREMOTEIO, 'Remote I/O error')
+            if message.flags & i2c.I2C_M_RD:
+                message.buf[0] = message.addr
+        return len(messages)
+
+    def readinto(self, buffer):
+        if self.selected_address not in self.present:
+            raise OSError(errno.EREMOTEIO, 'Remote I/O error')
+        buffer[0] = self.selected_address
+        return len(buffer)
+
+    def test_ping_should_probe_with_a_single_quick_write(self):
+
+        # Act
+        result = self.i2cbus.ping(99)
+
+        # Assert
+        self.assertTrue(result)
+        self.assertEqual([[(99, 0, 0)]], self.transfers)
+        self.i2cbus.file_read.readinto.assert_not_called()
+
+    def test_ping_should_probe_eeprom_addresses_with_a_single_byte_read(self):
+
+        # Arrange
+        self.present.add(0x50)
+
+        # Act
+        result = self.i2cbus.ping(0x50)
+
+        # Assert
+        # expect a read, as a quick write can corrupt an EEPROM
+        self.assertTrue(result)
+        self.assertEqual([[(0x50, i2c.I2C_M_RD, 1)]], self.transfers)
+
+    def test_ping_should_return_false_when_probe_is_not_acknowledged(self):
+
+        # Act
+        result = self.i2cbus.ping(98)
+
+        # Assert
+        self.assertFalse(result)
+        self.assertTrue(self.i2cbus.supports_probe)
+        self.i2cbus.file_read.readinto.assert_not_called()
+
+    def test_ping_should_fall_back_to_reading_when_bus_cannot_probe(self):
+
+        # Arrange
+        self.unsupported_transfers = True
+
+        # Act
+        results = [self.i2cbus.ping(99), self.i2cbus.ping(98)]
+
+        # Assert
+        self.assertEqual([True, False], results)
+        self.assertFalse(self.i2cbus.supports_probe)
+        self.assertEqual(2, self.i2cbus.file_read.readinto.call_count)
+
+    def test_read_all_should_read_every_device_with_one_ioctl(self):
+
+        # Arrange
+        reads = [(97, bytearray(4)), (99, bytearray(8))]
+
+        # Act
+        results = self.i2cbus.read_all_into(reads)
+
+        # Assert
+        self.assertEqual([[(97, i2c.I2C_M_RD, 4), (99, i2c.I2C_M_RD, 8)]], self.transfers)
+        self.assertEqual([4, 8], results)
+        self.assertEqual([97, 99], [buffer[0] for _, buffer in reads])
+
+    def test_read_all_should_report_each_outcome_when_a_device_is_not_acknowledged(self):
+
+        # Arrange
+        reads = [(97, bytearray(4)), (98, bytearray(4)), (99, bytearray(4))]
+
+        # Act
+        results = self.i2cbus.read_all_into(reads)
+
+        # Assert
+        # expect the device before the failure, whose response was discarded, to not be read again.
+        # Only the device after the failure is read, on its own
+        self.assertIsInstance(results[0], IOError)
+        self.assertIn('lost', str(results[0]))
+        self.assertEqual(errno.EREMOTEIO, results[1].errno)
+        self.assertEqual(4, results[2])
+        self.assertEqual([[(97, 0, 0)], [(98, 0, 0)]], self.transfers[1:])
+        self.assertEqual(1, self.i2cbus.file_read.readinto.call_count)
+        self.assertEqual(99, self.selected_address)
+        self.assertTrue(self.i2cbus.supports_batch_reads)
+
+    def test_read_all_should_read_each_device_on_its_own_when_bus_cannot_batch(self):
+
+        # Arrange
+        self.unsupported_transfers = True
+        reads = [(97, bytearray(4)), (98, bytearray(4)), (99, bytearray(4))]
+
+        # Act
+        results = self.i2cbus.read_all_into(reads)
+
+        # Assert
+        self.assertFalse(self.i2cbus.supports_batch_reads)
+        self.assertEqual(4, results[0])
+        self.assertEqual(errno.EREMOTEIO, results[1].errno)
+        self.assertEqual(4, results[2])
+        self.assertEqual([97, 0, 99], [buffer[0] for _, buffer in reads])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+from unittest.mock import Mock, call, patch
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CBusScheduler, I2CTransaction
+
+class I2CBusSchedulerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.bus_calls = []
+
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+        self.i2cbus.write.side_effect = lambda address, value: self.bus_calls.append(('write', address))
+        self.i2cbus.read.side_effect = lambda address: self.bus_calls.append(('read', address)) or bytes([address])
+
+        self.scheduler = I2CBusScheduler(self.i2cbus)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_wait_for_transaction_delay_before_reading(self, patched_bus_wait):
+
+        # Act
+        result = self.scheduler.execute(I2CTransaction(99, write_bytes=b'r\00', delay=0.9))
+
+        # Assert
+        self.i2cbus.write.assert_called_once_with(99, b'r\00')
+        patched_bus_wait.assert_called_once_with(0.9)
+        self.i2cbus.read.assert_called_once_with(99)
+        self.assertEqual(bytes([99]), result)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_read_each_device_as_soon_as_it_is_ready(self, patched_bus_wait):
+
+        # Arrange
+        patched_bus_wait.side_effect = lambda duration: self.bus_calls.append(('wait', round(duration, 6)))
+
+        slow_transaction = I2CTransaction(99, write_bytes=b'r\00', delay=0.9)
+        fast_transaction = I2CTransaction(102, write_bytes=b'r\00', delay=0.6)
+
+        # Act
+        self.scheduler.submit([slow_transaction, fast_transaction])
+        slow_result = slow_transaction.future.result(5)
+        fast_result = fast_transaction.future.result(5)
+
+        # Assert
+        # expect both devices to process at the same time, rather than one after the other
+        self.assertEqual([
+                ('write', 99), ('write', 102),
+                ('wait', 0.6),
+                ('read', 102),
+                ('wait', 0.3),
+                ('read', 99),
+            ], self.bus_calls)
+
+        self.assertEqual(bytes([99]), slow_result)
+        self.assertEqual(bytes([102]), fast_result)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_only_read_when_no_bytes_are_given_to_write(self, patched_bus_wait):
+
+        # Act
+        self.scheduler.execute(I2CTransaction(99, delay=0.3))
+
+        # Assert
+        self.i2cbus.write.assert_not_called()
+        patched_bus_wait.assert_called_once_with(0.3)
+        self.i2cbus.read.assert_called_once_with(99)
+
+    def test_should_only_write_when_read_is_not_requested(self):
+
+        # Act
+        result = self.scheduler.execute(I2CTransaction(99, write_bytes=b'Sleep\00', read=False))
+
+        # Assert
+        self.i2cbus.write.assert_called_once_with(99, b'Sleep\00')
+        self.i2cbus.read.assert_not_called()
+        self.assertIsNone(result)
+
+    def test_should_ping_device(self):
+
+        # Arrange
+        self.i2cbus.ping.return_value = True
+
+        # Act
+        result = self.scheduler.execute(I2CTransaction(99, ping=True))
+
+        # Assert
+        self.i2cbus.ping.assert_called_once_with(99)
+        self.assertTrue(result)
+
+    def test_should_start_transactions_submitted_while_waiting_for_a_device(self):
+
+        # Arrange
+        self.i2cbus.ping.return_value = True
+        slow_transaction = I2CTransaction(99, write_bytes=b'r\00', delay=30)
+        self.scheduler.submit([slow_transaction])
+
+        # Act
+        result = self.scheduler.execute(I2CTransaction(98, ping=True))
+
+        # Assert
+        # expect the ping not to wait for the slow device to be ready
+        self.assertTrue(result)
+        self.assertFalse(slow_transaction.future.done())
+        self.i2cbus.read.assert_not_called()
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_raise_bus_errors_to_the_transaction_owner_only(self, patched_bus_wait):
+
+        # Arrange
+        def i2cbus_write(address, value):
+            if address == 98:
+                raise IOError('Remote I/O error')
+        self.i2cbus.write.side_effect = i2cbus_write
+
+        failed_transaction = I2CTransaction(98, write_bytes=b'r\00', delay=0.9)
+        transaction = I2CTransaction(99, write_bytes=b'r\00', delay=0.9)
+
+        # Act
+        self.scheduler.submit([failed_transaction, transaction])
+
+        # Assert
+        with self.assertRaises(IOError):
+            failed_transaction.future.result(5)
+        self.assertEqual(bytes([99]), transaction.future.result(5))
+
+    def test_should_reject_transactions_once_stopped(self):
+
+        # Act
+        self.scheduler.stop()
+
+        # Assert
+        with self.assertRaises(IOError):
+            self.scheduler.execute(I2CTransaction(99))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_read_responses_into_one_buffer_and_copy_only_their_content(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x019.560'.ljust(40, b'\x00'), b'\x017.1\x00\x00']
+
+        # Act
+        first = self.scheduler.execute(I2CTransaction(99, write_bytes=b'r\00', delay=0.9))
+        read_buffer = self.scheduler.read_buffer
+        second = self.scheduler.execute(I2CTransaction(99, write_bytes=b'r\00', delay=0.9))
+
+        # Assert
+        self.assertEqual(b'\x019.560', first)
+        self.assertEqual(b'\x017.1', second)
+        self.assertIs(read_buffer, self.scheduler.read_buffer)
+
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_read_devices_ready_at_the_same_time_together(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read_all_into = Mock(wraps=self.i2cbus.read_all_into)
+        transactions = [I2CTransaction(address, write_bytes=b'r\00', delay=0.9) for address in (97, 98, 99)]
+
+        # Act
+        self.scheduler.submit(transactions)
+
+        # Assert
+        self.assertEqual([bytes([97]), bytes([98]), bytes([99])], [t.future.result(5) for t in transactions])
+        self.i2cbus.read_all_into.assert_called_once()
+        self.assertEqual([97, 98, 99], [address for address, _ in self.i2cbus.read_all_into.call_args[0][0]])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_only_fail_the_device_failing_a_batched_read(self, patched_bus_wait):
+
+        # Arrange
+        def i2cbus_read(address):
+            self.bus_calls.append(('read', address))
+            if address == 98:
+                raise IOError('Remote I/O error')
+            return bytes([address])
+        self.i2cbus.read.side_effect = i2cbus_read
+
+        transactions = [I2CTransaction(address, write_bytes=b'r\00', delay=0.9) for address in (97, 98, 99)]
+
+        # Act
+        self.scheduler.submit(transactions)
+
+        # Assert
+        self.assertEqual(bytes([97]), transactions[0].future.result(5))
+        with self.assertRaises(IOError):
+            transactions[1].future.result(5)
+        self.assertEqual(bytes([99]), transactions[2].future.result(5))
+
+        # expect each device to only be read once, as a device already read has no response left to read
+        self.assertEqual([('read', 97), ('read', 98), ('read', 99)], [c for c in self.bus_calls if c[0] == 'read'])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_not_read_devices_again_when_a_batched_read_raises(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read_all_into = Mock(side_effect=IOError('Remote I/O error'))
+        transactions = [I2CTransaction(address, write_bytes=b'r\00', delay=0.9) for address in (98, 99)]
+
+        # Act
+        self.scheduler.submit(transactions)
+
+        # Assert
+        for transaction in transactions:
+            with self.assertRaises(IOError):
+                transaction.future.result(5)
+        self.i2cbus.read.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,13 +3,15 @@ from unittest.mock import Mock, patch
 from parameterized import parameterized
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
+from atlas_scientific_web.hardware.models import AtlasScientificDeviceSample, AtlasScientificResponse, RequestResult, ExpectedValueType, RequestValidationError
+from atlas_scientific_web.hardware.capabilities import get_device_capabilities
 from atlas_scientific_web.api import create_app
 
 class ModelValidationTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -63,7 +65,7 @@ class ModelValidationTests(unittest.TestCase):
             }],
         ],
     ])
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     def test_should_return_invalid_request_error(self, name, method, url, request_body, _):
 
         self.i2cbus.read.side_effect = [ 
@@ -107,7 +109,7 @@ class ModelValidationTests(unittest.TestCase):
             }],
         ],
     ])
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     def test_should_return_invalid_request(self, name, method, url, request_body, _):
         self.i2cbus.read.side_effect = [ 
                 b'\x01?I,DO,1.98\00',
@@ -128,7 +130,7 @@ class ModelValidationTests(unittest.TestCase):
             ['unicorns'],
         ],
     ])
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     def test_should_return_invalid_request(self, name, method, url, request_body, _):
         self.i2cbus.read.side_effect = [ 
                 b'\x01?I,DO,1.98\00', # call should be for the device info
@@ -180,7 +182,7 @@ class ModelValidationTests(unittest.TestCase):
             },
         ],
     ])
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     def test_should_return_invalid_request_for_ph_device(self, name, method, url, request_body, _):
         self.i2cbus.read.side_effect = [ 
                 b'\x01?i,pH,1.98\00' # pH device expects a calibration point
@@ -194,6 +196,146 @@ class ModelValidationTests(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(b'{"message": "Request contains a missing or incorrectly formatted felid.", "error_code": "INVALID_REQUEST_ERROR"}\n', response.data)
 
+class DeviceSampleModelTests(unittest.TestCase):
+
+    @parameterized.expand([
+        ['float', '9.560', 'float', 9.56],
+        ['int', '400', 'int', 400],
+        ['string', 'probe', 'string', None],
+        ['float_without_output', '', 'float', None],
+        ['float_which_is_not_a_number', 'no output', 'float', None],
+    ])
+    def test_sample_value_should_be_parsed_once_by_value_type(self, name, value, value_type, expected_numeric_value):
+
+        # Act
+        sample = AtlasScientificDeviceSample('', value, value_type, None, 'PH')
+
+        # Assert
+        self.assertEqual(expected_numeric_value, sample.numeric_value)
+        self.assertEqual(value, sample.value)
+
+    def test_sample_value_should_not_be_parsed_until_needed(self):
+
+        # Act
+        with patch('atlas_scientific_web.hardware.models.parse_numeric_value', return_value=9.56) as parse_mock:
+            sample = AtlasScientificDeviceSample('', '9.560', 'float', None, 'PH')
+            created_parse_count = parse_mock.call_count
+            numeric_values = [sample.numeric_value, sample.numeric_value]
+
+        # Assert
+        self.assertEqual(0, created_parse_count)
+        self.assertEqual([9.56, 9.56], numeric_values)
+        parse_mock.assert_called_once_with('9.560', 'float')
+
+class DeviceResponseModelTests(unittest.TestCase):
+
+    @parameterized.expand([
+        ['bytes', bytes],
+        ['bytearray', bytearray],
+        ['memoryview', lambda b: memoryview(bytearray(b))],
+        ['memoryview_of_part_of_a_buffer', lambda b: memoryview(bytearray(b'\x02\x00' + b))[2:]],
+    ])
+    def test_response_should_parse_fields_of_padded_read_buffer(self, name, to_buffer):
+
+        # Arrange
+        response_bytes = to_buffer(b'\x01238.15,419.6'.ljust(40, b'\x00'))
+
+        # Act
+        response = AtlasScientificResponse(response_bytes, None)
+
+        # Assert
+        self.assertEqual(RequestResult.OK, response.status)
+        self.assertEqual(['238.15', '419.6'], response.get_fields('sample', 0, None))
+        self.assertEqual(b'419.6', response.get_raw_field('sample', 1))
+
+    def test_response_should_not_change_when_read_buffer_is_reused(self):
+
+        # Arrange
+        read_buffer = bytearray(b'\x019.560\x00')
+        response = AtlasScientificResponse(read_buffer, None)
+
+        # Act
+        read_buffer[1:6] = b'7.120'
+
+        # Assert
+        self.assertEqual('9.560', response.get_field('sample', 0))
+
+    def test_sample_should_only_decode_value_when_needed(self):
+
+        # Arrange
+        response = AtlasScientificResponse(b'\x019.560\x00', None)
+        unit = Mock(symbol='', value_type='float', unit_code='PH')
+
+        # Act
+        sample = AtlasScientificDeviceSample.from_expected_device_output(response, [unit])[0]
+
+        # Assert
+        self.assertEqual(b'9.560', sample.device_value)
+        self.assertEqual(9.56, sample.numeric_value)
+        self.assertEqual('9.560', sample.value)
+
+class DeviceCapabilitiesTests(unittest.TestCase):
+
+    def test_capabilities_should_be_shared_by_every_device_of_a_type(self):
+
+        # Act
+        capabilities = get_device_capabilities('DO')
+
+        # Assert
+        self.assertIs(capabilities, get_device_capabilities('DO'))
+        self.assertIsNot(capabilities, get_device_capabilities('pH'))
+
+    def test_capabilities_should_not_be_changeable(self):
+
+        # Arrange
+        capabilities = get_device_capabilities('DO')
+
+        # Act / Assert
+        with self.assertRaises(AttributeError):
+            capabilities.read.latency = 0
+        with self.assertRaises(AttributeError):
+            capabilities.read.output[0].unit_code = 'PPM'
+        with self.assertRaises(TypeError):
+            capabilities.compensation.factors['temperature'] = None
+
+    def test_calibration_points_should_be_compiled_for_lookup(self):
+
+        # Act
+        calibration = get_device_capabilities('pH').calibration
+
+        # Assert
+        self.assertEqual('Cal,mid', calibration.points_by_id['mid'].command)
+        self.assertEqual('Cal', get_device_capabilities('ORP').calibration.points_by_id['any'].command)
+        self.assertEqual(('low', 'Complete'), calibration.points_by_id['mid'].next_points)
+
+    @parameterized.expand([
+        ['float', 'float', '9.56', '9.56'],
+        ['int', 'int', '400', '400'],
+        ['string', 'string', 'probe', 'probe'],
+        ['bool_true', 'bool', 'Yes', '1'],
+        ['bool_false', 'bool', 'false', '0'],
+        ['none_without_value', None, '', None],
+    ])
+    def test_value_type_should_validate_value(self, name, value_type, value, expected_value):
+
+        # Act
+        validated = ExpectedValueType(value_type).validate_is_of_type(value)
+
+        # Assert
+        self.assertEqual(expected_value, validated)
+
+    @parameterized.expand([
+        ['float', 'float', 'nine'],
+        ['int', 'int', '4.5'],
+        ['bool', 'bool', 'maybe'],
+        ['missing', 'float', ''],
+    ])
+    def test_value_type_should_reject_invalid_value(self, name, value_type, value):
+
+        # Act / Assert
+        with self.assertRaises(RequestValidationError):
+            ExpectedValueType(value_type).validate_is_of_type(value)
+
 
 if __name__ == '__main__':
     unittest.main()
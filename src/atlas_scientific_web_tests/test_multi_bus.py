@@ -0,0 +1,136 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.async_device import AsyncAtlasScientificDeviceBus
+from atlas_scientific_web.hardware.multi_bus import AsyncAtlasScientificMultiDeviceBus
+from atlas_scientific_web.api import create_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+class MultiBusTests(unittest.TestCase):
+
+    def given_bus(self, device_responses):
+        i2cbus = StubI2CBusIo()
+        i2cbus.ping = Mock(side_effect=lambda address: address in device_responses)
+        i2cbus.write = Mock()
+        i2cbus.read = Mock(side_effect=lambda address: device_responses[address].pop(0))
+        return i2cbus
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_list_devices_of_every_bus(self, patched_bus_wait):
+
+        # Arrange
+        i2cbuses = {
+            1: self.given_bus({99: [b'\x01?i,pH,1.98\00']}),
+            3: self.given_bus({99: [b'\x01?i,ORP,1.97\00'], 102: [b'\x01?i,RTD,2.01\00']}),
+        }
+
+        app = create_app(i2cbuses).test_client()
+
+        # Act
+        response = app.get('/api/device', follow_redirects=True)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        devices = json.loads(response.data)
+        self.assertEqual(
+            [('1:99', 'pH'), ('3:99', 'ORP'), ('3:102', 'RTD')],
+            [(d['address'], d['device_type']) for d in devices])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_a_device_by_bus_and_address(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        i2cbuses = {
+            1: self.given_bus({}),
+            3: self.given_bus({99: [b'\x01?i,pH,1.98\00', b'\x019.560\00']}),
+        }
+
+        app = create_app(i2cbuses).test_client()
+
+        # Act
+        response = app.get('/api/device/3:99/sample')
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'"value": "9.560"', response.data)
+        i2cbuses[1].write.assert_not_called()
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_return_no_device_error_for_unknown_bus(self, patched_bus_wait):
+
+        # Arrange
+        app = create_app({1: self.given_bus({99: [b'\x01?i,pH,1.98\00']})}).test_client()
+
+        # Act
+        response = app.get('/api/device/2:99/sample')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'DEVICE_NOT_FOUND', response.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_devices_of_many_buses_at_once(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        i2cbuses = {
+            1: self.given_bus({99: [b'\x01?i,pH,1.98\00', b'\x019.560\00']}),
+            3: self.given_bus({99: [b'\x01?i,pH,1.98\00', b'\x017.120\00']}),
+        }
+
+        app = create_app(i2cbuses).test_client()
+
+        # Act
+        response = app.get('/api/device/sample?address=1:99&address=3:99&address=4:99')
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        device_samples = json.loads(response.data)
+        self.assertEqual('9.560', device_samples['1:99']['samples'][0]['value'])
+        self.assertEqual('7.120', device_samples['3:99']['samples'][0]['value'])
+        self.assertEqual('DEVICE_NOT_FOUND', device_samples['4:99']['error']['error_code'])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_plain_address_should_not_be_found_when_devices_are_on_many_buses(self, patched_bus_wait):
+
+        # Arrange
+        app = create_app({1: self.given_bus({99: [b'\x01?i,pH,1.98\00']})}).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'DEVICE_NOT_FOUND', response.data)
+
+    def test_async_bus_can_sample_devices_of_many_buses(self):
+
+        # Arrange
+        providers = {
+            1: I2CSessionProvider(self.given_bus({99: [b'\x01?i,pH,1.98\00', b'\x019.560\00']})),
+            3: I2CSessionProvider(self.given_bus({99: [b'\x01?i,pH,1.98\00', b'\x017.120\00']})),
+        }
+        for provider in providers.values():
+            self.addCleanup(provider.close)
+        device_bus = AsyncAtlasScientificMultiDeviceBus({bus: AsyncAtlasScientificDeviceBus(p, bus=bus) for bus, p in providers.items()})
+
+        real_asyncio_sleep = asyncio.sleep
+        async def asyncio_sleep(duration):
+            await real_asyncio_sleep(0)
+
+        # Act
+        with patch('asyncio.sleep', new=asyncio_sleep):
+            results = asyncio.run(device_bus.read_samples(['1:99', '3:99']))
+
+        # Assert
+        self.assertEqual('9.560', results['1:99'][0].value)
+        self.assertEqual('7.120', results['3:99'][0].value)
+
+if __name__ == '__main__':
+    unittest.main()
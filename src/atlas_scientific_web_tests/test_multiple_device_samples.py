@@ -0,0 +1,123 @@
+import unittest
+from unittest.mock import Mock, call, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
+from atlas_scientific_web.api import create_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+class MultipleDeviceSampleTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+
+        self.app = create_app(self.i2cbus).test_client()
+
+    def given_devices(self, device_responses):
+        bus_calls = []
+
+        def i2cbus_ping(address):
+            return address in device_responses
+
+        def i2cbus_write(address, value):
+            bus_calls.append(('write', address, value))
+
+        def i2cbus_read(address):
+            bus_calls.append(('read', address))
+            return device_responses[address].pop(0)
+
+        self.i2cbus.ping.side_effect = i2cbus_ping
+        self.i2cbus.write.side_effect = i2cbus_write
+        self.i2cbus.read.side_effect = i2cbus_read
+        return bus_calls
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_all_known_devices_at_once(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        bus_calls = self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+            102: [b'\x01?i,RTD,2.01\00', b'\x0125.104\00'],
+        })
+        patched_bus_wait.side_effect = lambda duration: bus_calls.append(('sleep', duration))
+
+        # Act
+        response = self.app.get('/api/device/sample', follow_redirects=True)
+
+        # Assert
+        # expect 'r' to be written to both devices, then a single wait for the slowest device
+        self.assertEqual([
+                ('write', 99, b'i\00'), ('write', 102, b'i\00'),
+                ('sleep', 0.3),
+                ('read', 99), ('read', 102),
+                ('write', 99, b'r\00'), ('write', 102, b'r\00'),
+                ('sleep', 0.9),
+                ('read', 99), ('read', 102),
+            ], bus_calls)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b'{"99": {"samples": [{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]}, '
+            b'"102": {"samples": [{"symbol": "\\u00b0", "timestamp": "2020-02-25 23:08:13+00:00", "value": "25.104", "value_type": "float", "unit_code": "T"}]}}\n', response.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_can_sample_selected_devices_at_once(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+            102: [b'\x01?i,RTD,2.01\00', b'\x0125.104\00'],
+        })
+
+        # Act
+        response = self.app.get('/api/device/sample?address=102', follow_redirects=True)
+
+        # Assert
+        self.i2cbus.write.assert_has_calls([
+                call(102, b'i\00'),
+                call(102, b'r\00'),
+            ],
+            any_order=False)
+        self.assertEqual(self.i2cbus.write.call_count, 2)
+
+        patched_bus_wait.assert_has_calls([call(0.3), call(0.6)], any_order=False)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b'{"102": {"samples": [{"symbol": "\\u00b0", "timestamp": "2020-02-25 23:08:13+00:00", "value": "25.104", "value_type": "float", "unit_code": "T"}]}}\n', response.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_should_report_errors_for_each_device_which_could_not_be_sampled(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        self.given_devices({
+            99: [b'\x01?i,pH,1.98\00', b'\x019.560\00'],
+            100: [b'\x01?i,pH,1.98\00', b'\x02\00'],
+        })
+
+        # Act
+        response = self.app.get('/api/device/sample?address=99&address=100&address=110', follow_redirects=True)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b'{"99": {"samples": [{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]}, '
+            b'"100": {"error": {"message": "Device has rejected your request, please confrim the request is supported by the device and the device has the latest firmware.", "error_code": "COMMAND_ERROR"}}, '
+            b'"110": {"error": {"message": "No device is connected to the given address.", "error_code": "DEVICE_NOT_FOUND"}}}\n', response.data)
+
+    def test_should_return_validation_error_for_invalid_address(self):
+
+        # Act
+        response = self.app.get('/api/device/sample?address=128', follow_redirects=True)
+
+        # Assert
+        self.i2cbus.write.assert_not_called()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(b'{"message": "Request contains a missing or incorrectly formatted felid.", "error_code": "INVALID_REQUEST_ERROR"}\n', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
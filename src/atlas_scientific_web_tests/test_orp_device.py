@@ -3,7 +3,7 @@ from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -11,7 +11,7 @@ date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
 class OrpDeviceTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -21,9 +21,9 @@ class OrpDeviceTests(unittest.TestCase):
 
     # Sample tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_orp_device(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_orp_device(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 98
@@ -44,7 +44,7 @@ class OrpDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9)  
             ], 
@@ -62,8 +62,8 @@ class OrpDeviceTests(unittest.TestCase):
 
     # Sample output tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_resolve_supported_outputs_atlas_scientific_orp_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_resolve_supported_outputs_atlas_scientific_orp_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 98
@@ -82,7 +82,7 @@ class OrpDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3)
             ], 
             any_order=False)
@@ -98,9 +98,9 @@ class OrpDeviceTests(unittest.TestCase):
 
     # compensation tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_should_return_invalid_request_when_sampling_atlas_scientific_orp_device_with_temperature_compensation(self, datetime_now_mock, patched_time_sleep):
+    def test_should_return_invalid_request_when_sampling_atlas_scientific_orp_device_with_temperature_compensation(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [ 
@@ -123,8 +123,8 @@ class OrpDeviceTests(unittest.TestCase):
 
     # configuration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_orp_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_orp_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -150,7 +150,7 @@ class OrpDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,orp_device"
             ], 
@@ -166,8 +166,8 @@ class OrpDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_leds_in_atlas_scientific_orp_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_leds_in_atlas_scientific_orp_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -193,7 +193,7 @@ class OrpDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "l,1"
             ], 
@@ -211,8 +211,8 @@ class OrpDeviceTests(unittest.TestCase):
 
     # Calibration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_any_point_in_atlas_scientific_orp_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_any_point_in_atlas_scientific_orp_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -237,7 +237,7 @@ class OrpDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.9), # "Cal,225"
             ], 
@@ -3,7 +3,7 @@ from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -11,7 +11,7 @@ date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
 class PhDeviceTests(unittest.TestCase):
  
     def setUp(self):
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -20,9 +20,9 @@ class PhDeviceTests(unittest.TestCase):
 
     # sample tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_ph_device(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_ph_device(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -43,7 +43,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9)  
             ], 
@@ -59,9 +59,9 @@ class PhDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_ph_device_with_temperature_compensation(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_ph_device_with_temperature_compensation(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -88,7 +88,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9)  
             ], 
@@ -104,8 +104,8 @@ class PhDeviceTests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(b'[{"symbol": "", "timestamp": "2020-02-25 23:08:13+00:00", "value": "9.560", "value_type": "float", "unit_code": "PH"}]\n', response.data)
 
-    @patch('time.sleep', return_value=None)
-    def test_reading_sample_twice_should_only_resolve_device_infomation_once(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_reading_sample_twice_should_only_resolve_device_infomation_once(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -129,7 +129,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.9),
                 call(0.9),
@@ -150,8 +150,8 @@ class PhDeviceTests(unittest.TestCase):
 
     # Sample output tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_resolve_supported_outputs_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_resolve_supported_outputs_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -170,7 +170,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3)
             ], 
             any_order=False)
@@ -186,8 +186,8 @@ class PhDeviceTests(unittest.TestCase):
 
     # configuration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_leds_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_leds_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -213,7 +213,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "l,1"
             ], 
@@ -229,8 +229,8 @@ class PhDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 100
@@ -256,7 +256,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,ph_device"
             ], 
@@ -275,8 +275,8 @@ class PhDeviceTests(unittest.TestCase):
 
     # Compensation tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_compensate_for_temperature_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_compensate_for_temperature_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -303,7 +303,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "T,19.5"
             ], 
@@ -318,8 +318,8 @@ class PhDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -345,7 +345,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,ph_device"
             ], 
@@ -363,8 +363,8 @@ class PhDeviceTests(unittest.TestCase):
 
     # Calibration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_low_point_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_low_point_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -389,7 +389,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.9), # "Cal,low,4.00"
             ], 
@@ -404,8 +404,8 @@ class PhDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_mid_point_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_mid_point_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -430,7 +430,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.9), # "Cal,low,4.00"
             ], 
@@ -445,8 +445,8 @@ class PhDeviceTests(unittest.TestCase):
 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_high_point_in_atlas_scientific_ph_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_high_point_in_atlas_scientific_ph_device(self, patched_bus_wait):
 
         # Arrange
         device_address = 99
@@ -471,7 +471,7 @@ class PhDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.9), # "Cal,high,10.0"
             ], 
@@ -0,0 +1,98 @@
+import json
+import unittest
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
+from atlas_scientific_web.hardware.models import AtlasScientificDeviceSample
+from atlas_scientific_web.recent_samples import AtlasScientificSampleRingBuffer, AtlasScientificRecentSamples
+from atlas_scientific_web.api import create_app
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+def sample(value, timestamp_ns, unit_code='PH', value_type='float'):
+    timestamp = datetime.fromtimestamp(timestamp_ns / 1e9, timezone.utc)
+    return AtlasScientificDeviceSample('', value, value_type, timestamp, unit_code)
+
+class RecentSamplesTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+        self.i2cbus.ping.return_value = True
+
+    def test_ring_buffer_should_keep_the_latest_samples_in_order(self):
+
+        # Arrange
+        ring_buffer = AtlasScientificSampleRingBuffer(3)
+
+        # Act
+        for i in range(5):
+            ring_buffer.append(i * 1000, float(i))
+        timestamps, values = ring_buffer.read()
+
+        # Assert
+        self.assertEqual(3, len(ring_buffer))
+        self.assertEqual([2000, 3000, 4000], timestamps.tolist())
+        self.assertEqual([2.0, 3.0, 4.0], values.tolist())
+
+    def test_ring_buffer_should_read_samples_since_a_time(self):
+
+        # Arrange
+        ring_buffer = AtlasScientificSampleRingBuffer(4)
+        for i in range(6):
+            ring_buffer.append(i * 1000, float(i))
+
+        # Act
+        timestamps, values = ring_buffer.read(3500)
+
+        # Assert
+        self.assertEqual([4000, 5000], timestamps.tolist())
+        self.assertEqual([4.0, 5.0], values.tolist())
+
+    def test_should_keep_only_numeric_samples_within_the_period(self):
+
+        # Arrange
+        recent_samples = AtlasScientificRecentSamples(10)
+
+        # Act
+        for i in range(5):
+            recent_samples.append(99, [sample(f'{i}.5', 1582672093000000000 + i * 1000000000)])
+        recent_samples.append(99, [sample('ok', 1582672093000000000, 'NAME', 'string')])
+        timestamps, values = recent_samples.read(99, 'PH', 2)
+
+        # Assert
+        self.assertEqual([1582672095000000000, 1582672096000000000, 1582672097000000000], timestamps.tolist())
+        self.assertEqual([2.5, 3.5, 4.5], values.tolist())
+        self.assertEqual(0, len(recent_samples.read(99, 'NAME')[0]))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093.25, timezone.utc))
+    def test_should_return_samples_read_from_device(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,pH,1.98\00', # first call should be for the device info
+                b'\x019.560\00'  # second call should be for reading the device sample
+            ]
+
+        app = create_app(self.i2cbus).test_client()
+
+        # Act
+        app.get('/api/device/99/sample')
+        response = app.get('/api/device/99/sample/recent')
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([{
+                'unit_code': 'PH',
+                'symbol': '',
+                'unit': 'Power of Hydrogen',
+                'timestamp': [1582672093250000000],
+                'value': [9.56]
+            }], json.loads(response.data))
+
+if __name__ == '__main__':
+    unittest.main()
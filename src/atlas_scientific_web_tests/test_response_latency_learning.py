@@ -0,0 +1,133 @@
+import unittest
+from unittest.mock import Mock, call, patch
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus, AtlasScientificResponseLatencies, get_wait_durations
+
+class ResponseLatencyLearningTests(unittest.TestCase):
+
+    def setUp(self):
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+        self.i2cbus.ping.return_value = True
+
+        self.i2c_session_provider = I2CSessionProvider(self.i2cbus)
+
+    def tearDown(self):
+        self.i2c_session_provider.close()
+
+    def test_wait_durations_without_expected_latency_should_back_off_in_thirds(self):
+
+        # Act
+        wait_durations = get_wait_durations(0.9)
+
+        # Assert
+        self.assertEqual([0.9, 0.3, 0.3, 0.3], wait_durations)
+
+    def test_wait_durations_should_poll_from_just_before_expected_latency(self):
+
+        # Act
+        wait_durations = get_wait_durations(0.9, 0.6)
+
+        # Assert
+        self.assertAlmostEqual(0.55, wait_durations[0])
+        self.assertEqual([0.05] * 7, [round(d, 6) for d in wait_durations[1:8]])
+        # expect the documented latency to still be waited out before backing off
+        self.assertAlmostEqual(0.9, sum(wait_durations[:8]))
+        self.assertEqual([0.3, 0.3, 0.3], wait_durations[8:])
+
+    def test_expected_latency_should_not_exceed_the_documented_latency(self):
+
+        # Act
+        wait_durations = get_wait_durations(0.9, 1.2)
+
+        # Assert
+        self.assertAlmostEqual(0.85, wait_durations[0])
+        self.assertEqual([0.05, 0.3, 0.3, 0.3], [round(d, 6) for d in wait_durations[1:]])
+
+    def test_expected_latency_should_be_unknown_until_enough_responses_are_observed(self):
+
+        # Arrange
+        latencies = AtlasScientificResponseLatencies(min_observations=3)
+
+        # Act
+        latencies.observe('r', 0.6)
+        latencies.observe('r', 0.6)
+        before = latencies.get_expected_latency('r')
+        latencies.observe('r', 0.6)
+        after = latencies.get_expected_latency('r')
+
+        # Assert
+        self.assertIsNone(before)
+        self.assertEqual(0.6, after)
+
+    def test_expected_latency_should_be_learnt_per_command(self):
+
+        # Arrange
+        latencies = AtlasScientificResponseLatencies(min_observations=1)
+
+        # Act
+        latencies.observe('r', 0.6)
+        latencies.observe('rt,25.5', 0.8)
+        latencies.observe('Cal,mid,7.00', 0.9)
+
+        # Assert
+        self.assertEqual(0.6, latencies.get_expected_latency('r'))
+        self.assertEqual(0.8, latencies.get_expected_latency('rt,19.5'))
+        self.assertEqual(0.9, latencies.get_expected_latency('cal,low,4.00'))
+        self.assertIsNone(latencies.get_expected_latency('i'))
+
+    def test_expected_latency_should_be_a_percentile_of_recent_responses(self):
+
+        # Arrange
+        latencies = AtlasScientificResponseLatencies(window_size=10, percentile=0.9, min_observations=1)
+
+        # Act
+        for ready_after in [2.0, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.6, 0.6]:
+            latencies.observe('r', ready_after)
+
+        # Assert
+        # expect the oldest response to have left the window
+        self.assertEqual(0.6, latencies.get_expected_latency('r'))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_device_should_wait_less_once_its_latency_is_learnt(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00'] + [b'\x019.560\00'] * 11
+
+        device = AtlasScientificDeviceBus(self.i2c_session_provider).get_device_by_address(99)
+
+        # Act
+        for _ in range(10):
+            device.read_sample([])
+        patched_bus_wait.reset_mock()
+        device.read_sample([])
+
+        # Assert
+        # expect the first read to be attempted one poll before the learnt latency
+        self.assertEqual(1, patched_bus_wait.call_count)
+        self.assertAlmostEqual(0.85, patched_bus_wait.call_args[0][0])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_device_should_poll_until_ready_when_learnt_latency_is_too_short(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00'] + [b'\x019.560\00'] * 10 + [b'\xfe\00', b'\x019.560\00']
+
+        device = AtlasScientificDeviceBus(self.i2c_session_provider).get_device_by_address(99)
+
+        # Act
+        for _ in range(10):
+            device.read_sample([])
+        patched_bus_wait.reset_mock()
+        samples = device.read_sample([])
+
+        # Assert
+        self.assertEqual([0.85, 0.05], [round(c[0][0], 6) for c in patched_bus_wait.call_args_list])
+        self.assertEqual('9.560', samples[0].value)
+
+if __name__ == '__main__':
+    unittest.main()
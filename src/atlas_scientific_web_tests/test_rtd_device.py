@@ -3,7 +3,7 @@ from unittest.mock import Mock, call, patch
 from datetime import datetime, timezone
 
 from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
-from atlas_scientific_web.hardware.i2c import I2CBusIo
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
 from atlas_scientific_web.api import create_app
 
 date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
@@ -12,7 +12,7 @@ class RtdDeviceTests(unittest.TestCase):
  
     def setUp(self):
         self.device_address = 102
-        self.i2cbus = I2CBusIo()
+        self.i2cbus = StubI2CBusIo()
         self.i2cbus.read = Mock()
         self.i2cbus.write = Mock()
         self.i2cbus.ping = Mock() 
@@ -22,9 +22,9 @@ class RtdDeviceTests(unittest.TestCase):
 
     # Sample tests
 
-    @patch('time.sleep', return_value=None)
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
     @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
-    def test_can_sample_atlas_scientific_rtd_device(self, datetime_now_mock, patched_time_sleep):
+    def test_can_sample_atlas_scientific_rtd_device(self, datetime_now_mock, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [ 
@@ -43,7 +43,7 @@ class RtdDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), 
                 call(0.6)  
             ], 
@@ -62,8 +62,8 @@ class RtdDeviceTests(unittest.TestCase):
 
     # Sample output tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_resolve_supported_outputs_atlas_scientific_rtd_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_resolve_supported_outputs_atlas_scientific_rtd_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -80,7 +80,7 @@ class RtdDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3),
             ], 
             any_order=False)
@@ -100,8 +100,8 @@ class RtdDeviceTests(unittest.TestCase):
 
     # configuration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_name_in_atlas_scientific_rtd_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_name_in_atlas_scientific_rtd_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -125,7 +125,7 @@ class RtdDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "name,rtd_device"
             ], 
@@ -141,8 +141,8 @@ class RtdDeviceTests(unittest.TestCase):
         # expect a empty json list 
         self.assertEqual(response.status_code, 200)
 
-    @patch('time.sleep', return_value=None)
-    def test_can_configure_device_leds_in_atlas_scientific_rtd_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_configure_device_leds_in_atlas_scientific_rtd_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -166,7 +166,7 @@ class RtdDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.3), # "l,1"
             ], 
@@ -187,8 +187,8 @@ class RtdDeviceTests(unittest.TestCase):
 
     # Calibration tests
 
-    @patch('time.sleep', return_value=None)
-    def test_can_calibrate_any_point_in_atlas_scientific_rtd_device(self, patched_time_sleep):
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_can_calibrate_any_point_in_atlas_scientific_rtd_device(self, patched_bus_wait):
 
         # Arrange
         self.i2cbus.read.side_effect = [
@@ -211,7 +211,7 @@ class RtdDeviceTests(unittest.TestCase):
             any_order=False)
 
         # expect to wait for result to be ready
-        patched_time_sleep.assert_has_calls([
+        patched_bus_wait.assert_has_calls([
                 call(0.3), # "i"
                 call(0.6), # "Cal,100"
             ], 
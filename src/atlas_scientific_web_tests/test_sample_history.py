@@ -0,0 +1,162 @@
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo
+from atlas_scientific_web.hardware.models import AtlasScientificDeviceSample
+from atlas_scientific_web.sample_store import AtlasScientificSampleStore, decode_values
+from atlas_scientific_web.sample_history import AtlasScientificSampleBuckets, downsample
+from atlas_scientific_web.api import create_app
+
+def sample(value, timestamp_ms, unit_code):
+    timestamp = datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc)
+    return AtlasScientificDeviceSample('', value, 'float', timestamp, unit_code)
+
+class SampleHistoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        self.i2cbus = StubI2CBusIo()
+        self.i2cbus.read = Mock()
+        self.i2cbus.write = Mock()
+        self.i2cbus.ping = Mock()
+        self.i2cbus.ping.return_value = True
+
+    def test_downsample_should_aggregate_samples_in_each_bucket(self):
+
+        # Arrange
+        timestamps = [1000, 1500, 2000, 5000, 5999]
+        values = [1.0, 3.0, 2.0, 10.0, 20.0]
+
+        # Act
+        buckets = downsample(timestamps, values, 1000, 2000, ['min', 'max', 'mean'])
+
+        # Assert
+        # expect the bucket without samples to be omitted
+        self.assertEqual([1000, 5000], buckets['timestamp'])
+        self.assertEqual([3, 2], buckets['count'])
+        self.assertEqual([1.0, 10.0], buckets['min'])
+        self.assertEqual([3.0, 20.0], buckets['max'])
+        self.assertEqual([2.0, 15.0], buckets['mean'])
+
+    def test_downsample_should_only_include_requested_aggregations(self):
+
+        # Act
+        buckets = downsample([1000, 2000], [1.0, 3.0], 0, 60000, ['max'])
+
+        # Assert
+        self.assertEqual({'timestamp': [0], 'count': [2], 'max': [3.0]}, buckets)
+
+    def test_downsample_should_aggregate_samples_out_of_time_order(self):
+
+        # Arrange
+        timestamps = [5000, 1000, 5999, 1500]
+        values = [10.0, 1.0, 20.0, 3.0]
+
+        # Act
+        buckets = downsample(timestamps, values, 1000, 2000, ['min', 'max', 'mean'])
+
+        # Assert
+        self.assertEqual([1000, 5000], buckets['timestamp'])
+        self.assertEqual([2, 2], buckets['count'])
+        self.assertEqual([1.0, 10.0], buckets['min'])
+        self.assertEqual([3.0, 20.0], buckets['max'])
+        self.assertEqual([2.0, 15.0], buckets['mean'])
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_return_history_of_each_stored_output(self, patched_bus_wait):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path)
+        for i in range(4):
+            store.append(97, [sample(str(238 + i), 1582672080000 + i * 30000, 'MG'), sample(str(90 + i), 1582672080000 + i * 30000, '%')])
+        store.close()
+
+        self.i2cbus.read.side_effect = [
+                b'\x01?i,DO,1.98\00', # first call should be for the device info
+                b'\x01?O,MG,%\00'     # second call should be for the enabled outputs
+            ]
+
+        app = create_app(self.i2cbus, sample_store_path=self.path).test_client()
+
+        # Act
+        response = app.get('/api/device/97/sample/history?from=2020-02-25T23:08:00Z&to=2020-02-25T23:10:00Z&resolution=60&agg=mean,max')
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        history = json.loads(response.data)
+        self.assertEqual(['%', 'MG'], [h['unit_code'] for h in history])
+        self.assertEqual({
+                'unit_code': 'MG',
+                'symbol': 'mg/L',
+                'unit': 'milligram per litre',
+                'resolution': 60.0,
+                'timestamp': ['2020-02-25 23:08:00+00:00', '2020-02-25 23:09:00+00:00'],
+                'count': [2, 2],
+                'max': [239.0, 241.0],
+                'mean': [238.5, 240.5]
+            }, history[1])
+
+    def test_should_aggregate_blocks_within_one_bucket_without_decoding_them(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path, block_size=2)
+        for i in range(8):
+            store.append(99, [sample(str(i), 1582672080000 + i * 30000, 'PH')])
+        store.append(99, [sample('8', 1582672080000 + 8 * 30000, 'PH')])
+
+        buckets = AtlasScientificSampleBuckets(1582672065000, 150000, 1582672080000 + 7 * 30000)
+
+        # Act
+        with patch('atlas_scientific_web.sample_store.decode_values', wraps=decode_values) as decode_values_mock:
+            for block in store.read_blocks(99, 'PH', 1582672065000, 1582672080000 + 7 * 30000):
+                buckets.add_block(block)
+
+        # Assert
+        # expect only the block spanning two buckets to be decoded, and the sample after the range to be left out
+        self.assertEqual(1, decode_values_mock.call_count)
+        self.assertEqual({
+                'timestamp': [1582672065000, 1582672215000],
+                'count': [5, 3],
+                'min': [0.0, 5.0],
+                'max': [4.0, 7.0],
+                'mean': [2.0, 6.0]
+            }, buckets.get_aggregations(['min', 'max', 'mean']))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_raise_error_when_samples_are_not_stored(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00']
+
+        app = create_app(self.i2cbus).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample/history')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'SAMPLE_HISTORY_NOT_ENABLED', response.data)
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    def test_should_raise_error_for_unknown_aggregation(self, patched_bus_wait):
+
+        # Arrange
+        self.i2cbus.read.side_effect = [b'\x01?i,pH,1.98\00']
+
+        app = create_app(self.i2cbus, sample_store_path=self.path).test_client()
+
+        # Act
+        response = app.get('/api/device/99/sample/history?agg=min,median')
+
+        # Assert
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b'INVALID_REQUEST_ERROR', response.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from datetime import datetime, timezone
+
+from atlas_scientific_web.hardware.i2c import StubI2CBusIo, I2CSessionProvider
+from atlas_scientific_web.hardware.device import AtlasScientificDeviceBus
+from atlas_scientific_web.hardware.models import AtlasScientificDeviceSample
+from atlas_scientific_web.hardware.sampler import AtlasScientificDeviceSampler
+from atlas_scientific_web.sample_store import AtlasScientificSampleStore, \
+    encode_block, \
+    decode_blocks, \
+    encode_timestamps, \
+    decode_timestamps, \
+    encode_values, \
+    decode_values
+
+date_time_patch = 'atlas_scientific_web.hardware.device.get_datetime_now'
+
+def sample(value, timestamp_ms, unit_code='PH', value_type='float'):
+    timestamp = datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc)
+    return AtlasScientificDeviceSample('', value, value_type, timestamp, unit_code)
+
+class SampleStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_timestamps_should_round_trip(self):
+
+        # Arrange
+        timestamps = [1582672093000, 1582672094000, 1582672095000, 1582672095999, 1582672100500, 1582672090000]
+
+        # Act
+        encoded = encode_timestamps(timestamps)
+
+        # Assert
+        self.assertEqual(timestamps, list(decode_timestamps(encoded, len(timestamps))))
+
+    def test_regular_timestamps_should_take_a_byte_each(self):
+
+        # Arrange
+        timestamps = [1582672093000 + i * 1000 for i in range(100)]
+
+        # Act
+        encoded = encode_timestamps(timestamps)
+
+        # Assert
+        # expect only the first two timestamps to take more than a byte
+        self.assertLessEqual(len(encoded), 98 + 8 + 2)
+
+    def test_values_should_round_trip(self):
+
+        # Arrange
+        values = [9.56, 9.56, 9.57, -238.15, 0.0, 1e-300, 419.6, 419.6, float('inf')]
+
+        # Act
+        encoded = encode_values(values)
+
+        # Assert
+        self.assertEqual(values, list(decode_values(encoded, len(values))))
+
+    def test_unchanged_values_should_take_a_byte_each(self):
+
+        # Act
+        encoded = encode_values([7.0] * 100)
+
+        # Assert
+        self.assertLessEqual(len(encoded), 99 + 9)
+
+    def test_blocks_after_an_incomplete_block_should_be_recovered(self):
+
+        # Arrange
+        block = encode_block([1582672093000, 1582672094000], [9.56, 9.57])
+        next_block = encode_block([1582672095000, 1582672096000], [9.58, 9.59])
+
+        # Act
+        blocks = list(decode_blocks(block + block[:-3] + next_block))
+
+        # Assert
+        # expect only the incomplete block to be skipped
+        self.assertEqual(
+            [[1582672093000, 1582672094000], [1582672095000, 1582672096000]],
+            [list(b.decode()[0]) for b in blocks])
+        self.assertEqual([9.58, 9.59], list(blocks[1].decode()[1]))
+
+    def test_samples_written_after_an_incomplete_block_should_be_read(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path)
+        store.append(99, [sample('9.560', 1582672093000)])
+        store.flush()
+
+        # a power cut while the block was being written
+        segment_path = os.path.join(self.path, '99', 'PH', '2020-02-25.blocks')
+        with open(segment_path, 'rb+') as f:
+            f.truncate(os.path.getsize(segment_path) - 3)
+
+        # Act
+        for i in range(4):
+            store.append(99, [sample(str(i), 1582672094000 + i * 1000)])
+        store.flush()
+
+        # Assert
+        self.assertEqual([0.0, 1.0, 2.0, 3.0], AtlasScientificSampleStore(self.path).read(99, 'PH').values)
+
+    def test_blocks_should_be_summarised_without_decoding_their_samples(self):
+
+        # Arrange
+        block = encode_block([1582672093000, 1582672094000, 1582672092000], [9.56, 9.58, 9.57])
+
+        # Act
+        with patch('atlas_scientific_web.sample_store.decode_values') as decode_values_mock:
+            blocks = list(decode_blocks(block))
+
+        # Assert
+        decode_values_mock.assert_not_called()
+        self.assertEqual(
+            (3, 1582672092000, 1582672094000, 9.56, 9.58),
+            (blocks[0].count, blocks[0].start_ms, blocks[0].end_ms, blocks[0].minimum, blocks[0].maximum))
+        self.assertAlmostEqual(28.71, blocks[0].total)
+
+    def test_can_read_samples_before_and_after_they_are_written(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path)
+
+        # Act
+        store.append(99, [sample('9.560', 1582672093000)])
+        store.append(99, [sample('9.570', 1582672094000)])
+        buffered = store.read(99, 'PH')
+        store.flush()
+        written = AtlasScientificSampleStore(self.path).read(99, 'PH')
+
+        # Assert
+        self.assertEqual([1582672093000, 1582672094000], buffered.timestamps)
+        self.assertEqual([9.56, 9.57], buffered.values)
+        self.assertEqual([1582672093000, 1582672094000], written.timestamps)
+        self.assertEqual([9.56, 9.57], written.values)
+
+    def test_should_write_a_block_once_enough_samples_are_buffered(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path, block_size=3)
+
+        # Act
+        for i in range(3):
+            store.append(99, [sample('9.560', 1582672093000 + i * 1000)])
+
+        # Assert
+        self.assertEqual(['2020-02-25.blocks'], os.listdir(os.path.join(self.path, '99', 'PH')))
+        self.assertEqual(3, len(AtlasScientificSampleStore(self.path).read(99, 'PH')))
+
+    def test_can_read_samples_within_a_range_across_days(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path, block_size=2)
+        day_ms = 24 * 60 * 60 * 1000
+        for i in range(6):
+            store.append(99, [sample(str(i), 1582672093000 + i * day_ms / 2)])
+        store.flush()
+
+        # Act
+        series = store.read(99, 'PH', 1582672093000 + day_ms, 1582672093000 + 2 * day_ms)
+
+        # Assert
+        self.assertEqual([2.0, 3.0, 4.0], series.values)
+
+    def test_should_keep_a_series_per_device_and_unit_code(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path)
+
+        # Act
+        store.append(97, [sample('238.15', 1582672093000, 'MG'), sample('419.6', 1582672093000, '%')])
+        store.append(99, [sample('9.560', 1582672093000)])
+        store.flush()
+
+        # Assert
+        self.assertEqual(['%', 'MG'], store.get_unit_codes(97))
+        self.assertEqual([419.6], store.read(97, '%').values)
+        self.assertEqual([238.15], store.read(97, 'MG').values)
+        self.assertEqual([9.56], store.read(99, 'PH').values)
+
+    def test_should_ignore_samples_which_are_not_numeric(self):
+
+        # Arrange
+        store = AtlasScientificSampleStore(self.path)
+
+        # Act
+        store.append(99, [sample('no output', 1582672093000), sample('ok', 1582672093000, 'NAME', 'string')])
+
+        # Assert
+        self.assertEqual([], store.get_unit_codes(99))
+
+    @patch('atlas_scientific_web.hardware.i2c.I2CBusScheduler.wait_until_ready', return_value=False)
+    @patch(date_time_patch, return_value = datetime.fromtimestamp(1582672093, timezone.utc))
+    def test_sampler_should_store_samples_read(self, datetime_now_mock, patched_bus_wait):
+
+        # Arrange
+        i2cbus = StubI2CBusIo()
+        i2cbus.read = Mock(side_effect=[b'\x01?i,pH,1.98\00', b'\x019.560\00'])
+        i2cbus.write = Mock()
+        i2cbus.ping = Mock(return_value=True)
+
+        i2c_session_provider = I2CSessionProvider(i2cbus)
+        self.addCleanup(i2c_session_provider.close)
+
+        store = AtlasScientificSampleStore(self.path)
+        device_sampler = AtlasScientificDeviceSampler(AtlasScientificDeviceBus(i2c_session_provider), sample_store=store)
+
+        # Act
+        device_sampler.read_sample(99)
+
+        # Assert
+        series = store.read(99, 'PH')
+        self.assertEqual([1582672093000], series.timestamps)
+        self.assertEqual([9.56], series.values)
+
+if __name__ == '__main__':
+    unittest.main()
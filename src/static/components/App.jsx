@@ -15,19 +15,61 @@ class DeviceList extends React.Component {
 
   constructor() {
     super()
-    this.state = { devices: [] }
+    this.state = { devices: [], samples: {} }
   }
 
   componentDidMount() {
+    this.fetchDevices();
+
+    // a single stream pushes the samples of every device, rather than a connection per device
+    this.sampleStream = new EventSource('/api/device/sample/stream');
+    this.sampleStream.onmessage = event => this.addSamples(JSON.parse(event.data));
+    this.sampleStream.onerror = () => {
+      // the server refuses streams once too many are open, so poll for samples instead
+      if (this.sampleStream.readyState === EventSource.CLOSED) {
+        this.samplePolling = setInterval(() => this.pollSamples(), 1000);
+      }
+    };
+  }
+
+  componentWillUnmount() {
+    this.sampleStream.close();
+    this.sampleStream = null;
+    clearInterval(this.samplePolling);
+  }
+
+  fetchDevices() {
     fetch('/api/device')
       .then(result => result.json())
       .then(result => this.setState({ devices: result }));
   }
 
+  pollSamples() {
+    fetch('/api/device/sample')
+      .then(result => result.json())
+      .then(results => this.addSamples(results));
+  }
+
+  addSamples(results) {
+    // devices found since the device list was fetched are listed once their samples arrive
+    const addresses = Object.keys(results);
+    if (addresses.some(address => !this.state.devices.some(device => String(device.address) === address))) {
+      this.fetchDevices();
+    }
+
+    this.setState(state => {
+      const samples = Object.assign({}, state.samples);
+      addresses
+        .filter(address => results[address].samples)
+        .forEach(address => samples[address] = results[address].samples);
+      return { samples: samples };
+    });
+  }
+
   render() {
   	return (
       <div>
-        {this.state.devices.map(device => <Device {...device}/>)}
+        {this.state.devices.map(device => <Device {...device} samples={this.state.samples[device.address]}/>)}
       </div>
     );
   }
@@ -35,40 +77,14 @@ class DeviceList extends React.Component {
 
 class Device extends React.Component {
 
-  constructor() {
-    super()
-    this.state = { samples: [
-        {
-          'value': '',
-          'symbol': ''
-        }
-      ] 
-    }
-  }
-
-  componentDidMount() {
-    this.sampleDevice()
-    this.timer = setInterval(() => this.sampleDevice(), 1000);
-  }
-
-  componentWillUnmount() {
-    clearInterval(this.timer)
-    this.timer = null;
-  }
-
-  sampleDevice() {
-    fetch('/api/device/' + this.props.address + '/sample')
-      .then(result => result.json())
-      .then(result => this.setState({ samples: result }));
-  }
-
   render() {
   	const device = this.props;
+    const samples = device.samples || [{ 'value': '', 'symbol': '' }];
   	return (
     	<div>
         <h1 className={'p-3 mb-2 text-white ' + device.device_type.toLowerCase() + '_device'}>{device.device_type} : 
           {
-            this.state.samples
+            samples
                   .map(sample => <DeviceSample {...sample}/>)
                   .reduce((prev, curr) => [prev, ' ', curr])
           }